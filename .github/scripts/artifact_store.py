@@ -0,0 +1,276 @@
+"""
+Content-addressed artifact store
+
+Binary story artifacts (page audio) are written once under
+store/objects/ by their SHA-256, and each story lists the ones it uses in
+stories/<story>/artifacts.json instead of keeping its own copy. Identical
+files across stories, such as the audio of a reused or personalized page,
+are stored once, and store/keys.json maps a TTS request (model, voice, text)
+to the blob it produced so repeated narration is never synthesized twice.
+
+Scripts read artifacts through resolve_artifact(), which prefers a file in
+the story directory and falls back to the store. `export` materializes a
+normal directory tree for hosting, and `gc` removes blobs no story uses.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import shutil
+import threading
+from fnmatch import fnmatch
+
+STORE_DIR = os.getenv("STORY_STORE_DIR", "store")
+STORIES_DIR = 'stories'
+MANIFEST_FILE = 'artifacts.json'
+MANIFEST_VERSION = 1
+
+# Story-relative files kept in the store (page audio, including locale audio)
+STORE_PATTERNS = ['audio/*.mp3', '*/audio/*.mp3']
+
+# Paths copied into an exported site
+EXPORT_PATHS = ['index.html', 'viewer.html', 'shared', 'stories']
+
+# Serializes keys.json updates from threads of one process (e.g. line narration)
+_keys_lock = threading.Lock()
+
+def _sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def write_json(path, data):
+    """Write JSON through a temporary file so readers never see a partial file"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def object_path(digest, store_dir=None):
+    """Path of the blob with this SHA-256 in the store"""
+    return os.path.join(store_dir or STORE_DIR, 'objects', digest[:2], digest)
+
+def put_file(path, store_dir=None):
+    """
+    Add a file to the store (a no-op if identical content is already there)
+
+    Returns:
+        str: SHA-256 of the file
+    """
+    digest = _sha256_file(path)
+    target = object_path(digest, store_dir)
+    if not os.path.exists(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp_path = f"{target}.tmp{os.getpid()}-{threading.get_ident()}"
+        shutil.copyfile(path, tmp_path)
+        # Blobs are immutable; read-only also stops writes through a hard link
+        os.chmod(tmp_path, 0o444)
+        os.replace(tmp_path, target)
+    return digest
+
+def link_object(digest, output_path, store_dir=None, link=False):
+    """
+    Materialize a blob at output_path
+
+    Copies by default. Only hard-link (link=True) when nothing will write to
+    output_path in place, since the link shares the blob's inode.
+    """
+    source = object_path(digest, store_dir)
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    if os.path.exists(output_path):
+        os.remove(output_path)
+    if link:
+        try:
+            os.link(source, output_path)
+            return
+        except OSError:
+            pass
+    shutil.copyfile(source, output_path)
+
+def synthesis_key(model, voice, text):
+    """Key identifying a TTS request, shared by every story that asks for it"""
+    return hashlib.sha256(f"{model}\n{voice}\n{text}".encode('utf-8')).hexdigest()
+
+def load_keys(store_dir=None):
+    path = os.path.join(store_dir or STORE_DIR, 'keys.json')
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def lookup_key(key, store_dir=None):
+    """Return the blob digest stored for a synthesis key, if its blob still exists"""
+    digest = load_keys(store_dir).get(key)
+    if digest and os.path.exists(object_path(digest, store_dir)):
+        return digest
+    return None
+
+def record_key(key, path, store_dir=None):
+    """
+    Store a synthesized file and remember which request produced it
+
+    Concurrent processes can drop each other's entries; that only costs a
+    repeated synthesis later, never a wrong file.
+
+    Returns:
+        str: SHA-256 of the file
+    """
+    store_dir = store_dir or STORE_DIR
+    digest = put_file(path, store_dir)
+    with _keys_lock:
+        keys = load_keys(store_dir)
+        if keys.get(key) != digest:
+            keys[key] = digest
+            write_json(os.path.join(store_dir, 'keys.json'), keys)
+    return digest
+
+def load_manifest(story_dir):
+    """Return {relative path: {'sha256', 'size'}} for a story's stored artifacts"""
+    path = os.path.join(story_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f).get('files', {})
+
+def resolve_artifact(story_dir, relative, store_dir=None):
+    """
+    Find the file for a story artifact
+
+    Args:
+        story_dir: Story directory
+        relative: Path inside the story, e.g. 'audio/page-01.mp3'
+
+    Returns:
+        str: Path of the story's own file, else of its blob in the store,
+            or None if the story has no such artifact
+    """
+    path = os.path.join(story_dir, relative)
+    if os.path.exists(path):
+        return path
+    entry = load_manifest(story_dir).get(relative.replace(os.sep, '/'))
+    if entry:
+        blob = object_path(entry['sha256'], store_dir)
+        if os.path.exists(blob):
+            return blob
+    return None
+
+def story_artifacts(story_dir, pattern):
+    """Story-relative paths matching a glob pattern, whether on disk or in the manifest"""
+    found = {os.path.relpath(p, story_dir).replace(os.sep, '/')
+             for p in glob.glob(os.path.join(story_dir, pattern))}
+    found.update(relative for relative in load_manifest(story_dir) if fnmatch(relative, pattern))
+    return sorted(found)
+
+def ingest_story(story_dir, store_dir=None, keep=False):
+    """
+    Move a story's binary artifacts into the store and update its manifest
+
+    Args:
+        story_dir: Story directory
+        store_dir: Store location (default STORE_DIR)
+        keep: Leave the story's own copies in place
+
+    Returns:
+        dict: Number of files ingested and their total size
+    """
+    files = load_manifest(story_dir)
+    stats = {'files': 0, 'bytes': 0}
+
+    for pattern in STORE_PATTERNS:
+        for path in sorted(glob.glob(os.path.join(story_dir, pattern))):
+            relative = os.path.relpath(path, story_dir).replace(os.sep, '/')
+            size = os.path.getsize(path)
+            digest = put_file(path, store_dir)
+            files[relative] = {'sha256': digest, 'size': size}
+            stats['files'] += 1
+            stats['bytes'] += size
+            if not keep:
+                os.remove(path)
+
+    if stats['files']:
+        write_json(os.path.join(story_dir, MANIFEST_FILE), {'version': MANIFEST_VERSION, 'files': files})
+        print(f"📦 Stored {stats['files']} artifacts ({stats['bytes']:,} bytes) from {os.path.basename(story_dir)}")
+    return stats
+
+def materialize_story(story_dir, dest_dir=None, store_dir=None, link=False):
+    """
+    Write a story's stored artifacts back as normal files
+
+    Args:
+        story_dir: Story directory with an artifacts.json manifest
+        dest_dir: Where to write them (default: the story directory itself)
+        link: Hard-link blobs instead of copying them (only for read-only
+            destinations such as an exported site)
+
+    Returns:
+        int: Number of files written
+    """
+    dest_dir = dest_dir or story_dir
+    count = 0
+    for relative, entry in load_manifest(story_dir).items():
+        output_path = os.path.join(dest_dir, relative)
+        if os.path.exists(output_path) and dest_dir == story_dir:
+            continue
+        link_object(entry['sha256'], output_path, store_dir, link)
+        count += 1
+    return count
+
+def export_site(out_dir, store_dir=None):
+    """
+    Copy the site into out_dir with every stored artifact materialized
+
+    Returns:
+        dict: Number of stories exported and artifacts materialized
+    """
+    stats = {'stories': 0, 'artifacts': 0}
+    os.makedirs(out_dir, exist_ok=True)
+    for path in EXPORT_PATHS:
+        if os.path.isdir(path):
+            shutil.copytree(path, os.path.join(out_dir, path), dirs_exist_ok=True,
+                            ignore=shutil.ignore_patterns(MANIFEST_FILE, '*.tmp*'))
+        elif os.path.exists(path):
+            shutil.copy2(path, os.path.join(out_dir, path))
+
+    for manifest in sorted(glob.glob(os.path.join(STORIES_DIR, '*', MANIFEST_FILE))):
+        story_dir = os.path.dirname(manifest)
+        stats['artifacts'] += materialize_story(story_dir, os.path.join(out_dir, story_dir), store_dir)
+        stats['stories'] += 1
+
+    print(f"✅ Exported site to {out_dir} ({stats['stories']} stories, {stats['artifacts']} stored artifacts)")
+    return stats
+
+def collect_garbage(store_dir=None, dry_run=False):
+    """
+    Delete blobs no story manifest references, and synthesis keys that point at them
+
+    Returns:
+        dict: Number of blobs removed and bytes freed
+    """
+    store_dir = store_dir or STORE_DIR
+    referenced = set()
+    for manifest in glob.glob(os.path.join(STORIES_DIR, '*', MANIFEST_FILE)):
+        referenced.update(entry['sha256'] for entry in load_manifest(os.path.dirname(manifest)).values())
+
+    stats = {'removed': 0, 'bytes': 0, 'kept': 0}
+    for path in glob.glob(os.path.join(store_dir, 'objects', '*', '*')):
+        if os.path.basename(path) in referenced:
+            stats['kept'] += 1
+            continue
+        stats['removed'] += 1
+        stats['bytes'] += os.path.getsize(path)
+        if not dry_run:
+            os.remove(path)
+
+    if not dry_run:
+        keys = load_keys(store_dir)
+        live = {key: digest for key, digest in keys.items() if digest in referenced}
+        if live != keys:
+            write_json(os.path.join(store_dir, 'keys.json'), live)
+
+    action = 'Would remove' if dry_run else 'Removed'
+    print(f"🧹 {action} {stats['removed']} unreferenced blobs ({stats['bytes']:,} bytes), kept {stats['kept']}")
+    return stats
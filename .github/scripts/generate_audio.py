@@ -1,7 +1,19 @@
-import openai
 import os
+from html.parser import HTMLParser
 from pathlib import Path
 
+from resilience import call_with_retry
+
+_client = None
+
+def get_client():
+    """Create the OpenAI client on first use so importing this module stays cheap"""
+    global _client
+    if _client is None:
+        import openai
+        _client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+    return _client
+
 def generate_audio_file(text, output_path, model="tts-1", voice="alloy"):
     """
     Generate audio file from text using OpenAI TTS API
@@ -15,22 +27,38 @@ def generate_audio_file(text, output_path, model="tts-1", voice="alloy"):
     Returns:
         bool: True if successful, False otherwise
     """
+    from artifact_store import link_object, lookup_key, record_key, synthesis_key
+    
     try:
-        client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        # Identical narration with the same model and voice is reused from the store
+        key = synthesis_key(model, voice, text)
+        digest = lookup_key(key)
+        if digest:
+            link_object(digest, output_path)
+            print(f"♻️  Audio reused from store: {os.path.basename(output_path)}")
+            return True
+        
+        client = get_client()
         
         print(f"🔊 Generating audio: {os.path.basename(output_path)}")
         
-        response = client.audio.speech.create(
+        response = call_with_retry(
+            client.audio.speech.create,
             model=model,
             voice=voice,
-            input=text
+            input=text,
+            label=f"TTS for {os.path.basename(output_path)}"
         )
         
         # Ensure output directory exists
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         
-        # Save the audio file
-        response.stream_to_file(output_path)
+        # Save the audio file; replacing (not rewriting) the path means a
+        # file that shares an inode with a store blob is never modified
+        tmp_path = f"{output_path}.tmp{os.getpid()}"
+        response.stream_to_file(tmp_path)
+        os.replace(tmp_path, output_path)
+        record_key(key, output_path)
         
         print(f"✅ Audio generated: {os.path.basename(output_path)}")
         return True
@@ -39,15 +67,19 @@ def generate_audio_file(text, output_path, model="tts-1", voice="alloy"):
         print(f"❌ Error generating audio for {os.path.basename(output_path)}: {e}")
         return False
 
-def generate_story_audio(pages, audio_dir, model="tts-1", voice="alloy"):
+def generate_story_audio(pages, audio_dir, model="tts-1", voice="alloy", pages_dir=None, characters=None):
     """
     Generate audio files for all pages in a story
     
     Args:
-        pages: List of page dictionaries with 'narration' text
+        pages: List of page dictionaries from the story structure
         audio_dir: Directory where audio files should be saved
         model: TTS model to use
         voice: Voice to use
+        pages_dir: Optional directory of generated page-NN.html files to
+            read the displayed narration from
+        characters: Optional structure characters; when given, dialogue is
+            voiced per character (see narration.py) and `voice` narrates
     
     Returns:
         dict: Results with success/failure counts and file paths
@@ -61,18 +93,29 @@ def generate_story_audio(pages, audio_dir, model="tts-1", voice="alloy"):
     
     print(f"\n🔊 Generating audio for {len(pages)} pages...")
     
+    page_texts = {}
     for i, page in enumerate(pages, 1):
-        page_num = f"{i:02d}"
+        page_num = f"{int(page.get('page_number', i)):02d}"
         output_path = os.path.join(audio_dir, f"page-{page_num}.mp3")
         
-        # Get narration text from page
-        narration = page.get('narration', '')
+        # Get narration text from the rendered page, falling back to the structure
+        html_content = None
+        if pages_dir:
+            page_file = os.path.join(pages_dir, f"page-{page_num}.html")
+            if os.path.exists(page_file):
+                with open(page_file, 'r', encoding='utf-8') as f:
+                    html_content = f.read()
+        narration = get_page_narration(page, html_content)
         
         if not narration:
             print(f"⚠️  No narration text for page {page_num}, skipping audio generation")
             results['failed'] += 1
             continue
         
+        if characters:
+            page_texts[int(page_num)] = narration
+            continue
+        
         # Generate audio file
         success = generate_audio_file(narration, output_path, model, voice)
         
@@ -82,12 +125,93 @@ def generate_story_audio(pages, audio_dir, model="tts-1", voice="alloy"):
         else:
             results['failed'] += 1
     
+    if page_texts:
+        from narration import narrate_pages
+        
+        narrated = narrate_pages(page_texts, audio_dir, characters, model, voice)
+        results['success'] += narrated['success']
+        results['failed'] += narrated['failed']
+        results['files'].extend(narrated['files'])
+    
     print(f"\n🔊 Audio Generation Complete:")
     print(f"   ✅ Success: {results['success']}/{results['total']}")
     print(f"   ❌ Failed: {results['failed']}/{results['total']}")
     
     return results
 
+class NarrationExtractor(HTMLParser):
+    """
+    Single-pass collector for narration text in a page.
+    
+    Text inside the first element with class "narration-text" is collected,
+    counting nested tags of the same name so inner divs don't end it early.
+    Paragraph text is collected alongside as a fallback. Script and style
+    contents are ignored.
+    """
+    
+    VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+                 'link', 'meta', 'source', 'track', 'wbr'}
+    SKIP_TAGS = {'script', 'style'}
+    
+    def __init__(self):
+        super().__init__()
+        self.narration_parts = []
+        self.paragraph_parts = []
+        self.narration_tag = None
+        self.narration_depth = 0
+        self.narration_done = False
+        self.paragraph_depth = 0
+        self.skip_depth = 0
+    
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self.skip_depth += 1
+            return
+        if tag in self.VOID_TAGS:
+            return
+        
+        if self.narration_tag:
+            if tag == self.narration_tag:
+                self.narration_depth += 1
+        elif not self.narration_done:
+            classes = (dict(attrs).get('class') or '').split()
+            if 'narration-text' in classes:
+                self.narration_tag = tag
+                self.narration_depth = 1
+        
+        if tag == 'p':
+            self.paragraph_depth += 1
+            self.paragraph_parts.append(' ')
+    
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS:
+            self.skip_depth = max(0, self.skip_depth - 1)
+            return
+        
+        if self.narration_tag and tag == self.narration_tag:
+            self.narration_depth -= 1
+            if self.narration_depth == 0:
+                self.narration_tag = None
+                self.narration_done = True
+        
+        if tag == 'p' and self.paragraph_depth:
+            self.paragraph_depth -= 1
+    
+    def handle_data(self, data):
+        if self.skip_depth:
+            return
+        if self.narration_tag:
+            self.narration_parts.append(data)
+        if self.paragraph_depth:
+            self.paragraph_parts.append(data)
+    
+    def get_narration(self):
+        """Return the narration text, or paragraph text if none was marked"""
+        text = ''.join(self.narration_parts)
+        if not text.strip():
+            text = ''.join(self.paragraph_parts)
+        return ' '.join(text.split())
+
 def extract_narration_from_html(html_content):
     """
     Extract narration text from HTML page content
@@ -98,28 +222,26 @@ def extract_narration_from_html(html_content):
     Returns:
         str: Extracted narration text
     """
-    import re
-    
-    # Look for text in narration-text class
-    narration_pattern = r'<div class="narration-text"[^>]*>(.*?)</div>'
-    matches = re.findall(narration_pattern, html_content, re.DOTALL)
-    
-    if matches:
-        # Strip HTML tags and clean up
-        text = matches[0]
-        text = re.sub(r'<[^>]+>', '', text)  # Remove HTML tags
-        text = re.sub(r'\s+', ' ', text)  # Normalize whitespace
-        return text.strip()
-    
-    # Fallback: extract all paragraph text
-    p_pattern = r'<p[^>]*>(.*?)</p>'
-    p_matches = re.findall(p_pattern, html_content, re.DOTALL)
-    
-    if p_matches:
-        text = ' '.join(p_matches)
-        text = re.sub(r'<[^>]+>', '', text)
-        text = re.sub(r'\s+', ' ', text)
-        return text.strip()
-    
-    return ""
+    parser = NarrationExtractor()
+    parser.feed(html_content)
+    parser.close()
+    return parser.get_narration()
 
+def get_page_narration(page, html_content=None):
+    """
+    Resolve the text to narrate for a page
+    
+    Args:
+        page: Page dictionary from the story structure
+        html_content: Optional rendered HTML for the page
+    
+    Returns:
+        str: Explicit 'narration', else the text shown in the HTML,
+            else the structure's 'narrative'
+    """
+    narration = page.get('narration', '')
+    if not narration and html_content:
+        narration = extract_narration_from_html(html_content)
+    if not narration:
+        narration = page.get('narrative', '')
+    return narration.strip()
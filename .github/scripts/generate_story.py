@@ -1,8 +1,10 @@
-import openai
 import os
 import json
 import sys
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
 from datetime import date, datetime
 from pathlib import Path
 
@@ -10,30 +12,57 @@ from pathlib import Path
 script_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, script_dir)
 
-try:
-    from generate_audio import generate_story_audio
-    from validate_story import validate_story
-    print("✅ Helper modules imported successfully")
-except ImportError as e:
-    print(f"⚠️  Warning: Could not import helper modules: {e}")
-    print("Continuing with limited functionality...")
-    
-    def generate_story_audio(pages, audio_dir, **kwargs):
-        return {'total': 0, 'success': 0, 'failed': 0, 'files': []}
-    
-    def validate_story(story_dir):
-        return {'score': 0, 'max_score': 10, 'percentage': 0, 'passing': False, 'issues': [], 'warnings': []}
+from resilience import call_with_retry, CircuitOpenError
+from sprite_library import add_sprite, load_library, lookup, scene_markup, story_descriptors, validate_sprite
+from artifact_store import ingest_story
+from interactive_content import save_activity, validate_activity
+from warmup import retarget_structure, take_warm_start
+from story_navigation import write_navigation
+from story_package import abort_packages, add_artifact, finish_packages, open_packages
+from validate_story import check_artifact, check_structure, validate_story
 
 # Configuration
 MODEL_NAME = "gpt-4"
+FAST_MODEL = os.getenv("STORY_FAST_MODEL", "gpt-4o-mini")
 MIN_PAGES = 5
 MAX_PAGES = 8
 VALIDATION_THRESHOLD = 70
 TTS_MODEL = "tts-1"
 TTS_VOICE = "alloy"
-
-# Initialize OpenAI client
-client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+API_MAX_RETRIES = 4
+API_TIMEOUT = 120  # seconds per request
+API_HEDGE_AFTER = None  # seconds before sending a duplicate request (None = off)
+ON_DUPLICATE = os.getenv("STORY_ON_DUPLICATE", "warn")  # warn, ask, reuse, fork, abort
+LOCALES = [l for l in os.getenv("STORY_LOCALES", "").split(",") if l.strip()]  # e.g. "es,fr,de"
+ARTIFACT_MAX_ATTEMPTS = 3  # per artifact, across tiers; retries include the failed checks
+ARTIFACT_CONCURRENCY = 4  # pages, index and interactive content generated at once
+WARM_START = os.getenv("STORY_WARM_START", "1") != "0"  # use structures cached by warmup.py
+SPRITES = os.getenv("STORY_SPRITES", "1") != "0"  # draw scenes from the shared sprite library
+MULTI_VOICE = os.getenv("STORY_MULTI_VOICE", "1") != "0"  # voice dialogue per character
+PACKAGES = [f.strip() for f in os.getenv("STORY_PACKAGES", "").split(",") if f.strip()]  # e.g. "zip,epub"
+
+# Model tiers tried in order per stage; an artifact only moves to the next
+# tier when it fails its checks, and retries stay on the last tier
+MODEL_TIERS = {"fast": FAST_MODEL, "strong": MODEL_NAME}
+STAGE_TIERS = {
+    "structure": ["strong"],
+    "page": ["fast", "strong"],
+    "index": ["fast", "strong"],
+    "quiz": ["fast", "strong"],
+    "choices": ["fast", "strong"],
+    "games": ["fast", "strong"],
+    "sprite": ["fast", "strong"],
+}
+
+_client = None
+
+def get_client():
+    """Create the OpenAI client on first use (retries are handled by the resilience layer)"""
+    global _client
+    if _client is None:
+        import openai
+        _client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0, timeout=API_TIMEOUT)
+    return _client
 
 def create_slug(text):
     """Convert text to URL-friendly slug"""
@@ -43,25 +72,125 @@ def create_slug(text):
     text = text.strip('-')
     return text[:50]  # Limit length
 
-def call_ai(prompt, system_message=None):
-    """Make an AI API call with error handling"""
+def call_ai(prompt, system_message=None, model=None, temperature=0.7):
+    """Make an AI API call with error handling (model defaults to MODEL_NAME)"""
     messages = []
     if system_message:
         messages.append({"role": "system", "content": system_message})
     messages.append({"role": "user", "content": prompt})
     
     try:
-        response = client.chat.completions.create(
-            model=MODEL_NAME,
+        response = call_with_retry(
+            get_client().chat.completions.create,
+            model=model or MODEL_NAME,
             messages=messages,
-            temperature=0.7
+            temperature=temperature,
+            max_retries=API_MAX_RETRIES,
+            hedge_after=API_HEDGE_AFTER,
+            label="AI call"
         )
         return response.choices[0].message.content, response.usage.total_tokens
+    except CircuitOpenError as e:
+        print(f"❌ Skipping AI call: {e}")
+        return None, 0
     except Exception as e:
         print(f"❌ Error calling AI: {e}")
         return None, 0
 
-def generate_story_structure(topic):
+def with_feedback(prompt, issues):
+    """Append the problems found in a previous attempt to a prompt"""
+    problems = "\n".join(f"- {issue}" for issue in issues)
+    return f"{prompt}\n\nA previous attempt failed these checks. Fix every one of them:\n{problems}"
+
+def call_cascade(stage, prompt, system_message=None, finalize=None, artifact=None, routing=None, temperature=0.7):
+    """
+    Draft an artifact with the cheapest model tier for its stage, escalating on failure
+    
+    Each failed attempt is regenerated with its check results added to the
+    prompt, on the next tier if there is one, up to ARTIFACT_MAX_ATTEMPTS.
+    
+    Args:
+        stage: Key into STAGE_TIERS
+        prompt: User prompt
+        system_message: Optional system prompt
+        finalize: Function turning a raw response into (result, issues)
+        artifact: Name recorded for this artifact (defaults to the stage)
+        routing: Optional list that receives a record of the tier, attempts and latency
+        temperature: Sampling temperature
+    
+    Returns:
+        tuple: (result, tokens used across all attempts); result is the last
+            tier's output even if it still has issues, or None if unusable
+    """
+    artifact = artifact or stage
+    tiers = []
+    for tier in STAGE_TIERS.get(stage, ["strong"]):
+        if MODEL_TIERS[tier] not in [MODEL_TIERS[t] for t in tiers]:
+            tiers.append(tier)
+    
+    schedule = tiers + [tiers[-1]] * max(0, ARTIFACT_MAX_ATTEMPTS - len(tiers))
+    
+    attempts = []
+    result, issues, total_tokens = None, [], 0
+    for i, tier in enumerate(schedule):
+        model = MODEL_TIERS[tier]
+        attempt_prompt = with_feedback(prompt, issues) if issues else prompt
+        start = time.perf_counter()
+        response, tokens = call_ai(attempt_prompt, system_message, model=model, temperature=temperature)
+        latency = time.perf_counter() - start
+        total_tokens += tokens
+        
+        if response:
+            result, issues = finalize(response) if finalize else (response, [])
+        else:
+            result, issues = None, ["no response from model"]
+        attempts.append({'tier': tier, 'model': model, 'latency': round(latency, 2), 'tokens': tokens, 'issues': issues})
+        
+        if result is not None and not issues:
+            break
+        if i + 1 < len(schedule):
+            next_model = MODEL_TIERS[schedule[i + 1]]
+            action = f"escalating to {next_model}" if next_model != model else "regenerating"
+            print(f"  ⤴️  {artifact}: {model} output failed checks ({issues[0]}), {action}")
+    
+    if routing is not None:
+        routing.append({
+            'artifact': artifact,
+            'stage': stage,
+            'tier': attempts[-1]['tier'],
+            'model': attempts[-1]['model'],
+            'attempts': len(attempts),
+            'latency': round(sum(a['latency'] for a in attempts), 2),
+            'tokens': total_tokens,
+            'escalated': any(a['tier'] != attempts[0]['tier'] for a in attempts),
+            'passed': result is not None and not issues,
+            'issues': issues
+        })
+    
+    return result, total_tokens
+
+def strip_code_fences(response, languages=('html',)):
+    """Remove a markdown code fence wrapped around an AI response"""
+    text = response.strip()
+    for language in languages:
+        if text.startswith(f'```{language}'):
+            text = text[text.find('\n') + 1:]
+            break
+    if text.startswith('```'):
+        text = text[3:]
+    if text.endswith('```'):
+        text = text[:-3]
+    return text.strip()
+
+def parse_json_response(response):
+    """Parse the JSON object in an AI response, ignoring any surrounding text"""
+    json_start = response.find('{')
+    json_end = response.rfind('}') + 1
+    if json_start >= 0 and json_end > json_start:
+        return json.loads(response[json_start:json_end])
+    return json.loads(response)
+
+def generate_story_structure(topic, routing=None):
     """Stage 1: Generate story structure from topic"""
     print(f"\n{'='*60}")
     print(f"STAGE 1: Generating Story Structure")
@@ -78,7 +207,7 @@ Your output must be valid JSON with this exact structure:
 {{
   "title": "Story title",
   "characters": [
-    {{"name": "Character Name", "description": "Brief description", "role": "main/supporting"}}
+    {{"name": "Character Name", "description": "Brief description", "role": "main/supporting", "pronouns": "he/she/they"}}
   ],
   "settings": [
     {{"name": "Location name", "description": "Visual description"}}
@@ -107,36 +236,37 @@ Requirements:
 
 Output ONLY the JSON, no additional text or explanation."""
 
-    response, tokens = call_ai(prompt, system_message)
+    def finalize(response):
+        try:
+            structure = parse_json_response(response)
+        except json.JSONDecodeError as e:
+            print(f"❌ Failed to parse JSON response: {e}")
+            print(f"Response was: {response[:500]}")
+            return None, [f"response was not valid JSON: {e}"]
+        return structure, check_structure(structure)
+    
+    structure, tokens = call_cascade('structure', prompt, system_message, finalize,
+                                     artifact="structure.json", routing=routing)
     
-    if not response:
+    if not structure or check_structure(structure):
         raise Exception("Failed to generate story structure")
     
-    # Extract JSON from response
-    try:
-        # Try to find JSON in the response
-        json_start = response.find('{')
-        json_end = response.rfind('}') + 1
-        if json_start >= 0 and json_end > json_start:
-            json_str = response[json_start:json_end]
-            structure = json.loads(json_str)
-        else:
-            structure = json.loads(response)
-        
-        print(f"✅ Story structure generated: {structure['title']}")
-        print(f"   - Characters: {len(structure['characters'])}")
-        print(f"   - Settings: {len(structure['settings'])}")
-        print(f"   - Pages: {len(structure['pages'])}")
-        print(f"   - Tokens used: {tokens}")
-        
-        return structure, tokens
-    except json.JSONDecodeError as e:
-        print(f"❌ Failed to parse JSON response: {e}")
-        print(f"Response was: {response[:500]}")
-        raise
+    print(f"✅ Story structure generated: {structure['title']}")
+    print(f"   - Characters: {len(structure['characters'])}")
+    print(f"   - Settings: {len(structure['settings'])}")
+    print(f"   - Pages: {len(structure['pages'])}")
+    print(f"   - Tokens used: {tokens}")
+    
+    return structure, tokens
 
-def generate_page_html(page_data, story_structure, page_number, total_pages):
-    """Stage 2: Generate HTML for a single page"""
+def generate_page_html(page_data, story_structure, page_number, total_pages, routing=None, scene=None):
+    """
+    Stage 2: Generate HTML for a single page
+    
+    Args:
+        scene: Ready-made scene markup from the sprite library; when given,
+            the page uses it instead of drawing the scene itself
+    """
     print(f"\n  📄 Generating page {page_number}/{total_pages}...")
     
     system_message = "You are an expert in creating accessible, visual HTML pages for social stories."
@@ -144,6 +274,13 @@ def generate_page_html(page_data, story_structure, page_number, total_pages):
     characters_info = "\n".join([f"- {c['name']}: {c['description']}" for c in story_structure['characters']])
     settings_info = "\n".join([f"- {s['name']}: {s['description']}" for s in story_structure['settings']])
     
+    if scene:
+        visual = "A visual section containing the scene markup above exactly as given (do not redraw the characters or setting; you may style .sprite-scene, e.g. its background and border)"
+        scene_info = f"\nScene markup (characters and setting from the shared sprite library):\n{scene}\n"
+    else:
+        visual = "A visual section with CSS-styled elements representing the scene (use div elements with colors, shapes, borders to create simple character and setting representations)"
+        scene_info = ""
+    
     prompt = f"""Create an HTML page for this social story page.
 
 Story Title: {story_structure['title']}
@@ -161,50 +298,164 @@ Page Details:
 - Narrative: {page_data['narrative']}
 - Visual Description: {page_data['visual_description']}
 - Teaching Point: {page_data['teaching_point']}
-
+{scene_info}
 Create a complete, self-contained HTML page with:
 1. Semantic HTML5 structure
-2. A visual section with CSS-styled elements representing the scene (use div elements with colors, shapes, borders to create simple character and setting representations)
+2. {visual}
 3. The narrative text in a clearly readable format
 4. Navigation buttons (Previous/Next)
 5. Accessibility features (ARIA labels, semantic tags, alt text)
 6. Print-friendly CSS (@media print)
 7. Responsive design
-8. Audio playback controls (for page-{page_number:02d}.mp3)
+8. Audio playback controls: load ../../../shared/reader.js and call createReaderControls('audio-controls-container', narrationText, '../audio/page-{page_number:02d}.mp3') for an empty <div id="audio-controls-container">; the shared reader also prefetches the next page and its audio
 9. Links to interactive elements
 
 The page should be visually calming with good contrast and clear fonts.
 
 Output ONLY the complete HTML, no explanations or markdown formatting."""
 
-    response, tokens = call_ai(prompt, system_message)
+    artifact = f"pages/page-{page_number:02d}.html"
     
-    if not response:
-        return None, 0
+    def finalize(response):
+        html = strip_code_fences(response)
+        issues = check_artifact(artifact, html)
+        if scene and 'shared/sprites/' not in html:
+            issues.append("page does not include the given scene markup")
+        return html, issues
+    
+    html, tokens = call_cascade('page', prompt, system_message, finalize, artifact=artifact, routing=routing)
     
-    # Clean up response
-    html = response.strip()
-    if html.startswith('```html'):
-        html = html[7:]
-    if html.startswith('```'):
-        html = html[3:]
-    if html.endswith('```'):
-        html = html[:-3]
-    html = html.strip()
+    if not html:
+        return None, tokens
     
     print(f"  ✅ Page {page_number} generated ({len(html)} chars, {tokens} tokens)")
     
     return html, tokens
 
-def generate_interactive_quiz(story_structure):
-    """Stage 3a: Generate quiz questions"""
-    print(f"\n  🎯 Generating quiz module...")
+def generate_sprite(descriptor, description, routing=None):
+    """
+    Draw a character or setting for the shared sprite library
+    
+    Args:
+        descriptor: Library descriptor, e.g. 'character:mom' or 'setting:dentist-office'
+        description: What the first story to need it says about it
+        routing: Optional list that receives the model routing record
+    
+    Returns:
+        tuple: (SVG text or None, tokens used)
+    """
+    kind, name = descriptor.split(':', 1)
+    print(f"\n  🎨 Drawing {kind} sprite '{name}'...")
+    
+    system_message = "You are an illustrator drawing simple, calm, flat SVG artwork for children's social stories."
+    
+    if kind == 'character':
+        subject = f"""a full-body, front-facing {name.replace('-', ' ')} character standing on the bottom edge.
+Fill skin, hair, clothing and details with CSS custom properties so each story can recolor the character:
+style="fill: var(--skin, #f1c27d)", var(--hair, #4a3728), var(--outfit, #5b8def) and var(--accent, #ffffff).
+Leave the background transparent."""
+    else:
+        subject = f"""a {name.replace('-', ' ')} as a full background scene filling the whole 100x100 area,
+with no people in it."""
+    
+    prompt = f"""Draw {subject}
+
+It should fit this description wherever it appears: {description}
+
+Output a single SVG document:
+<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 100 100"><symbol id="sprite" viewBox="0 0 100 100">...</symbol></svg>
+
+Rules:
+- Simple flat shapes (rect, circle, ellipse, path, polygon) and soft, low-contrast colors
+- No text, no scripts, no event handlers, no <image> or <foreignObject>, no external references
+- Keep it small: a few dozen shapes at most
+
+Output ONLY the SVG, no explanations or markdown formatting."""
+    
+    def finalize(response):
+        svg = strip_code_fences(response, ('svg', 'xml', 'html'))
+        return svg, validate_sprite(svg)
+    
+    svg, tokens = call_cascade('sprite', prompt, system_message, finalize,
+                               artifact=f"sprites/{kind}-{name}", routing=routing, temperature=0.5)
+    if svg and validate_sprite(svg):
+        return None, tokens
+    return svg, tokens
+
+def prepare_sprites(story_structure, routing=None, library_lock=None):
+    """
+    Make sure the sprite library has every character and setting of a story
+    
+    Only descriptors missing from the library are drawn, so recurring
+    characters and settings are generated once across all stories.
+    
+    Args:
+        story_structure: Stage 1 structure
+        routing: Optional list that receives model routing records
+        library_lock: Optional context manager held while updating
+            shared/sprites/library.json (needed when several processes
+            generate stories at once)
+    
+    Returns:
+        tuple: ({descriptor: sprite file}, tokens used)
+    """
+    needed = story_descriptors(story_structure)
+    missing = {d: text for d, text in needed.items() if not lookup(d)}
+    print(f"\n🎨 Sprites: {len(needed) - len(missing)}/{len(needed)} from the library, drawing {len(missing)}")
+    
+    total_tokens = 0
+    drawn = {}
+    with ThreadPoolExecutor(max_workers=ARTIFACT_CONCURRENCY) as executor:
+        futures = {executor.submit(generate_sprite, d, text, routing=routing): d for d, text in missing.items()}
+        for future in as_completed(futures):
+            descriptor = futures[future]
+            svg, tokens = future.result()
+            total_tokens += tokens
+            if svg:
+                drawn[descriptor] = svg
+            else:
+                print(f"  ⚠️  No usable sprite for {descriptor}; pages will draw it themselves")
+    
+    # Recorded together so the lock is only held for the library update
+    if drawn:
+        with library_lock if library_lock is not None else nullcontext():
+            for descriptor, svg in drawn.items():
+                add_sprite(descriptor, svg, missing[descriptor])
+    
+    library = load_library()
+    return {d: library[d]['file'] for d in needed if d in library}, total_tokens
+
+def parse_activity(name, response):
+    """
+    Parse and schema-check AI output for an interactive activity
+    
+    Returns:
+        tuple: (content or None, list of schema problems)
+    """
+    try:
+        data = parse_json_response(response)
+    except json.JSONDecodeError as e:
+        print(f"  ❌ {name.capitalize()} response was not valid JSON: {e}")
+        return None, [f"response was not valid JSON: {e}"]
+    
+    issues = validate_activity(name, data)
+    if issues:
+        print(f"  ❌ {name.capitalize()} content failed schema checks:")
+        for issue in issues:
+            print(f"     - {issue}")
+        return None, issues
+    
+    return data, []
+
+def generate_interactive_quiz(story_structure, routing=None):
+    """Stage 3a: Generate quiz questions as JSON for the shared engine"""
+    print(f"\n  🎯 Generating quiz content...")
     
     system_message = "You are an expert in creating educational quizzes for children."
     
     pages_summary = "\n".join([f"Page {p['page_number']}: {p['narrative']}" for p in story_structure['pages']])
     
-    prompt = f"""Create an interactive quiz JavaScript module for this social story.
+    prompt = f"""Write quiz questions for this social story.
 
 Story: {story_structure['title']}
 
@@ -214,132 +465,87 @@ Story Summary:
 Learning Objectives:
 {', '.join(story_structure['learning_objectives'])}
 
-Create a quiz.js file with:
-1. 3-5 multiple choice questions about the story
-2. Questions should test comprehension and reinforce learning objectives
-3. Visual feedback for correct/incorrect answers
-4. Score tracking
-5. Encouraging messages
-6. Replay functionality
+Write 3-5 multiple choice questions that test comprehension and reinforce the
+learning objectives. Use simple, encouraging language.
 
-The module should be callable with: initQuiz(containerId)
+Output ONLY compact JSON in this format:
+{{"questions": [{{"question": "...", "options": ["...", "...", "..."], "correct": 0, "explanation": "..."}}]}}
 
-Output ONLY the JavaScript code, no markdown formatting or explanations."""
+"correct" is the zero-based index of the right option."""
 
-    response, tokens = call_ai(prompt, system_message)
-    
-    if not response:
-        return None, 0
-    
-    # Clean up
-    js = response.strip()
-    if js.startswith('```javascript') or js.startswith('```js'):
-        js = js[js.find('\n')+1:]
-    if js.startswith('```'):
-        js = js[3:]
-    if js.endswith('```'):
-        js = js[:-3]
-    js = js.strip()
-    
-    print(f"  ✅ Quiz generated ({len(js)} chars, {tokens} tokens)")
+    quiz, tokens = call_cascade('quiz', prompt, system_message,
+                                 lambda response: parse_activity('quiz', response),
+                                 artifact="interactive/quiz.json", routing=routing)
+    if quiz:
+        print(f"  ✅ Quiz generated ({len(quiz['questions'])} questions, {tokens} tokens)")
     
-    return js, tokens
+    return quiz, tokens
 
-def generate_interactive_choices(story_structure):
-    """Stage 3b: Generate choice-based interactions"""
-    print(f"\n  🎯 Generating choices module...")
+def generate_interactive_choices(story_structure, routing=None):
+    """Stage 3b: Generate choice-based scenarios as JSON for the shared engine"""
+    print(f"\n  🎯 Generating choices content...")
     
     system_message = "You are an expert in creating interactive educational experiences."
     
     pages_summary = "\n".join([f"Page {p['page_number']}: {p['narrative']}" for p in story_structure['pages']])
     
-    prompt = f"""Create an interactive choices JavaScript module for this social story.
+    prompt = f"""Write decision-point scenarios for this social story.
 
 Story: {story_structure['title']}
 
 Story Summary:
 {pages_summary}
 
-Create a choices.js file with:
-1. 2-3 decision point scenarios from the story
-2. Each scenario presents options for what the character could do
-3. Show outcomes/consequences for each choice
-4. Educational explanations for why certain choices are better
-5. "Try again" functionality
-6. Supportive, non-judgmental feedback
+Write 2-3 scenarios from the story. Each presents 2-3 options for what the
+character could do, with supportive, non-judgmental feedback explaining why
+a choice helps or what might work better. Every scenario needs at least one
+helpful choice.
 
-The module should be callable with: initChoices(containerId)
+Output ONLY compact JSON in this format:
+{{"scenarios": [{{"situation": "...", "choices": [{{"text": "...", "feedback": "...", "helpful": true}}]}}], "completion_message": "..."}}"""
 
-Output ONLY the JavaScript code, no markdown formatting or explanations."""
-
-    response, tokens = call_ai(prompt, system_message)
-    
-    if not response:
-        return None, 0
-    
-    # Clean up
-    js = response.strip()
-    if js.startswith('```javascript') or js.startswith('```js'):
-        js = js[js.find('\n')+1:]
-    if js.startswith('```'):
-        js = js[3:]
-    if js.endswith('```'):
-        js = js[:-3]
-    js = js.strip()
-    
-    print(f"  ✅ Choices generated ({len(js)} chars, {tokens} tokens)")
+    choices, tokens = call_cascade('choices', prompt, system_message,
+                                 lambda response: parse_activity('choices', response),
+                                 artifact="interactive/choices.json", routing=routing)
+    if choices:
+        print(f"  ✅ Choices generated ({len(choices['scenarios'])} scenarios, {tokens} tokens)")
     
-    return js, tokens
+    return choices, tokens
 
-def generate_interactive_games(story_structure):
-    """Stage 3c: Generate mini-games"""
-    print(f"\n  🎯 Generating games module...")
+def generate_interactive_games(story_structure, routing=None):
+    """Stage 3c: Generate mini-game content as JSON for the shared engine"""
+    print(f"\n  🎯 Generating games content...")
     
     system_message = "You are an expert in creating educational games for children."
     
     characters = [c['name'] for c in story_structure['characters']]
     key_events = [p['narrative'] for p in story_structure['pages']]
     
-    prompt = f"""Create an interactive games JavaScript module for this social story.
+    prompt = f"""Write content for two mini-games about this social story.
 
 Story: {story_structure['title']}
 Characters: {', '.join(characters)}
 
-Create a games.js file with 2 mini-games:
-1. Character Matching: Match character names to descriptions
-2. Event Sequencing: Put story events in correct order
+Story Events:
+{chr(10).join(f"- {event}" for event in key_events)}
 
-Features:
-- Simple, intuitive drag-and-drop or click-based interactions
-- Visual feedback for correct/incorrect
-- Encouraging messages
-- Reset/replay functionality
-- Accessible keyboard controls
+1. Character Matching: pair each character with a short description
+2. Event Sequencing: 4-6 key story events, numbered in story order from 1
 
-The module should be callable with: initGames(containerId)
+Output ONLY compact JSON in this format:
+{{"matching": {{"title": "Match the Characters", "pairs": [{{"character": "...", "description": "..."}}]}},
+ "sequencing": {{"title": "What Happened First?", "events": [{{"order": 1, "text": "..."}}]}}}}"""
 
-Output ONLY the JavaScript code, no markdown formatting or explanations."""
-
-    response, tokens = call_ai(prompt, system_message)
-    
-    if not response:
-        return None, 0
-    
-    # Clean up
-    js = response.strip()
-    if js.startswith('```javascript') or js.startswith('```js'):
-        js = js[js.find('\n')+1:]
-    if js.startswith('```'):
-        js = js[3:]
-    if js.endswith('```'):
-        js = js[:-3]
-    js = js.strip()
-    
-    print(f"  ✅ Games generated ({len(js)} chars, {tokens} tokens)")
+    games, tokens = call_cascade('games', prompt, system_message,
+                                 lambda response: parse_activity('games', response),
+                                 artifact="interactive/games.json", routing=routing)
+    if games:
+        print(f"  ✅ Games generated ({len(games['matching']['pairs'])} pairs, "
+              f"{len(games['sequencing']['events'])} events, {tokens} tokens)")
     
-    return js, tokens
+    return games, tokens
 
-def generate_story_index(story_structure, story_dir, page_count):
+def generate_story_index(story_structure, story_dir, page_count, routing=None):
     """Generate main index.html for the story"""
     print(f"\n  📄 Generating story index...")
     
@@ -354,10 +560,12 @@ Learning Objectives: {', '.join(story_structure['learning_objectives'])}
 The index page should include:
 1. Story title and brief description
 2. Navigation to all pages (page-01.html through page-{page_count:02d}.html)
-3. Links to interactive elements:
-   - Quiz (loads interactive/quiz.js)
-   - Choices (loads interactive/choices.js)
-   - Games (loads interactive/games.js)
+3. Interactive activities, rendered by the shared engine:
+   - Load it with <script src="../../shared/interactive.js"></script>
+   - Quiz: <div id="quiz-container" data-src="interactive/quiz.json"></div>
+   - Choices: <div id="choices-container" data-src="interactive/choices.json"></div>
+   - Games: <div id="games-container" data-src="interactive/games.json"></div>
+   - Do not write any quiz, choices or games logic yourself
 4. Reading mode options:
    - Sequential reading (start at page 1)
    - Free navigation (jump to any page)
@@ -367,20 +575,15 @@ The index page should include:
 
 Output ONLY the complete HTML, no explanations or markdown formatting."""
 
-    response, tokens = call_ai(prompt, system_message)
+    def finalize(response):
+        html = strip_code_fences(response)
+        return html, check_artifact("index.html", html)
     
-    if not response:
-        return None, 0
+    html, tokens = call_cascade('index', prompt, system_message, finalize,
+                                artifact="index.html", routing=routing)
     
-    # Clean up
-    html = response.strip()
-    if html.startswith('```html'):
-        html = html[7:]
-    if html.startswith('```'):
-        html = html[3:]
-    if html.endswith('```'):
-        html = html[:-3]
-    html = html.strip()
+    if not html:
+        return None, tokens
     
     print(f"  ✅ Index generated ({len(html)} chars, {tokens} tokens)")
     
@@ -399,7 +602,7 @@ def enhance_story(story_structure, generated_files):
     print("✅ Enhancement complete (skipped for efficiency)")
     return 0
 
-def save_metadata(story_dir, story_structure, topic, slug, tokens_used, validation_result):
+def save_metadata(story_dir, story_structure, topic, slug, tokens_used, validation_result, extra=None):
     """Save story metadata as JSON and Markdown"""
     today = date.today().isoformat()
     
@@ -420,12 +623,17 @@ def save_metadata(story_dir, story_structure, topic, slug, tokens_used, validati
         "tts_model": TTS_MODEL,
         "tts_voice": TTS_VOICE
     }
+    metadata.update(extra or {})
     
     # Save JSON
     with open(os.path.join(story_dir, 'story.json'), 'w', encoding='utf-8') as f:
         json.dump(metadata, f, indent=2)
     
     # Save Markdown
+    pages_markdown = "\n".join([
+        f"### Page {p['page_number']}: {p['setting']}\n\n{p['narrative']}\n\n**Teaching Point:** {p['teaching_point']}\n"
+        for p in story_structure['pages']
+    ])
     markdown_content = f"""# {story_structure['title']}
 
 ## Metadata
@@ -454,7 +662,7 @@ def save_metadata(story_dir, story_structure, topic, slug, tokens_used, validati
 
 ## Story Pages
 
-{chr(10).join([f"### Page {p['page_number']}: {p['setting']}\n\n{p['narrative']}\n\n**Teaching Point:** {p['teaching_point']}\n" for p in story_structure['pages']])}
+{pages_markdown}
 
 ## Validation Results
 
@@ -474,10 +682,12 @@ def save_metadata(story_dir, story_structure, topic, slug, tokens_used, validati
 - `index.html` - Main story page
 - `pages/page-*.html` - Individual story pages
 - `audio/page-*.mp3` - Audio narration
-- `interactive/quiz.js` - Quiz questions
-- `interactive/choices.js` - Choice-based interactions
-- `interactive/games.js` - Mini-games
+- `interactive/quiz.json` - Quiz questions
+- `interactive/choices.json` - Choice-based scenarios
+- `interactive/games.json` - Mini-game content (rendered by `shared/interactive.js`)
+- `artifacts.json` - Stored artifacts (audio) and their hashes in the shared store
 - `story.json` - Machine-readable metadata
+- `structure.json` - Stage 1 story structure (reused by forks)
 - `story.md` - This documentation
 """
     
@@ -515,13 +725,122 @@ def update_stories_index(story_dir, story_structure, topic, slug):
     
     print(f"✅ Updated stories/index.json")
 
-def main():
-    """Main generation pipeline"""
-    # Get topic from command line or environment
-    if len(sys.argv) > 1:
-        topic = ' '.join(sys.argv[1:])
-    else:
-        topic = os.getenv('STORY_TOPIC', 'A child goes to school for the first time')
+def claim_story_dir(story_dir, job_id):
+    """
+    Create a story directory no other job is writing to
+    
+    Directories are named by date and topic, so two jobs for the same topic
+    on the same day would share one. The directory is claimed with an atomic
+    mkdir; if it already exists, this job's id is appended. Callers record
+    the directory claimed (see run_pipeline's on_story_dir) so a retry of the
+    job continues in it instead of claiming another one.
+    
+    Returns:
+        str: The directory claimed
+    """
+    os.makedirs(os.path.dirname(story_dir), exist_ok=True)
+    try:
+        os.mkdir(story_dir)
+        return story_dir
+    except FileExistsError:
+        story_dir = f"{story_dir}-job{job_id}"
+        os.makedirs(story_dir, exist_ok=True)
+        return story_dir
+
+def save_structure(story_dir, story_structure):
+    """Save the Stage 1 structure so later runs can reuse or fork it"""
+    with open(os.path.join(story_dir, 'structure.json'), 'w', encoding='utf-8') as f:
+        json.dump(story_structure, f, indent=2)
+
+def load_structure(story_dir):
+    """Load a saved Stage 1 structure, or None if the story predates structure.json"""
+    path = os.path.join(story_dir, 'structure.json')
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def check_for_duplicates(topic, on_duplicate=ON_DUPLICATE):
+    """
+    Pre-generation dedup: look for existing stories on the same theme
+    
+    Args:
+        topic: Requested story topic
+        on_duplicate: What to do with a near-duplicate: 'warn' (generate anyway),
+            'ask' (prompt), 'reuse' (return the existing story), 'fork' (reuse
+            its structure for a new story) or 'abort'
+    
+    Returns:
+        tuple: (action, match) where action is 'generate', 'reuse' or 'fork'
+    """
+    from story_dedup import find_similar_stories
+    
+    matches = find_similar_stories(topic)
+    if not matches:
+        return 'generate', None
+    
+    print(f"\n🔎 Found {len(matches)} similar existing story(ies):")
+    for match in matches:
+        print(f"   - {match['title']} ({match['path']}): {match['similarity']:.0%} similar by {match['matched_on']}")
+    best = matches[0]
+    
+    action = on_duplicate
+    if action == 'ask':
+        answer = input("Reuse [r], fork its structure [f], generate anyway [g] or abort [a]? ").strip().lower()
+        action = {'r': 'reuse', 'f': 'fork', 'a': 'abort'}.get(answer[:1], 'generate')
+    
+    if action == 'abort':
+        raise Exception(f"Topic duplicates existing story: {best['path']}")
+    if action == 'fork' and load_structure(best['story_dir']) is None:
+        print(f"⚠️  {best['path']} has no saved structure.json, generating from scratch")
+        action = 'generate'
+    if action not in ('reuse', 'fork'):
+        action = 'generate'
+    
+    return action, best
+
+def reuse_existing_story(match):
+    """Build a pipeline result for an existing story instead of generating"""
+    with open(os.path.join(match['story_dir'], 'story.json'), 'r', encoding='utf-8') as f:
+        metadata = json.load(f)
+    
+    print(f"♻️  Reusing existing story: {match['story_dir']}")
+    return {
+        'story_dir': match['story_dir'],
+        'title': metadata['title'],
+        'pages': metadata['pages'],
+        'tokens': 0,
+        'audio': None,
+        'validation': metadata.get('validation') or validate_story(match['story_dir']),
+        'reused': True
+    }
+
+def run_pipeline(topic, progress=None, index_lock=None, on_duplicate=ON_DUPLICATE, job_id=None, sprite_lock=None,
+                 story_dir=None, on_story_dir=None):
+    """
+    Run the full generation pipeline for one topic
+    
+    Args:
+        topic: Story topic text
+        progress: Optional callback progress(stage, fraction) for reporting
+        index_lock: Optional context manager held while updating stories/index.json
+        on_duplicate: Dedup policy passed to check_for_duplicates()
+        sprite_lock: Optional context manager held while adding to the sprite library
+        job_id: Queue job id; when set, the story directory is claimed so
+            concurrent jobs for the same topic don't overwrite each other
+        story_dir: Directory claimed by an earlier attempt of the same job,
+            reused instead of claiming a new one
+        on_story_dir: Optional callback on_story_dir(path), called as soon as
+            the story directory is known
+    
+    Returns:
+        dict: story_dir, title, pages, tokens, audio results and validation result
+    """
+    from generate_audio import generate_story_audio
+    
+    def report(stage, fraction):
+        if progress:
+            progress(stage, fraction)
     
     print(f"\n{'='*60}")
     print(f"AI SOCIAL STORY GENERATOR")
@@ -531,115 +850,237 @@ def main():
     print(f"{'='*60}\n")
     
     total_tokens = 0
+    extra_metadata = {}
+    routing = []
     
-    try:
-        # Stage 1: Generate story structure
-        story_structure, tokens = generate_story_structure(topic)
+    # Check the library for near-duplicate topics before spending tokens
+    report('dedup', 0.0)
+    action, match = check_for_duplicates(topic, on_duplicate)
+    if action == 'reuse':
+        report('done', 1.0)
+        return reuse_existing_story(match)
+    
+    # Stage 1: Generate story structure
+    report('structure', 0.0)
+    warm = None
+    story_structure = None
+    if action == 'fork':
+        # The matched story's characters are re-cast with this topic's names and pronouns
+        story_structure = retarget_structure(load_structure(match['story_dir']), match.get('topic', ''), topic)
+        if story_structure:
+            print(f"🍴 Forking structure from {match['story_dir']}")
+            extra_metadata['forked_from'] = match['path']
+        else:
+            print(f"⚠️  {match['story_dir']} has no characters matching this topic; generating a new structure")
+    elif WARM_START and (warm := take_warm_start(topic)):
+        # A cached structure for this theme was generated during idle time
+        story_structure = warm['structure']
+        extra_metadata['warm_start'] = warm['family']
+    if story_structure is None:
+        story_structure, tokens = generate_story_structure(topic, routing=routing)
         total_tokens += tokens
-        
-        # Create story directory
-        today = date.today().isoformat()
-        slug = create_slug(topic)
+    
+    # Create story directory
+    today = date.today().isoformat()
+    slug = create_slug(topic)
+    if not story_dir:
         story_dir = f"stories/{today}-{slug}"
-        os.makedirs(story_dir, exist_ok=True)
-        os.makedirs(f"{story_dir}/pages", exist_ok=True)
-        os.makedirs(f"{story_dir}/audio", exist_ok=True)
-        os.makedirs(f"{story_dir}/interactive", exist_ok=True)
-        
-        print(f"\n📁 Created story directory: {story_dir}")
-        
-        # Stage 2: Generate page HTML files
-        print(f"\n{'='*60}")
-        print(f"STAGE 2: Generating Page Content")
-        print(f"{'='*60}")
-        
-        pages = story_structure['pages']
-        for page_data in pages:
-            page_num = page_data['page_number']
-            html, tokens = generate_page_html(page_data, story_structure, page_num, len(pages))
-            total_tokens += tokens
-            
-            if html:
-                page_file = f"{story_dir}/pages/page-{page_num:02d}.html"
-                with open(page_file, 'w', encoding='utf-8') as f:
-                    f.write(html)
-        
-        # Generate story index
-        index_html, tokens = generate_story_index(story_structure, story_dir, len(pages))
+        if job_id is not None:
+            story_dir = claim_story_dir(story_dir, job_id)
+    os.makedirs(story_dir, exist_ok=True)
+    if on_story_dir:
+        on_story_dir(story_dir)
+    os.makedirs(f"{story_dir}/pages", exist_ok=True)
+    os.makedirs(f"{story_dir}/audio", exist_ok=True)
+    os.makedirs(f"{story_dir}/interactive", exist_ok=True)
+    
+    save_structure(story_dir, story_structure)
+    
+    print(f"\n📁 Created story directory: {story_dir}")
+    
+    # Characters and settings come from the shared sprite library, drawing
+    # only the ones no earlier story needed
+    scenes = {}
+    if SPRITES:
+        report('sprites', 0.05)
+        sprites, tokens = prepare_sprites(story_structure, routing=routing, library_lock=sprite_lock)
         total_tokens += tokens
-        if index_html:
-            with open(f"{story_dir}/index.html", 'w', encoding='utf-8') as f:
-                f.write(index_html)
-        
-        # Stage 3: Generate interactive elements
+        extra_metadata['sprites'] = sprites
+        library = load_library()
+        for page_data in story_structure['pages']:
+            scenes[page_data['page_number']] = scene_markup(page_data, story_structure, library)
+    
+    # Single-file packages are fed each artifact as it is produced, and
+    # their partial files are removed if the run fails
+    packages = open_packages(story_dir, story_structure, PACKAGES) if PACKAGES else []
+    try:
+    
+        # Stages 2-3: Pages, index and interactive content only depend on the
+        # structure, so they are generated concurrently. Each artifact is checked
+        # as soon as it is produced and regenerated on its own if it fails, while
+        # the others keep going.
         print(f"\n{'='*60}")
-        print(f"STAGE 3: Generating Interactive Elements")
+        print(f"STAGES 2-3: Generating Pages and Interactive Elements")
         print(f"{'='*60}")
+    
+        pages = story_structure['pages']
+        activity_generators = {
+            'quiz': generate_interactive_quiz,
+            'choices': generate_interactive_choices,
+            'games': generate_interactive_games,
+        }
+    
+        report('artifacts', 0.1)
+        with ThreadPoolExecutor(max_workers=ARTIFACT_CONCURRENCY) as executor:
+            tasks = {}
+            for page_data in pages:
+                page_num = page_data['page_number']
+                future = executor.submit(generate_page_html, page_data, story_structure, page_num, len(pages),
+                                         routing=routing, scene=scenes.get(page_num))
+                tasks[future] = f"pages/page-{page_num:02d}.html"
+            future = executor.submit(generate_story_index, story_structure, story_dir, len(pages), routing=routing)
+            tasks[future] = "index.html"
+            for name, generate_activity in activity_generators.items():
+                if warm and name in warm['activities']:
+                    save_activity(story_dir, name, warm['activities'][name])
+                    add_artifact(packages, f"interactive/{name}.json",
+                                 data=json.dumps(warm['activities'][name], indent=2, ensure_ascii=False))
+                    continue
+                tasks[executor.submit(generate_activity, story_structure, routing=routing)] = f"interactive/{name}.json"
         
-        quiz_js, tokens = generate_interactive_quiz(story_structure)
-        total_tokens += tokens
-        if quiz_js:
-            with open(f"{story_dir}/interactive/quiz.js", 'w', encoding='utf-8') as f:
-                f.write(quiz_js)
-        
-        choices_js, tokens = generate_interactive_choices(story_structure)
-        total_tokens += tokens
-        if choices_js:
-            with open(f"{story_dir}/interactive/choices.js", 'w', encoding='utf-8') as f:
-                f.write(choices_js)
-        
-        games_js, tokens = generate_interactive_games(story_structure)
-        total_tokens += tokens
-        if games_js:
-            with open(f"{story_dir}/interactive/games.js", 'w', encoding='utf-8') as f:
-                f.write(games_js)
-        
+            for done, future in enumerate(as_completed(tasks), 1):
+                relative = tasks[future]
+                content, tokens = future.result()
+                total_tokens += tokens
+                report('artifacts', 0.1 + 0.6 * done / len(tasks))
+            
+                if not content:
+                    continue
+                if relative.startswith('interactive/'):
+                    save_activity(story_dir, os.path.splitext(os.path.basename(relative))[0], content)
+                    add_artifact(packages, relative, data=json.dumps(content, indent=2, ensure_ascii=False))
+                else:
+                    with open(os.path.join(story_dir, relative), 'w', encoding='utf-8') as f:
+                        f.write(content)
+                    add_artifact(packages, relative, data=content)
+    
         # Stage 4: Generate audio files
         print(f"\n{'='*60}")
         print(f"STAGE 4: Generating Audio Files")
         print(f"{'='*60}")
-        
+    
+        report('audio', 0.75)
         audio_results = generate_story_audio(
             pages,
             f"{story_dir}/audio",
             model=TTS_MODEL,
-            voice=TTS_VOICE
+            voice=TTS_VOICE,
+            pages_dir=f"{story_dir}/pages",
+            characters=story_structure.get('characters') if MULTI_VOICE else None
         )
+        for audio_path in audio_results['files']:
+            add_artifact(packages, f"audio/{os.path.basename(audio_path)}", path=audio_path)
+    
+        # Stage 4b: Translations and per-locale audio, sharing this story's structure
+        if LOCALES:
+            from localize_story import localize_story
         
+            report('localization', 0.8)
+            localization = localize_story(story_dir, LOCALES, tts_model=TTS_MODEL, tts_voice=TTS_VOICE)
+            total_tokens += localization['tokens']
+            extra_metadata['locales'] = sorted(localization['locales'])
+    
         # Stage 5: Enhancement (optional)
         enhancement_tokens = enhance_story(story_structure, {})
         total_tokens += enhancement_tokens
-        
+    
         # Validate the generated story
         print(f"\n{'='*60}")
         print(f"VALIDATION")
         print(f"{'='*60}")
-        
+    
+        report('validation', 0.9)
         validation_result = validate_story(story_dir)
-        
+    
         # Save metadata
         print(f"\n{'='*60}")
         print(f"SAVING METADATA")
         print(f"{'='*60}")
-        
-        save_metadata(story_dir, story_structure, topic, slug, total_tokens, validation_result)
-        update_stories_index(story_dir, story_structure, topic, slug)
-        
-        # Final summary
-        print(f"\n{'='*60}")
-        print(f"GENERATION COMPLETE")
-        print(f"{'='*60}")
-        print(f"✅ Story: {story_structure['title']}")
-        print(f"✅ Location: {story_dir}")
-        print(f"✅ Pages: {len(pages)}")
-        print(f"✅ Audio files: {audio_results['success']}/{audio_results['total']}")
-        print(f"✅ Total tokens: {total_tokens:,}")
-        print(f"✅ Validation: {validation_result['percentage']:.1f}% ({'PASSING' if validation_result['passing'] else 'FAILING'})")
-        print(f"{'='*60}\n")
+    
+        report('metadata', 0.95)
+        stage_order = list(STAGE_TIERS)
+        routing.sort(key=lambda r: (stage_order.index(r['stage']) if r['stage'] in stage_order else len(stage_order), r['artifact']))
+        extra_metadata['model_routing'] = {
+            'tiers': MODEL_TIERS,
+            'escalated': sum(1 for r in routing if r['escalated']),
+            'regenerated': sum(1 for r in routing if r['attempts'] > 1),
+            'failed': [r['artifact'] for r in routing if not r['passed']],
+            'artifacts': routing
+        }
+        save_metadata(story_dir, story_structure, topic, slug, total_tokens, validation_result, extra_metadata)
+        if index_lock is not None:
+            with index_lock:
+                update_stories_index(story_dir, story_structure, topic, slug)
+        else:
+            update_stories_index(story_dir, story_structure, topic, slug)
+    
+        # Audio is kept once in the content-addressed store, referenced from artifacts.json
+        ingest_story(story_dir)
+    
+        # Page order, audio sizes and durations let the reader prefetch the next page
+        write_navigation(story_dir)
+    
+        # Remaining files (metadata, translations) complete the packages
+        package_paths = finish_packages(packages, story_dir) if packages else []
+    except Exception:
+        abort_packages(packages)
+        raise
+    
+    # Final summary
+    print(f"\n{'='*60}")
+    print(f"GENERATION COMPLETE")
+    print(f"{'='*60}")
+    print(f"✅ Story: {story_structure['title']}")
+    print(f"✅ Location: {story_dir}")
+    print(f"✅ Pages: {len(pages)}")
+    print(f"✅ Audio files: {audio_results['success']}/{audio_results['total']}")
+    print(f"✅ Model routing: {sum(1 for r in routing if r['tier'] == 'fast')}/{len(routing)} artifacts on {FAST_MODEL}, "
+          f"{extra_metadata['model_routing']['escalated']} escalated")
+    print(f"✅ Total tokens: {total_tokens:,}")
+    print(f"✅ Validation: {validation_result['percentage']:.1f}% ({'PASSING' if validation_result['passing'] else 'FAILING'})")
+    print(f"{'='*60}\n")
+    
+    report('done', 1.0)
+    
+    return {
+        'story_dir': story_dir,
+        'title': story_structure['title'],
+        'pages': len(pages),
+        'tokens': total_tokens,
+        'audio': audio_results,
+        'packages': package_paths,
+        'validation': validation_result
+    }
+
+def main(topic=None, on_duplicate=ON_DUPLICATE):
+    """Main generation pipeline"""
+    # Get topic from command line or environment
+    if not topic:
+        if len(sys.argv) > 1:
+            topic = ' '.join(sys.argv[1:])
+        else:
+            topic = os.getenv('STORY_TOPIC', 'A child goes to school for the first time')
+    
+    try:
+        result = run_pipeline(topic, on_duplicate=on_duplicate)
+        validation_result = result['validation']
         
         if not validation_result['passing']:
             print(f"⚠️  Warning: Story did not pass validation threshold ({VALIDATION_THRESHOLD}%)")
             print(f"Issues: {', '.join(validation_result['issues'])}")
+            failing = validation_result['details'].get('failing_artifacts')
+            if failing:
+                print(f"Artifacts still failing after {ARTIFACT_MAX_ATTEMPTS} attempts: {', '.join(failing)}")
             sys.exit(1)
         
     except Exception as e:
@@ -649,5 +1090,4 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
-
+    main()
\ No newline at end of file
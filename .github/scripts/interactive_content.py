@@ -0,0 +1,174 @@
+"""
+Interactive activity content for the shared engine
+
+Quiz, choices and games are generated as small JSON documents under each
+story's interactive/ folder and rendered by shared/interactive.js, so stories
+don't ship their own copy of the activity code. This module defines the
+expected shape of each document and checks AI output against it before it
+is written.
+"""
+
+import json
+import os
+import re
+
+ACTIVITIES = ['quiz', 'choices', 'games']
+
+# Activity containers in generated pages, e.g. data-src="interactive/quiz.json"
+ACTIVITY_SOURCE = re.compile(r'''data-src=["']([^"']*interactive/([a-z]+)\.json)["']''')
+
+# Structural fields the engine reads as data rather than display text
+STRUCTURAL_KEYS = {'correct', 'order', 'helpful'}
+
+def _text(value):
+    return isinstance(value, str) and value.strip() != ''
+
+def validate_quiz(data):
+    """
+    Check quiz content: {"questions": [{"question", "options", "correct", "explanation"?}]}
+
+    Returns:
+        list: Problems found (empty when valid)
+    """
+    issues = []
+    questions = data.get('questions') if isinstance(data, dict) else None
+    if not isinstance(questions, list) or not questions:
+        return ["quiz needs a non-empty 'questions' list"]
+
+    for i, q in enumerate(questions, 1):
+        if not isinstance(q, dict) or not _text(q.get('question')):
+            issues.append(f"question {i} has no question text")
+            continue
+        options = q.get('options')
+        if not isinstance(options, list) or len(options) < 2 or not all(_text(o) for o in options):
+            issues.append(f"question {i} needs at least 2 text options")
+            continue
+        correct = q.get('correct')
+        if not isinstance(correct, int) or isinstance(correct, bool) or not 0 <= correct < len(options):
+            issues.append(f"question {i} 'correct' must be an option index (0-{len(options) - 1})")
+        if 'explanation' in q and not _text(q['explanation']):
+            issues.append(f"question {i} has an empty explanation")
+    return issues
+
+def validate_choices(data):
+    """
+    Check choices content:
+    {"scenarios": [{"situation", "choices": [{"text", "feedback", "helpful"}]}]}
+
+    Returns:
+        list: Problems found (empty when valid)
+    """
+    issues = []
+    scenarios = data.get('scenarios') if isinstance(data, dict) else None
+    if not isinstance(scenarios, list) or not scenarios:
+        return ["choices needs a non-empty 'scenarios' list"]
+
+    for i, scenario in enumerate(scenarios, 1):
+        if not isinstance(scenario, dict) or not _text(scenario.get('situation')):
+            issues.append(f"scenario {i} has no situation text")
+            continue
+        choices = scenario.get('choices')
+        if not isinstance(choices, list) or len(choices) < 2:
+            issues.append(f"scenario {i} needs at least 2 choices")
+            continue
+        for j, choice in enumerate(choices, 1):
+            if not isinstance(choice, dict) or not _text(choice.get('text')) or not _text(choice.get('feedback')):
+                issues.append(f"scenario {i} choice {j} needs text and feedback")
+            elif not isinstance(choice.get('helpful'), bool):
+                issues.append(f"scenario {i} choice {j} 'helpful' must be true or false")
+        if not any(isinstance(c, dict) and c.get('helpful') is True for c in choices):
+            issues.append(f"scenario {i} has no helpful choice")
+    return issues
+
+def validate_games(data):
+    """
+    Check games content:
+    {"matching": {"title", "pairs": [{"character", "description"}]},
+     "sequencing": {"title", "events": [{"order", "text"}]}}
+
+    Returns:
+        list: Problems found (empty when valid)
+    """
+    if not isinstance(data, dict):
+        return ["games content must be an object"]
+
+    issues = []
+    matching = data.get('matching')
+    if not isinstance(matching, dict) or not isinstance(matching.get('pairs'), list) or len(matching['pairs']) < 2:
+        issues.append("matching game needs at least 2 pairs")
+    elif not all(isinstance(p, dict) and _text(p.get('character')) and _text(p.get('description'))
+                 for p in matching['pairs']):
+        issues.append("every matching pair needs a character and description")
+
+    sequencing = data.get('sequencing')
+    if not isinstance(sequencing, dict) or not isinstance(sequencing.get('events'), list) or len(sequencing['events']) < 2:
+        issues.append("sequencing game needs at least 2 events")
+    else:
+        events = sequencing['events']
+        if not all(isinstance(e, dict) and _text(e.get('text')) for e in events):
+            issues.append("every sequencing event needs text")
+        elif sorted(e.get('order') for e in events if isinstance(e.get('order'), int)) != list(range(1, len(events) + 1)):
+            issues.append("sequencing 'order' values must run 1..N without gaps")
+    return issues
+
+VALIDATORS = {
+    'quiz': validate_quiz,
+    'choices': validate_choices,
+    'games': validate_games,
+}
+
+def validate_activity(name, data):
+    """Validate content for one activity ('quiz', 'choices' or 'games')"""
+    return VALIDATORS[name](data)
+
+def save_activity(story_dir, name, data):
+    """
+    Write activity content to interactive/<name>.json
+
+    Returns:
+        str: Path of the written file
+    """
+    path = os.path.join(story_dir, 'interactive', f'{name}.json')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    return path
+
+def load_activity(story_dir, name):
+    """Load interactive/<name>.json, or None if it is missing or unreadable"""
+    path = os.path.join(story_dir, 'interactive', f'{name}.json')
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+def embed_activities(page_html, activities):
+    """
+    Embed the activity content a page loads into the page itself
+
+    shared/interactive.js uses a <script type="application/json"> block
+    whose data-src matches a container's instead of fetching the file,
+    which browsers refuse for pages opened from file://.
+
+    Args:
+        page_html: Page HTML
+        activities: {activity name: content}
+
+    Returns:
+        tuple: (page HTML, list of referenced activities that weren't given)
+    """
+    blocks, missing = [], []
+    for source, name in dict.fromkeys(ACTIVITY_SOURCE.findall(page_html)):
+        if name not in activities:
+            missing.append(name)
+            continue
+        # Escaping "<" keeps the JSON from closing the script element
+        content = json.dumps(activities[name], ensure_ascii=False).replace('<', '\\u003c')
+        blocks.append(f'<script type="application/json" data-src="{source}">{content}</script>')
+    if not blocks:
+        return page_html, missing
+    end = page_html.rfind('</body>')
+    if end < 0:
+        return page_html + '\n' + '\n'.join(blocks) + '\n', missing
+    return page_html[:end] + '\n'.join(blocks) + '\n' + page_html[end:], missing
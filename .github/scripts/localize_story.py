@@ -0,0 +1,469 @@
+"""
+Multi-language story localization
+
+A generated story is localized without re-running the pipeline: the visible
+text of its pages and index (including the alt, aria-label and title
+attributes screen readers announce), and the human-readable strings in its
+interactive content, are collected once, deduplicated, and translated for
+several locales per chat completion. Each locale is rendered into a
+subdirectory of the story (stories/<story>/<locale>/) that mirrors the
+English layout, and page audio for every locale is synthesized
+concurrently.
+
+Both steps are cached per locale: translations.json holds every translated
+string, and audio/manifest.json records the text each MP3 was made from, so
+re-running only translates new strings and only re-synthesizes pages whose
+text changed.
+"""
+
+import glob
+import html
+import json
+import os
+import re
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+
+from artifact_store import resolve_artifact, synthesis_key
+from interactive_content import STRUCTURAL_KEYS
+
+LOCALE_BATCH_SIZE = 3  # locales translated per request
+STRING_BATCH_SIZE = 60  # strings translated per request
+TTS_CONCURRENCY = 4
+
+LOCALE_NAMES = {
+    'ar': 'Arabic', 'de': 'German', 'es': 'Spanish', 'fr': 'French', 'hi': 'Hindi',
+    'it': 'Italian', 'ja': 'Japanese', 'ko': 'Korean', 'nl': 'Dutch', 'pl': 'Polish',
+    'pt': 'Portuguese', 'ru': 'Russian', 'sv': 'Swedish', 'tr': 'Turkish',
+    'uk': 'Ukrainian', 'vi': 'Vietnamese', 'zh': 'Chinese (Simplified)',
+}
+
+# Per-locale TTS voice overrides; other locales use the default voice
+LOCALE_VOICES = {}
+
+HTML_ARTIFACTS = ['index.html', 'pages/page-*.html']
+SCRIPT_ARTIFACTS = ['interactive/*.js']  # standalone modules in older stories
+DATA_ARTIFACTS = ['interactive/*.json']
+
+# Attributes read to people (screen readers, tooltips) rather than by code
+TEXT_ATTRIBUTE_PATTERN = re.compile(r'(\s(?:alt|aria-label|title)\s*=\s*)(["\'])(.*?)\2', re.IGNORECASE | re.DOTALL)
+
+# Comments are matched first so apostrophes in them aren't read as quotes
+JS_TOKEN_PATTERN = re.compile(r"""(//[^\n]*|/\*.*?\*/)|(['"])((?:\\.|(?!\2)[^\\\n])*)\2""", re.DOTALL)
+
+def locale_name(locale):
+    return LOCALE_NAMES.get(locale.split('-')[0].lower(), locale)
+
+def has_text(text):
+    return any(c.isalpha() for c in text)
+
+class HTMLTextRewriter(HTMLParser):
+    """
+    Re-emit an HTML document, optionally translating its text nodes and its
+    alt, aria-label and title attributes
+
+    Text inside script and style is passed through untouched. Relative
+    URLs that point outside the story directory get one extra '../' so the
+    document still works one level deeper, in a locale subdirectory.
+    """
+
+    RAW_TAGS = {'script', 'style'}
+
+    def __init__(self, translate=None, lang=None, depth=0):
+        super().__init__(convert_charrefs=True)
+        self.translate = translate
+        self.lang = lang
+        self.depth = depth
+        self.out = []
+        self.texts = []
+        self.raw_depth = 0
+
+    def fix_url(self, url):
+        # A file `depth` folders deep needs depth+1 '../' to leave the story
+        leading = len(re.match(r'(\.\./)*', url).group(0)) // 3
+        return '../' + url if leading > self.depth else url
+
+    def translate_attribute(self, match):
+        value = ' '.join(html.unescape(match.group(3)).split())
+        if not has_text(value):
+            return match.group(0)
+        self.texts.append(value)
+        if self.translate:
+            value = self.translate(value)
+        return f"{match.group(1)}{match.group(2)}{html.escape(value, quote=True)}{match.group(2)}"
+
+    def rewrite_starttag(self, tag, text):
+        text = TEXT_ATTRIBUTE_PATTERN.sub(self.translate_attribute, text)
+        if tag == 'html' and self.lang:
+            if re.search(r'\slang=', text):
+                text = re.sub(r'(\slang=)(["\']?)[^"\'\s>]*\2', rf'\g<1>"{self.lang}"', text, count=1)
+            else:
+                text = text.replace('<html', f'<html lang="{self.lang}"', 1)
+        return re.sub(
+            r'(\s(?:href|src)=)(["\'])(\.\./[^"\']*)\2',
+            lambda m: f"{m.group(1)}{m.group(2)}{self.fix_url(m.group(3))}{m.group(2)}",
+            text
+        )
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.RAW_TAGS:
+            self.raw_depth += 1
+        self.out.append(self.rewrite_starttag(tag, self.get_starttag_text()))
+
+    def handle_startendtag(self, tag, attrs):
+        self.out.append(self.rewrite_starttag(tag, self.get_starttag_text()))
+
+    def handle_endtag(self, tag):
+        if tag in self.RAW_TAGS:
+            self.raw_depth = max(0, self.raw_depth - 1)
+        self.out.append(f'</{tag}>')
+
+    def handle_data(self, data):
+        if self.raw_depth:
+            self.out.append(data)
+            return
+        stripped = data.strip()
+        if stripped and has_text(stripped):
+            # Source indentation inside text shouldn't make otherwise equal strings differ
+            text = ' '.join(stripped.split())
+            self.texts.append(text)
+            if self.translate:
+                # Keep the surrounding whitespace so the layout is unchanged
+                start = data.index(stripped)
+                data = data[:start] + self.translate(text) + data[start + len(stripped):]
+        self.out.append(html.escape(data, quote=False))
+
+    def handle_comment(self, data):
+        self.out.append(f'<!--{data}-->')
+
+    def handle_decl(self, decl):
+        self.out.append(f'<!{decl}>')
+
+    def handle_pi(self, data):
+        self.out.append(f'<?{data}>')
+
+    def result(self):
+        return ''.join(self.out)
+
+def html_texts(content):
+    """Visible text nodes of an HTML document"""
+    parser = HTMLTextRewriter()
+    parser.feed(content)
+    parser.close()
+    return parser.texts
+
+def rewrite_html(content, translate, lang, depth):
+    parser = HTMLTextRewriter(translate, lang, depth)
+    parser.feed(content)
+    parser.close()
+    return parser.result()
+
+def is_prose(text):
+    """True for string literals that read as text for people rather than code"""
+    if '${' in text or not has_text(text):
+        return False
+    return ' ' in text.strip() or re.fullmatch(r"[A-Z][a-z']+[!?.]?", text) is not None
+
+def unescape_js(text):
+    return re.sub(r"\\(['\"\\])", r'\1', text)
+
+def script_strings(content):
+    """Human-readable string literals in a JavaScript module"""
+    strings = []
+    for match in JS_TOKEN_PATTERN.finditer(content):
+        if match.group(1) is None:
+            text = unescape_js(match.group(3))
+            if is_prose(text):
+                strings.append(text)
+    return strings
+
+def rewrite_script(content, translate):
+    def replace(match):
+        if match.group(1) is not None:
+            return match.group(0)
+        quote, text = match.group(2), unescape_js(match.group(3))
+        if not is_prose(text):
+            return match.group(0)
+        translated = translate(text).replace('\\', '\\\\').replace(quote, '\\' + quote)
+        return f'{quote}{translated}{quote}'
+    return JS_TOKEN_PATTERN.sub(replace, content)
+
+def data_strings(data):
+    """Display strings in interactive JSON content (keys and structural fields are kept)"""
+    if isinstance(data, str):
+        return [data] if has_text(data) else []
+    if isinstance(data, list):
+        return [text for item in data for text in data_strings(item)]
+    if isinstance(data, dict):
+        return [text for key, value in data.items() if key not in STRUCTURAL_KEYS
+                for text in data_strings(value)]
+    return []
+
+def rewrite_data(data, translate):
+    if isinstance(data, str):
+        return translate(data) if has_text(data) else data
+    if isinstance(data, list):
+        return [rewrite_data(item, translate) for item in data]
+    if isinstance(data, dict):
+        return {key: value if key in STRUCTURAL_KEYS else rewrite_data(value, translate)
+                for key, value in data.items()}
+    return data
+
+def story_artifacts(story_dir):
+    """Relative paths of the HTML, script and data artifacts to localize"""
+    artifacts = []
+    for pattern in HTML_ARTIFACTS + SCRIPT_ARTIFACTS + DATA_ARTIFACTS:
+        for path in sorted(glob.glob(os.path.join(story_dir, pattern))):
+            artifacts.append(os.path.relpath(path, story_dir).replace(os.sep, '/'))
+    return artifacts
+
+def collect_strings(story_dir):
+    """All unique translatable strings in a story, in document order"""
+    strings = []
+    seen = set()
+    for relative in story_artifacts(story_dir):
+        with open(os.path.join(story_dir, relative), 'r', encoding='utf-8') as f:
+            content = f.read()
+        if relative.endswith('.json'):
+            found = data_strings(json.loads(content))
+        elif relative.endswith('.js'):
+            found = script_strings(content)
+        else:
+            found = html_texts(content)
+        for text in found:
+            if text not in seen:
+                seen.add(text)
+                strings.append(text)
+    return strings
+
+def load_translations(locale_dir):
+    path = os.path.join(locale_dir, 'translations.json')
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+def save_translations(locale_dir, translations):
+    os.makedirs(locale_dir, exist_ok=True)
+    with open(os.path.join(locale_dir, 'translations.json'), 'w', encoding='utf-8') as f:
+        json.dump(translations, f, indent=2, ensure_ascii=False)
+
+def translate_batch(strings, locales, title, model=None):
+    """
+    Translate a list of strings into several locales with one request
+
+    Returns:
+        tuple: ({locale: [translated strings]}, tokens used)
+    """
+    from generate_story import call_ai, parse_json_response
+
+    system_message = "You are an expert translator of children's educational materials."
+    targets = ', '.join(f'"{locale}" ({locale_name(locale)})' for locale in locales)
+    prompt = f"""Translate the text strings from the social story "{title}" into these languages: {targets}.
+
+Keep the meaning, the simple child-friendly wording and the supportive tone. Keep character names unchanged.
+Keep any HTML tags, emoji, punctuation and placeholders exactly as they are. Translate every string in order.
+
+Input strings (JSON array):
+{json.dumps(strings, ensure_ascii=False, indent=2)}
+
+Output ONLY a JSON object mapping each language code to an array with exactly {len(strings)} translated strings:
+{{{', '.join(f'"{locale}": ["..."]' for locale in locales)}}}"""
+
+    response, tokens = call_ai(prompt, system_message, model=model, temperature=0.3)
+    if not response:
+        return {}, tokens
+
+    try:
+        result = parse_json_response(response)
+    except json.JSONDecodeError as e:
+        print(f"❌ Failed to parse translation response: {e}")
+        return {}, tokens
+
+    translated = {}
+    for locale in locales:
+        values = result.get(locale)
+        if isinstance(values, list) and len(values) == len(strings):
+            translated[locale] = [str(v) for v in values]
+        else:
+            print(f"⚠️  Translation for {locale} was incomplete, will retry on the next run")
+    return translated, tokens
+
+def translate_story(story_dir, locales, model=None):
+    """
+    Fill each locale's translation cache for the story's current strings
+
+    Returns:
+        tuple: ({locale: {source: translation}}, tokens used)
+    """
+    strings = collect_strings(story_dir)
+    title = os.path.basename(os.path.normpath(story_dir))
+    structure_path = os.path.join(story_dir, 'structure.json')
+    if os.path.exists(structure_path):
+        with open(structure_path, 'r', encoding='utf-8') as f:
+            title = json.load(f).get('title', title)
+
+    translations = {locale: load_translations(os.path.join(story_dir, locale)) for locale in locales}
+    missing = {locale: [s for s in strings if s not in translations[locale]] for locale in locales}
+    total_tokens = 0
+
+    # Locales missing the same strings can share requests
+    groups = {}
+    for locale, pending in missing.items():
+        if pending:
+            groups.setdefault(tuple(pending), []).append(locale)
+
+    for pending, group in groups.items():
+        for i in range(0, len(group), LOCALE_BATCH_SIZE):
+            batch_locales = group[i:i + LOCALE_BATCH_SIZE]
+            for j in range(0, len(pending), STRING_BATCH_SIZE):
+                batch_strings = list(pending[j:j + STRING_BATCH_SIZE])
+                print(f"🌐 Translating {len(batch_strings)} strings into {', '.join(batch_locales)}...")
+                result, tokens = translate_batch(batch_strings, batch_locales, title, model)
+                total_tokens += tokens
+                for locale, values in result.items():
+                    translations[locale].update(zip(batch_strings, values))
+
+    for locale in locales:
+        save_translations(os.path.join(story_dir, locale), translations[locale])
+        done = sum(1 for s in strings if s in translations[locale])
+        print(f"   {locale}: {done}/{len(strings)} strings translated")
+
+    return translations, total_tokens
+
+def render_locale(story_dir, locale, translations):
+    """Write the translated copy of the story into its locale subdirectory"""
+    locale_dir = os.path.join(story_dir, locale)
+    translate = lambda text: translations.get(text, text)
+
+    for relative in story_artifacts(story_dir):
+        with open(os.path.join(story_dir, relative), 'r', encoding='utf-8') as f:
+            content = f.read()
+        depth = relative.count('/')
+        if relative.endswith('.json'):
+            content = json.dumps(rewrite_data(json.loads(content), translate), indent=2, ensure_ascii=False)
+        elif relative.endswith('.js'):
+            content = rewrite_script(content, translate)
+        else:
+            content = rewrite_html(content, translate, locale, depth)
+
+        output_path = os.path.join(locale_dir, relative)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    return locale_dir
+
+def synthesize_locales(story_dir, locales, model="tts-1", voice="alloy"):
+    """
+    Generate page audio for every locale concurrently
+
+    Returns:
+        dict: locale -> {'total', 'success', 'cached', 'failed'}
+    """
+    from generate_audio import generate_audio_file, extract_narration_from_html
+
+    jobs = []
+    manifests = {}
+    results = {locale: {'total': 0, 'success': 0, 'cached': 0, 'failed': 0} for locale in locales}
+
+    for locale in locales:
+        audio_dir = os.path.join(story_dir, locale, 'audio')
+        os.makedirs(audio_dir, exist_ok=True)
+        manifest_path = os.path.join(audio_dir, 'manifest.json')
+        manifest = {}
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        manifests[locale] = manifest
+        locale_voice = LOCALE_VOICES.get(locale, voice)
+
+        for page_file in sorted(glob.glob(os.path.join(story_dir, locale, 'pages', 'page-*.html'))):
+            results[locale]['total'] += 1
+            audio_name = os.path.basename(page_file).replace('.html', '.mp3')
+            output_path = os.path.join(audio_dir, audio_name)
+            with open(page_file, 'r', encoding='utf-8') as f:
+                narration = extract_narration_from_html(f.read())
+            if not narration:
+                results[locale]['failed'] += 1
+                continue
+            key = synthesis_key(model, locale_voice, narration)
+            if manifest.get(audio_name) == key and resolve_artifact(story_dir, f'{locale}/audio/{audio_name}'):
+                results[locale]['cached'] += 1
+                continue
+            jobs.append((locale, audio_name, key, narration, output_path, locale_voice))
+
+    print(f"\n🔊 Synthesizing {len(jobs)} page(s) across {len(locales)} locale(s)...")
+
+    def run(job):
+        locale, audio_name, key, narration, output_path, locale_voice = job
+        return job, generate_audio_file(narration, output_path, model, locale_voice)
+
+    with ThreadPoolExecutor(max_workers=TTS_CONCURRENCY) as executor:
+        for (locale, audio_name, key, _, _, _), success in executor.map(run, jobs):
+            if success:
+                manifests[locale][audio_name] = key
+                results[locale]['success'] += 1
+            else:
+                results[locale]['failed'] += 1
+
+    for locale in locales:
+        with open(os.path.join(story_dir, locale, 'audio', 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifests[locale], f, indent=2)
+
+    return results
+
+def localize_story(story_dir, locales, model=None, tts_model="tts-1", tts_voice="alloy", audio=True):
+    """
+    Translate a story into several locales and render each one
+
+    Args:
+        story_dir: Generated story directory (English source)
+        locales: Locale codes such as ['es', 'fr']
+        model: Chat model for translation (defaults to MODEL_NAME)
+        tts_model: TTS model for locale audio
+        tts_voice: Default TTS voice (see LOCALE_VOICES)
+        audio: Whether to synthesize locale audio
+
+    Returns:
+        dict: tokens used, rendered locale directories and audio results
+    """
+    locales = [locale.strip() for locale in locales if locale.strip()]
+    print(f"\n{'='*60}")
+    print(f"LOCALIZATION: {', '.join(locales)}")
+    print(f"{'='*60}")
+
+    translations, tokens = translate_story(story_dir, locales, model)
+    locale_dirs = {locale: render_locale(story_dir, locale, translations[locale]) for locale in locales}
+
+    # Interactive modules without translatable text still need to be reachable
+    for locale in locales:
+        for path in glob.glob(os.path.join(story_dir, 'interactive', '*')):
+            target = os.path.join(story_dir, locale, 'interactive', os.path.basename(path))
+            if not os.path.exists(target):
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copyfile(path, target)
+
+    audio_results = synthesize_locales(story_dir, locales, tts_model, tts_voice) if audio else {}
+
+    update_story_locales(story_dir, locales)
+
+    for locale in locales:
+        summary = audio_results.get(locale)
+        audio_note = f", audio {summary['success'] + summary['cached']}/{summary['total']}" if summary else ''
+        print(f"✅ {locale}: {locale_dirs[locale]}{audio_note}")
+    print(f"✅ Translation tokens: {tokens:,}")
+
+    return {'tokens': tokens, 'locales': locale_dirs, 'audio': audio_results}
+
+def update_story_locales(story_dir, locales):
+    """Record available locales in story.json"""
+    meta_file = os.path.join(story_dir, 'story.json')
+    if not os.path.exists(meta_file):
+        return
+    with open(meta_file, 'r', encoding='utf-8') as f:
+        metadata = json.load(f)
+    metadata['locales'] = sorted(set(metadata.get('locales', [])) | set(locales))
+    with open(meta_file, 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, indent=2)
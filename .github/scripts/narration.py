@@ -0,0 +1,277 @@
+"""
+Multi-voice page narration
+
+Each page's narration is split into narrator lines and character dialogue,
+and every character from the story structure gets a voice of their own.
+Lines are synthesized concurrently, each cached under its own synthesis key
+(model, voice, text), and the clips are joined into the usual
+audio/page-NN.mp3. Editing one character's line therefore only
+re-synthesizes that line; the rest of the page is stitched from the cache.
+
+audio/timing.json records, per page, when each line starts and ends in the
+page audio, who speaks it and with which voice.
+
+Line clips live in a local cache (LINE_CACHE_DIR, laid out like the
+artifact store) rather than in store/: only the stitched pages are
+published and committed, and `store gc` never sees the clips.
+"""
+
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from artifact_store import lookup_key, object_path, record_key, synthesis_key
+from mp3_frames import audio_frames
+from resilience import call_with_retry
+from story_templates import longest_first
+
+NARRATION_CONCURRENCY = 4  # lines synthesized at once
+LINE_CACHE_DIR = os.getenv("STORY_LINE_CACHE", os.path.join('.story_cache', 'lines'))
+TIMING_FILE = 'timing.json'
+TIMING_VERSION = 1
+NARRATOR = 'narrator'
+
+# TTS voices, grouped by the pronouns they suit best
+VOICE_POOLS = {
+    'she': ['nova', 'shimmer'],
+    'he': ['onyx', 'echo'],
+    'they': ['fable'],
+}
+ALL_VOICES = ['alloy', 'echo', 'fable', 'onyx', 'nova', 'shimmer']
+
+QUOTE_PATTERN = re.compile(r'"([^"]+)"|“([^”]+)”')
+SENTENCE_END = re.compile(r'[.!?](?=\s|$)')
+SPEECH_VERBS = {
+    'said', 'says', 'asked', 'asks', 'called', 'calls', 'replied', 'replies', 'answered', 'answers',
+    'whispered', 'whispers', 'shouted', 'shouts', 'yelled', 'yells', 'cried', 'cries', 'exclaimed',
+    'explained', 'explains', 'added', 'adds', 'told', 'tells', 'laughed', 'giggled', 'sang', 'sings',
+}
+
+def assign_voices(characters, narrator_voice="alloy", preferred=None):
+    """
+    Pick a voice for each character
+
+    A character's own 'voice' field wins, then a voice from `preferred`
+    (e.g. the voices a story was narrated with before). Other characters
+    get a voice from the pool for their pronouns, avoiding the narrator's
+    voice and voices already taken while any are left.
+
+    Returns:
+        dict: character name -> voice
+    """
+    preferred = preferred or {}
+    voices = {}
+    for character in characters:
+        name = character.get('name')
+        voice = character.get('voice') or preferred.get(name)
+        if name and voice in ALL_VOICES:
+            voices[name] = voice
+
+    used = {narrator_voice} | set(voices.values())
+    for character in characters:
+        name = character.get('name')
+        if not name or name in voices:
+            continue
+        pool = VOICE_POOLS.get(character.get('pronouns'), []) + ALL_VOICES
+        voice = next((v for v in pool if v not in used), None)
+        voice = voice or next((v for v in pool if v != narrator_voice), narrator_voice)
+        voices[name] = voice
+        used.add(voice)
+    return voices
+
+def find_speaker(text, names):
+    """Return the first character name mentioned in text, or None"""
+    best = None
+    for name in names:
+        match = re.search(rf'\b{re.escape(name)}\b', text)
+        if match and (best is None or match.start() < best[0]):
+            best = (match.start(), name)
+    return best[1] if best else None
+
+def split_lines(text, names):
+    """
+    Split narration into narrator and dialogue lines
+
+    A quote is given to the character named in the speech tag that follows
+    it ('"Hi," said Mom.'), else the one before it ('Mom said, "Hi."'). The
+    text after a quote only counts as its tag if the quote doesn't end its
+    sentence or that text has a speech verb, so in 'Mom said, "Hi." Geo
+    waved.' the quote stays Mom's. Unattributed quotes stay with the
+    narrator.
+
+    Returns:
+        list: {'speaker', 'text'} dicts in reading order
+    """
+    lines = []
+
+    def add(speaker, line):
+        line = line.strip()
+        if not any(c.isalnum() for c in line):
+            return
+        if lines and lines[-1]['speaker'] == speaker:
+            lines[-1]['text'] += ' ' + line
+        else:
+            lines.append({'speaker': speaker, 'text': line})
+
+    names = longest_first(names)
+    pos = 0
+    for match in QUOTE_PATTERN.finditer(text):
+        before = text[pos:match.start()]
+        after = text[match.end():]
+        end = SENTENCE_END.search(after)
+        tag_after = after[:end.end()] if end else after
+        quote = (match.group(1) or match.group(2)).rstrip()
+        if not (quote.endswith(',') or quote[-1:] not in '.!?'
+                or SPEECH_VERBS & set(re.findall(r"[a-z]+", tag_after.lower()))):
+            tag_after = ''
+        sentence_start = max((m.end() for m in SENTENCE_END.finditer(before)), default=0)
+        speaker = find_speaker(tag_after, names) or find_speaker(before[sentence_start:], names) or NARRATOR
+
+        add(NARRATOR, before)
+        add(speaker, match.group(1) or match.group(2))
+        pos = match.end()
+    add(NARRATOR, text[pos:])
+    return lines
+
+def synthesize_line(text, voice, model, work_dir):
+    """
+    Synthesize one line into the line cache, unless it is already there
+
+    Returns:
+        tuple: (clip digest, True if the API was called)
+    """
+    from generate_audio import get_client
+
+    key = synthesis_key(model, voice, text)
+    digest = lookup_key(key, LINE_CACHE_DIR)
+    if digest:
+        return digest, False
+
+    response = call_with_retry(
+        get_client().audio.speech.create,
+        model=model,
+        voice=voice,
+        input=text,
+        label=f"TTS line ({voice})"
+    )
+    tmp_path = os.path.join(work_dir, f".line-{key[:16]}.mp3.tmp{os.getpid()}")
+    response.stream_to_file(tmp_path)
+    try:
+        return record_key(key, tmp_path, LINE_CACHE_DIR), True
+    finally:
+        os.remove(tmp_path)
+
+def stitch_page(lines, output_path):
+    """
+    Join line clips into one MP3 and time each line
+
+    Args:
+        lines: Line dicts with a 'digest' of their clip in the line cache
+        output_path: Page MP3 to write
+
+    Returns:
+        float: Page duration in seconds (lines gain 'start' and 'end')
+    """
+    tmp_path = f"{output_path}.tmp{os.getpid()}"
+    position = 0.0
+    with open(tmp_path, 'wb') as out:
+        for line in lines:
+            with open(object_path(line['digest'], LINE_CACHE_DIR), 'rb') as f:
+                data = f.read()
+            frames, seconds = audio_frames(data)
+            out.write(frames or data)
+            line['start'] = round(position, 3)
+            position += seconds
+            line['end'] = round(position, 3)
+    os.replace(tmp_path, output_path)
+    return round(position, 3)
+
+def load_timing(audio_dir):
+    path = os.path.join(audio_dir, TIMING_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def narrate_pages(page_texts, audio_dir, characters, model="tts-1", narrator_voice="alloy", voices=None):
+    """
+    Narrate pages with a voice per character
+
+    Args:
+        page_texts: {page number: narration text}
+        audio_dir: Directory for page-NN.mp3 and timing.json
+        characters: Characters from the story structure
+        model: TTS model
+        narrator_voice: Voice for narrator lines
+        voices: Preferred character voices (default: the voices in this
+            story's timing.json, so re-narrated pages keep their cast)
+
+    Returns:
+        dict: Results with success/failure counts, file paths, how many
+            lines were synthesized or reused, and how many pages needed
+            any synthesis
+    """
+    timing = load_timing(audio_dir)
+    voices = assign_voices(characters, narrator_voice, voices or timing.get('voices'))
+    voices[NARRATOR] = narrator_voice
+    os.makedirs(audio_dir, exist_ok=True)
+
+    pages = {}
+    for number, text in page_texts.items():
+        lines = split_lines(text, [name for name in voices if name != NARRATOR])
+        for line in lines:
+            line['voice'] = voices[line['speaker']]
+        pages[number] = lines
+
+    results = {'total': len(pages), 'success': 0, 'failed': 0, 'files': [],
+               'synthesized': 0, 'reused': 0, 'pages_synthesized': 0}
+    # A line repeated on several pages is synthesized once
+    unique = {}
+    for lines in pages.values():
+        for line in lines:
+            unique.setdefault((line['voice'], line['text']), []).append(line)
+    print(f"\n🎭 Narrating {len(pages)} pages as {len(unique)} distinct lines "
+          f"({', '.join(f'{name}: {voice}' for name, voice in voices.items())})")
+
+    def run(key):
+        voice, text = key
+        try:
+            return synthesize_line(text, voice, model, audio_dir)
+        except Exception as e:
+            print(f"❌ Error synthesizing line for {unique[key][0]['speaker']}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=NARRATION_CONCURRENCY) as executor:
+        for key, result in zip(unique, executor.map(run, unique)):
+            if result is None:
+                continue
+            digest, synthesized = result
+            results['synthesized' if synthesized else 'reused'] += 1
+            for line in unique[key]:
+                line['digest'], line['synthesized'] = digest, synthesized
+
+    timing_pages = timing.get('pages', {})
+    for number, lines in sorted(pages.items()):
+        name = f"page-{int(number):02d}"
+        if not lines or any('digest' not in line for line in lines):
+            print(f"⚠️  No audio for {name}")
+            results['failed'] += 1
+            continue
+        output_path = os.path.join(audio_dir, f"{name}.mp3")
+        duration = stitch_page(lines, output_path)
+        timing_pages[name] = {
+            'duration': duration,
+            'lines': [{key: line[key] for key in ('speaker', 'voice', 'text', 'start', 'end')} for line in lines]
+        }
+        results['success'] += 1
+        results['pages_synthesized'] += any(line['synthesized'] for line in lines)
+        results['files'].append(output_path)
+
+    with open(os.path.join(audio_dir, TIMING_FILE), 'w', encoding='utf-8') as f:
+        json.dump({'version': TIMING_VERSION, 'model': model, 'voices': voices,
+                   'pages': dict(sorted(timing_pages.items()))}, f, indent=2, ensure_ascii=False)
+
+    print(f"✅ Narration: {results['success']}/{results['total']} pages, "
+          f"{results['synthesized']} lines synthesized, {results['reused']} reused")
+    return results
@@ -0,0 +1,234 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# Default retry policy for OpenAI calls
+MAX_RETRIES = 4
+BASE_DELAY = 1.0
+MAX_DELAY = 30.0
+
+# Circuit breaker defaults
+FAILURE_THRESHOLD = 5
+RESET_TIMEOUT = 60.0
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_ERROR_NAMES = {
+    'APITimeoutError',
+    'APIConnectionError',
+    'RateLimitError',
+    'InternalServerError',
+    'Timeout',
+    'TimeoutError',
+    'ConnectionError',
+}
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit breaker is open"""
+
+class CircuitBreaker:
+    """
+    Fail fast after repeated failures so a batch doesn't keep waiting on a
+    dead endpoint.
+
+    The breaker opens after failure_threshold consecutive failures and
+    rejects calls until reset_timeout seconds have passed. It then lets a
+    single trial call through (half-open); success closes it again.
+    """
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self.lock:
+            return self._state()
+
+    def _state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def before_call(self):
+        """Raise CircuitOpenError if the call should not be attempted"""
+        with self.lock:
+            state = self._state()
+            if state == 'open':
+                raise CircuitOpenError("Circuit breaker is open; skipping API call")
+            if state == 'half-open':
+                if self.trial_in_flight:
+                    raise CircuitOpenError("Circuit breaker is half-open; trial call in progress")
+                self.trial_in_flight = True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_neutral(self):
+        """End a call that says nothing about the endpoint's health (e.g. a 400)"""
+        with self.lock:
+            # Leave the state alone; just let another half-open trial through
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial_in_flight or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self.trial_in_flight = False
+
+    def reset(self):
+        self.record_success()
+
+# Shared across every call in the process so one batch trips one breaker
+openai_breaker = CircuitBreaker()
+
+def get_status_code(error):
+    """Return the HTTP status code attached to an API error, if any"""
+    status = getattr(error, 'status_code', None)
+    if status is None:
+        response = getattr(error, 'response', None)
+        status = getattr(response, 'status_code', None)
+    return status
+
+def is_retryable(error):
+    """
+    Classify an exception from an API call
+
+    Args:
+        error: The exception raised by the call
+
+    Returns:
+        bool: True for transient failures (rate limits, timeouts, 5xx),
+            False for errors a retry won't fix (bad request, auth, etc.)
+    """
+    if isinstance(error, CircuitOpenError):
+        return False
+
+    status = get_status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+
+    return any(cls.__name__ in RETRYABLE_ERROR_NAMES for cls in type(error).__mro__)
+
+def get_retry_after(error):
+    """
+    Read the server's requested delay from Retry-After headers
+
+    Returns:
+        float or None: Seconds to wait, if the server specified one
+    """
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+
+    try:
+        retry_after_ms = headers.get('retry-after-ms')
+        if retry_after_ms is not None:
+            return float(retry_after_ms) / 1000
+        retry_after = headers.get('retry-after')
+        if retry_after is not None:
+            return float(retry_after)
+    except (TypeError, ValueError):
+        pass
+    return None
+
+def backoff_delay(attempt, error=None, base_delay=BASE_DELAY, max_delay=MAX_DELAY):
+    """Exponential backoff with full jitter, honoring Retry-After when present"""
+    retry_after = get_retry_after(error) if error is not None else None
+    if retry_after is not None:
+        return min(retry_after, max_delay)
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+def _call_hedged(fn, hedge_after, args, kwargs):
+    """
+    Run fn, launching one duplicate if the first call is still running after
+    hedge_after seconds. The first call to succeed wins.
+    """
+    executor = ThreadPoolExecutor(max_workers=2)
+    try:
+        futures = [executor.submit(fn, *args, **kwargs)]
+        done, _ = wait(futures, timeout=hedge_after)
+        if not done:
+            print(f"⏱️  Call slower than {hedge_after}s, sending hedged request")
+            futures.append(executor.submit(fn, *args, **kwargs))
+
+        pending = set(futures)
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+    finally:
+        # Don't block on the losing request
+        executor.shutdown(wait=False)
+
+def call_with_retry(fn, *args, max_retries=MAX_RETRIES, base_delay=BASE_DELAY,
+                    max_delay=MAX_DELAY, breaker=openai_breaker, hedge_after=None,
+                    label="API call", **kwargs):
+    """
+    Call fn(*args, **kwargs) with classified retries and a circuit breaker
+
+    Args:
+        fn: The function making the API request
+        max_retries: Retries after the first attempt for transient errors
+        base_delay: Initial backoff delay in seconds
+        max_delay: Upper bound on any single delay
+        breaker: CircuitBreaker shared across calls (None to disable)
+        hedge_after: If set, send a duplicate request when an attempt takes
+            longer than this many seconds
+        label: Name used in log messages
+
+    Returns:
+        The return value of fn
+
+    Raises:
+        CircuitOpenError if the breaker is open, otherwise the last error
+    """
+    attempt = 0
+    while True:
+        if breaker:
+            breaker.before_call()
+
+        try:
+            if hedge_after:
+                result = _call_hedged(fn, hedge_after, args, kwargs)
+            else:
+                result = fn(*args, **kwargs)
+        except Exception as e:
+            retryable = is_retryable(e)
+            # Only transient failures count against the shared endpoint;
+            # other errors neither trip nor close the breaker
+            if breaker:
+                if retryable:
+                    breaker.record_failure()
+                else:
+                    breaker.record_neutral()
+
+            if not retryable or attempt >= max_retries:
+                raise
+            if breaker and breaker.state == 'open':
+                raise CircuitOpenError(f"Circuit breaker opened after {label} failures") from e
+
+            delay = backoff_delay(attempt, e, base_delay, max_delay)
+            attempt += 1
+            print(f"🔁 {label} failed ({type(e).__name__}), retry {attempt}/{max_retries} in {delay:.1f}s")
+            time.sleep(delay)
+            continue
+
+        if breaker:
+            breaker.record_success()
+        return result
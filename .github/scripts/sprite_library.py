@@ -0,0 +1,270 @@
+"""
+Reusable character and setting sprites
+
+Pages used to draw every character and scene from scratch in inline CSS,
+so "Mom" or "Dentist office" was redrawn (and paid for) on every page of
+every story. Instead, each character and setting in a Stage 1 structure is
+mapped to a normalized descriptor ('character:mom', 'setting:dentist-office')
+and drawn once as an SVG symbol in shared/sprites/. Files are named by the
+hash of their content, and library.json maps descriptors to files; a
+sprite is only generated when its descriptor isn't in the library yet.
+
+Character sprites are parameterized with CSS custom properties (--skin,
+--hair, --outfit, --accent). Pages reference a sprite with
+<svg><use href=".../shared/sprites/<file>#sprite"/></svg> and set those
+properties from the character's name, so a character looks the same on
+every page without the drawing being inlined.
+
+Browsers don't resolve <use> references to other files from file:// pages,
+so packages meant to be opened offline inline the symbols they use
+(inline_sprites).
+"""
+
+import hashlib
+import json
+import os
+import re
+import xml.etree.ElementTree as ET
+from html import escape
+
+from story_dedup import STOPWORDS, stem
+from story_templates import normalize_pronouns
+
+SPRITE_DIR = os.path.join('shared', 'sprites')
+LIBRARY_FILE = 'library.json'
+LIBRARY_VERSION = 1
+SYMBOL_ID = 'sprite'
+MAX_SPRITE_BYTES = 20000
+SPRITE_URL = '../../../shared/sprites'  # as seen from stories/<story>/pages/
+SPRITE_REF = re.compile(r'href="[^"]*shared/sprites/([0-9a-f]+)\.svg#' + SYMBOL_ID + '"')
+# Any other reference to a sprite file (other quoting, ids or names)
+OTHER_SPRITE_REF = re.compile(r'''(href=)(["'])[^"']*shared/sprites/([^"'#]*)[^"']*\2''')
+
+# Words that say what a character is, mapped to the sprite that draws them
+CHARACTER_ROLES = {
+    'mom': 'mom', 'mum': 'mom', 'mommy': 'mom', 'mother': 'mom',
+    'dad': 'dad', 'daddy': 'dad', 'father': 'dad',
+    'grandma': 'grandma', 'grandmother': 'grandma', 'granny': 'grandma',
+    'grandpa': 'grandpa', 'grandfather': 'grandpa',
+    'sister': 'sister', 'brother': 'brother', 'baby': 'baby',
+    'aunt': 'aunt', 'uncle': 'uncle', 'cousin': 'cousin', 'friend': 'friend',
+    'teacher': 'teacher', 'dentist': 'dentist', 'doctor': 'doctor', 'nurse': 'nurse',
+    'hygienist': 'dentist', 'barber': 'barber', 'hairdresser': 'barber', 'stylist': 'barber',
+    'librarian': 'librarian', 'coach': 'coach', 'cashier': 'cashier', 'driver': 'driver',
+    'dog': 'dog', 'puppy': 'dog', 'cat': 'cat', 'kitten': 'cat',
+}
+
+# Where the noun phrase opening a description ends ("A friendly dentist who...")
+PHRASE_END = re.compile(r"[,.;:]|\b(?:who|that|which|with|and|at|in|on|for|from|to|is|was|\w+ing)\b")
+
+# CSS custom properties character sprites are drawn with, and the values
+# a character's name picks from
+SPRITE_PARAMS = {
+    '--skin': ['#f5d0b5', '#e8b98f', '#c68e5f', '#a0674a', '#7a4a32', '#5a3623'],
+    '--hair': ['#2b1d14', '#4a3728', '#7b4b2a', '#c49a55', '#e3c27a', '#8c8c8c', '#b5523b'],
+    '--outfit': ['#5b8def', '#ef7b5b', '#58b368', '#a77bd6', '#f2b84b', '#4fb3bf', '#e46fa1'],
+    '--accent': ['#ffffff', '#fff3b0', '#d8ecff', '#ffe1e8', '#e2f5e1'],
+}
+
+def role_word(text):
+    return next((CHARACTER_ROLES[w] for w in re.findall(r"[a-z]+", text.lower()) if w in CHARACTER_ROLES), None)
+
+def character_descriptor(character):
+    """
+    Normalized descriptor for a structure character
+
+    A role word in the name ('Mom', 'Dentist Dan') names the sprite. For
+    supporting characters the noun phrase opening the description is tried
+    next ('A friendly dentist who...'); the rest of a description, and the
+    main character's description, are never used, since they mention other
+    people ('a boy who loves his mom'). Everyone else is drawn as a child,
+    split by pronouns.
+    """
+    role = role_word(character.get('name', ''))
+    if not role and not character.get('role', '').lower().startswith('main'):
+        description = re.sub(r"['’]s\b", '', character.get('description', ''))
+        role = role_word(PHRASE_END.split(description, maxsplit=1)[0])
+    if role:
+        return f"character:{role}"
+    return f"character:child-{normalize_pronouns(character.get('pronouns')) or 'they'}"
+
+def setting_descriptor(setting_name):
+    """Normalized descriptor for a setting name, e.g. 'setting:dentist-office'"""
+    name = re.sub(r"['’]s\b", '', setting_name.lower())
+    words = [stem(w) for w in re.findall(r"[a-z]+", name) if w not in STOPWORDS]
+    return f"setting:{'-'.join(words) or 'room'}"
+
+def library_path():
+    return os.path.join(SPRITE_DIR, LIBRARY_FILE)
+
+def load_library():
+    """Return {descriptor: {'file', 'kind', 'description'}}"""
+    path = library_path()
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f).get('sprites', {})
+
+def lookup(descriptor):
+    """Library entry for a descriptor, if its sprite file exists"""
+    entry = load_library().get(descriptor)
+    if entry and os.path.exists(os.path.join(SPRITE_DIR, entry['file'])):
+        return entry
+    return None
+
+def validate_sprite(svg):
+    """
+    Check a generated sprite
+
+    Returns:
+        list: Problems found (empty when valid)
+    """
+    if len(svg.encode('utf-8')) > MAX_SPRITE_BYTES:
+        return [f"sprite is larger than {MAX_SPRITE_BYTES} bytes; use fewer, simpler shapes"]
+    try:
+        root = ET.fromstring(svg)
+    except ET.ParseError as e:
+        return [f"sprite is not well-formed XML ({e})"]
+
+    issues = []
+    if not root.tag.endswith('svg'):
+        issues.append("sprite root element must be <svg>")
+    if not any(el.get('id') == SYMBOL_ID for el in root.iter()):
+        issues.append(f"sprite needs a <symbol id=\"{SYMBOL_ID}\"> holding the drawing")
+    for el in root.iter():
+        tag = el.tag.split('}')[-1]
+        if tag in ('script', 'foreignObject', 'image'):
+            issues.append(f"sprite must not contain <{tag}>")
+        for name, value in el.attrib.items():
+            if name.lower().startswith('on'):
+                issues.append("sprite must not have event handler attributes")
+            elif name.split('}')[-1] == 'href' and not value.startswith('#'):
+                issues.append("sprite must not reference external files")
+    return sorted(set(issues))
+
+def add_sprite(descriptor, svg, description=''):
+    """
+    Store a sprite by content hash and record it in the library
+
+    Callers in different processes must hold a shared lock (see
+    generate_story.prepare_sprites); if another process recorded the
+    descriptor first, its sprite is kept.
+
+    Returns:
+        dict: The library entry
+    """
+    existing = lookup(descriptor)
+    if existing:
+        return existing
+
+    digest = hashlib.sha256(svg.encode('utf-8')).hexdigest()[:16]
+    entry = {'file': f"{digest}.svg", 'kind': descriptor.split(':')[0], 'description': description}
+    os.makedirs(SPRITE_DIR, exist_ok=True)
+    path = os.path.join(SPRITE_DIR, entry['file'])
+    if not os.path.exists(path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(svg)
+
+    sprites = load_library()
+    sprites[descriptor] = entry
+    tmp_path = f"{library_path()}.tmp{os.getpid()}"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': LIBRARY_VERSION, 'sprites': dict(sorted(sprites.items()))}, f, indent=2)
+    os.replace(tmp_path, library_path())
+    return entry
+
+def character_params(name):
+    """CSS custom properties for a character, derived from their name so they never change"""
+    digest = hashlib.sha256(name.strip().lower().encode('utf-8')).digest()
+    return {prop: values[digest[i] % len(values)] for i, (prop, values) in enumerate(SPRITE_PARAMS.items())}
+
+def story_descriptors(structure):
+    """
+    Descriptors needed for a story's characters and settings
+
+    Returns:
+        dict: {descriptor: description of the first character or setting
+            that needs it}
+    """
+    needed = {}
+    for character in structure.get('characters', []):
+        needed.setdefault(character_descriptor(character), character.get('description', character.get('name', '')))
+    for setting in structure.get('settings', []):
+        needed.setdefault(setting_descriptor(setting['name']), setting.get('description', setting['name']))
+    for page in structure.get('pages', []):
+        if page.get('setting'):
+            needed.setdefault(setting_descriptor(page['setting']), page['setting'])
+    return needed
+
+def sprite_svg(entry, label, kind, style=''):
+    fit = ' preserveAspectRatio="xMidYMid slice"' if kind == 'setting' else ''
+    style_attr = f' style="{style}"' if style else ''
+    return (f'<svg class="sprite sprite-{kind}" viewBox="0 0 100 100"{fit} role="img" '
+            f'aria-label="{escape(label)}"{style_attr}><use href="{SPRITE_URL}/{entry["file"]}#{SYMBOL_ID}"/></svg>')
+
+def scene_markup(page_data, structure, library=None):
+    """
+    Markup for a page's visual scene built from library sprites
+
+    Returns:
+        str: A .sprite-scene block with the setting behind the characters
+            present, or None if the setting has no sprite yet
+    """
+    library = load_library() if library is None else library
+    setting = library.get(setting_descriptor(page_data.get('setting', '')))
+    if not setting:
+        return None
+
+    characters = {c['name']: c for c in structure.get('characters', [])}
+    parts = [sprite_svg(setting, page_data['setting'], 'setting')]
+    for name in page_data.get('characters_present', []):
+        entry = library.get(character_descriptor(characters.get(name, {'name': name})))
+        if entry:
+            style = ';'.join(f"{prop}:{value}" for prop, value in character_params(name).items())
+            parts.append(sprite_svg(entry, name, 'character', style))
+
+    description = escape(page_data.get('visual_description', ''))
+    return (f'<div class="visual-scene sprite-scene" role="img" aria-label="{description}">\n  '
+            + '\n  '.join(parts) + '\n</div>')
+
+def inline_sprites(page_html):
+    """
+    Replace a page's references to sprite files with symbols inlined in the page
+
+    Each sprite's ids are prefixed with its file name so symbols from
+    different sprites can't collide. References to missing sprites, and
+    any the library didn't write, are emptied, leaving no references to
+    other files.
+
+    Returns:
+        tuple: (page HTML, list of referenced sprite files that don't exist)
+    """
+    symbols, missing = {}, []
+    for name in dict.fromkeys(SPRITE_REF.findall(page_html)):
+        path = os.path.join(SPRITE_DIR, f"{name}.svg")
+        if not os.path.exists(path):
+            missing.append(f"{name}.svg")
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            svg = f.read()
+        match = re.search(r'<symbol\b.*</symbol>', svg, re.S)
+        if not match:
+            missing.append(f"{name}.svg")
+            continue
+        prefix = f"sprite-{name}-"
+        symbol = re.sub(r'\bid="([^"]+)"', lambda m: f'id="{prefix}{m.group(1)}"', match.group(0))
+        symbol = re.sub(r'(href="#|url\(#)([^")]+)', lambda m: f"{m.group(1)}{prefix}{m.group(2)}", symbol)
+        symbols[name] = symbol
+
+    page_html = SPRITE_REF.sub(
+        lambda m: f'href="#sprite-{m.group(1)}-{SYMBOL_ID}"' if m.group(1) in symbols else 'href=""', page_html)
+    missing += [m.group(3) or 'shared/sprites/' for m in OTHER_SPRITE_REF.finditer(page_html)]
+    page_html = OTHER_SPRITE_REF.sub(r'\1\2\2', page_html)
+    if not symbols:
+        return page_html, missing
+    sheet = ('<svg xmlns="http://www.w3.org/2000/svg" style="display:none" aria-hidden="true">\n'
+             + '\n'.join(symbols.values()) + '\n</svg>')
+    body = re.search(r'<body\b[^>]*>', page_html)
+    if body:
+        return page_html[:body.end()] + '\n' + sheet + '\n' + page_html[body.end():], missing
+    return sheet + '\n' + page_html, missing
@@ -0,0 +1,378 @@
+"""
+Unified command line interface for the story scripts
+
+Subcommand modules are only imported when that subcommand runs, and the
+OpenAI SDK is only loaded by commands that call the API, so validation and
+index maintenance start quickly and don't need an API key.
+
+Usage:
+    python story_cli.py generate "Geo is going to the dentist with his mom"
+    python story_cli.py similar "Maya goes to the dentist"
+    python story_cli.py personalize stories/2025-01-01-example --name Maya --pronouns she --set Mom=Dad
+    python story_cli.py localize stories/2025-01-01-example es fr de
+    python story_cli.py validate [story_dir | --latest | --all] [--from-metadata]
+    python story_cli.py audio stories/2025-01-01-example
+    python story_cli.py index
+    python story_cli.py package stories/2025-01-01-example [--format zip epub] [--out packages]
+    python story_cli.py warmup [--dry-run] [--budget 20000] [--families 2]
+    python story_cli.py store ingest --all | gc [--dry-run] | export _site | materialize stories/2025-01-01-example
+    python story_cli.py bench
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, script_dir)
+
+STORIES_DIR = 'stories'
+INDEX_PATH = os.path.join(STORIES_DIR, 'index.json')
+
+def find_story_dirs():
+    """Return generated story directories, oldest first"""
+    return sorted(glob.glob(os.path.join(STORIES_DIR, '2*')))
+
+def print_validation_status(validation):
+    print(f"🔍 Validation Score: {validation['percentage']:.1f}%")
+    print(f"Status: {'✅ PASSING' if validation['passing'] else '❌ FAILING'}")
+
+    if not validation['passing']:
+        print('❌ Story does not meet quality standards!')
+        print('Issues:')
+        for issue in validation['issues']:
+            print(f'  - {issue}')
+        return 1
+
+    print('✅ Story meets quality standards!')
+    return 0
+
+def cmd_generate(args):
+    import generate_story
+
+    on_duplicate = args.on_duplicate
+    if on_duplicate is None:
+        on_duplicate = 'ask' if sys.stdin.isatty() else generate_story.ON_DUPLICATE
+    generate_story.main(' '.join(args.topic), on_duplicate=on_duplicate)
+    return 0
+
+def cmd_similar(args):
+    from story_dedup import find_similar_stories
+
+    matches = find_similar_stories(' '.join(args.topic), threshold=args.threshold)
+    if not matches:
+        print('✅ No similar stories found')
+        return 0
+
+    for match in matches:
+        print(f"{match['similarity']:.0%}  {match['path']}  {match['title']}  (matched on {match['matched_on']})")
+    return 0
+
+def cmd_personalize(args):
+    from story_templates import MAIN_SLOT, instantiate_template
+
+    overrides = {}
+    if args.name or args.pronouns:
+        overrides[MAIN_SLOT] = {'name': args.name, 'pronouns': args.pronouns}
+    for assignment in args.set or []:
+        # "Mom=Dad" or "Mom=Dad:he"
+        target, _, value = assignment.partition('=')
+        name, _, pronouns = value.partition(':')
+        overrides[target.strip()] = {'name': name.strip() or None, 'pronouns': pronouns.strip() or None}
+
+    if not overrides:
+        print('❌ Nothing to personalize; pass --name, --pronouns or --set')
+        return 1
+
+    result = instantiate_template(args.story_dir, overrides, args.tts_model, args.tts_voice)
+    return 0 if result['validation']['passing'] else 1
+
+def cmd_localize(args):
+    from artifact_store import ingest_story
+    from localize_story import localize_story
+    from story_navigation import write_navigation
+
+    locales = [l for value in args.locales for l in value.split(',') if l.strip()]
+    result = localize_story(args.story_dir, locales, model=args.model,
+                            tts_model=args.tts_model, tts_voice=args.tts_voice,
+                            audio=not args.no_audio)
+    ingest_story(args.story_dir)
+    write_navigation(args.story_dir)
+    failed = sum(r['failed'] for r in result['audio'].values())
+    return 1 if failed else 0
+
+def cmd_validate(args):
+    if args.all:
+        from validate_story import validate_all_stories
+
+        results = validate_all_stories()
+        return 0 if results and results['all_passing'] else 1
+
+    if args.story_dir:
+        story_dir = args.story_dir
+    else:
+        story_dirs = find_story_dirs()
+        if not story_dirs:
+            print('❌ No story folders found')
+            return 1
+        story_dir = story_dirs[-1]
+
+    if args.from_metadata:
+        # Check the validation recorded at generation time instead of re-running it
+        meta_file = os.path.join(story_dir, 'story.json')
+        print(f'Story: {story_dir}')
+        if not os.path.exists(meta_file):
+            print('⚠️  No metadata file found for latest story')
+            print('✅ Proceeding with deployment (no metadata available)')
+            return 0
+        with open(meta_file, 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+        if 'validation' not in metadata:
+            print('⚠️  No validation data found in metadata')
+            print('✅ Proceeding with deployment (no validation data)')
+            return 0
+        return print_validation_status(metadata['validation'])
+
+    from validate_story import validate_story
+
+    return print_validation_status(validate_story(story_dir))
+
+def cmd_audio(args):
+    from artifact_store import ingest_story, resolve_artifact
+    from generate_audio import generate_audio_file, extract_narration_from_html
+    from narration import load_timing, narrate_pages
+    from story_navigation import write_navigation
+
+    page_files = sorted(glob.glob(os.path.join(args.story_dir, 'pages', 'page-*.html')))
+    if not page_files:
+        print(f'❌ No pages found in {args.story_dir}')
+        return 1
+
+    audio_dir = os.path.join(args.story_dir, 'audio')
+    # Stories narrated with a voice per character keep a timing manifest
+    multi_voice = args.voices or bool(load_timing(audio_dir))
+    page_texts = {}
+    failed = 0
+    for page_file in page_files:
+        audio_name = os.path.basename(page_file).replace('.html', '.mp3')
+        output_path = os.path.join(audio_dir, audio_name)
+        if resolve_artifact(args.story_dir, f'audio/{audio_name}') and not args.force:
+            continue
+
+        with open(page_file, 'r', encoding='utf-8') as f:
+            narration = extract_narration_from_html(f.read())
+        if not narration:
+            print(f'⚠️  No narration text in {os.path.basename(page_file)}, skipping')
+            failed += 1
+            continue
+        if multi_voice:
+            page_texts[int(re.search(r'(\d+)', audio_name).group(1))] = narration
+        elif not generate_audio_file(narration, output_path, args.model, args.voice):
+            failed += 1
+
+    if page_texts:
+        with open(os.path.join(args.story_dir, 'structure.json'), 'r', encoding='utf-8') as f:
+            characters = json.load(f).get('characters', [])
+        failed += narrate_pages(page_texts, audio_dir, characters, args.model, args.voice)['failed']
+
+    ingest_story(args.story_dir)
+    write_navigation(args.story_dir)
+    return 1 if failed else 0
+
+def cmd_index(args):
+    """Rebuild stories/index.json from each story's story.json, and each story's navigation.json"""
+    from story_navigation import write_navigation
+
+    stories = []
+    for meta_file in sorted(glob.glob(os.path.join(STORIES_DIR, '*', 'story.json'))):
+        with open(meta_file, 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+        stories.append({
+            "date": metadata.get('generated_date'),
+            "slug": metadata.get('slug'),
+            "title": metadata.get('title'),
+            "topic": metadata.get('topic'),
+            "pages": metadata.get('pages'),
+            "path": os.path.basename(os.path.dirname(meta_file))
+        })
+    stories.sort(key=lambda s: (s['date'] or '', s['path']))
+
+    with open(INDEX_PATH, 'w', encoding='utf-8') as f:
+        json.dump(stories, f, indent=2)
+
+    for story in stories:
+        write_navigation(os.path.join(STORIES_DIR, story['path']))
+
+    print(f"✅ Rebuilt {INDEX_PATH} and navigation for {len(stories)} stories")
+    return 0
+
+def cmd_store(args):
+    import artifact_store
+
+    if args.action == 'ingest':
+        story_dirs = glob.glob(os.path.join(STORIES_DIR, '*', '')) if args.all else args.story_dirs
+        for story_dir in story_dirs:
+            artifact_store.ingest_story(story_dir.rstrip(os.sep))
+    elif args.action == 'materialize':
+        for story_dir in args.story_dirs:
+            count = artifact_store.materialize_story(story_dir)
+            print(f"✅ Materialized {count} artifacts in {story_dir}")
+    elif args.action == 'export':
+        artifact_store.export_site(args.out)
+    elif args.action == 'gc':
+        artifact_store.collect_garbage(dry_run=args.dry_run)
+    return 0
+
+def cmd_package(args):
+    from story_package import package_story
+
+    for story_dir in args.story_dirs:
+        package_story(story_dir.rstrip(os.sep), args.format, args.out)
+    return 0
+
+def cmd_warmup(args):
+    from warmup import run_warmup
+
+    run_warmup(budget=args.budget, max_families=args.families, dry_run=args.dry_run)
+    return 0
+
+def cmd_bench(args):
+    """Time a cold start of each subcommand's imports and a full validation pass"""
+    benchmarks = {
+        'cli startup': 'import story_cli',
+        'validate': 'import validate_story',
+        'audio': 'import generate_audio',
+        'generate': 'import generate_story',
+        'openai sdk': 'import openai',
+    }
+
+    print(f"⏱️  Cold start times (best of {args.repeat}):")
+    for name, statement in benchmarks.items():
+        best = None
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result = subprocess.run(
+                [sys.executable, '-c', statement],
+                cwd=script_dir,
+                capture_output=True
+            )
+            elapsed = time.perf_counter() - start
+            if result.returncode != 0:
+                best = None
+                break
+            best = elapsed if best is None else min(best, elapsed)
+        print(f"   {name:<12} {f'{best * 1000:.0f} ms' if best is not None else 'unavailable'}")
+
+    from validate_story import validate_story
+
+    story_dirs = find_story_dirs() or glob.glob(os.path.join(STORIES_DIR, '*', ''))
+    if story_dirs:
+        start = time.perf_counter()
+        for story_dir in story_dirs:
+            validate_story(story_dir)
+        elapsed = time.perf_counter() - start
+        print(f"\n⏱️  Validated {len(story_dirs)} stories in {elapsed * 1000:.0f} ms")
+    return 0
+
+# Each handler imports the modules it needs when it runs
+COMMANDS = {
+    'generate': cmd_generate,
+    'similar': cmd_similar,
+    'personalize': cmd_personalize,
+    'localize': cmd_localize,
+    'validate': cmd_validate,
+    'audio': cmd_audio,
+    'index': cmd_index,
+    'store': cmd_store,
+    'package': cmd_package,
+    'warmup': cmd_warmup,
+    'bench': cmd_bench,
+}
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="AI social story generator tools")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    generate_parser = subparsers.add_parser('generate', help="Generate a story from a topic")
+    generate_parser.add_argument('topic', nargs='+')
+    generate_parser.add_argument('--on-duplicate', choices=['warn', 'ask', 'reuse', 'fork', 'abort'],
+                                 help="What to do when a similar story already exists")
+
+    similar_parser = subparsers.add_parser('similar', help="List existing stories similar to a topic")
+    similar_parser.add_argument('topic', nargs='+')
+    similar_parser.add_argument('--threshold', type=float, default=0.3)
+
+    personalize_parser = subparsers.add_parser('personalize', help="Render a personalized variant of a story")
+    personalize_parser.add_argument('story_dir', help="Story to use as the template")
+    personalize_parser.add_argument('--name', help="New name for the main character")
+    personalize_parser.add_argument('--pronouns', choices=['he', 'she', 'they'],
+                                    help="Pronouns for the main character")
+    personalize_parser.add_argument('--set', action='append', metavar='CHARACTER=NAME[:PRONOUNS]',
+                                    help="Rename another character, e.g. Mom=Dad or Mom=Grandma:she")
+    personalize_parser.add_argument('--tts-model', default='tts-1')
+    personalize_parser.add_argument('--tts-voice', default='alloy')
+
+    localize_parser = subparsers.add_parser('localize', help="Translate a story into other languages")
+    localize_parser.add_argument('story_dir')
+    localize_parser.add_argument('locales', nargs='+', help="Locale codes, e.g. es fr de")
+    localize_parser.add_argument('--model', help="Chat model for translation")
+    localize_parser.add_argument('--tts-model', default='tts-1')
+    localize_parser.add_argument('--tts-voice', default='alloy')
+    localize_parser.add_argument('--no-audio', action='store_true', help="Skip locale audio")
+
+    validate_parser = subparsers.add_parser('validate', help="Validate a story (latest by default)")
+    target = validate_parser.add_mutually_exclusive_group()
+    target.add_argument('story_dir', nargs='?')
+    target.add_argument('--latest', action='store_true', help="Validate the most recent story (default)")
+    target.add_argument('--all', action='store_true', help="Validate every story")
+    validate_parser.add_argument('--from-metadata', action='store_true',
+                                 help="Check the validation stored in story.json instead of re-running it")
+
+    audio_parser = subparsers.add_parser('audio', help="Generate missing page audio for a story")
+    audio_parser.add_argument('story_dir')
+    audio_parser.add_argument('--model', default='tts-1')
+    audio_parser.add_argument('--voice', default='alloy')
+    audio_parser.add_argument('--force', action='store_true', help="Regenerate existing audio files")
+    audio_parser.add_argument('--voices', action='store_true',
+                              help="Voice each character separately (default for stories already narrated that way)")
+
+    subparsers.add_parser('index', help="Rebuild stories/index.json and story navigation manifests")
+
+    store_parser = subparsers.add_parser('store', help="Manage the content-addressed artifact store")
+    store_actions = store_parser.add_subparsers(dest='action', required=True)
+    ingest_parser = store_actions.add_parser('ingest', help="Move story audio into the store")
+    ingest_parser.add_argument('story_dirs', nargs='*')
+    ingest_parser.add_argument('--all', action='store_true', help="Ingest every story")
+    materialize_parser = store_actions.add_parser('materialize', help="Write stored audio back into story folders")
+    materialize_parser.add_argument('story_dirs', nargs='+')
+    export_parser = store_actions.add_parser('export', help="Write a hostable copy of the site")
+    export_parser.add_argument('out', nargs='?', default='_site')
+    gc_parser = store_actions.add_parser('gc', help="Delete blobs no story references")
+    gc_parser.add_argument('--dry-run', action='store_true')
+
+    package_parser = subparsers.add_parser('package', help="Write a story as a single ZIP or EPUB file")
+    package_parser.add_argument('story_dirs', nargs='+')
+    package_parser.add_argument('--format', nargs='+', choices=['zip', 'epub'], help="Package formats (default: both)")
+    package_parser.add_argument('--out', help="Output directory (default: packages)")
+
+    warmup_parser = subparsers.add_parser('warmup', help="Pre-generate structures for popular themes")
+    warmup_parser.add_argument('--budget', type=int, help="Token budget for today (default: STORY_WARMUP_BUDGET)")
+    warmup_parser.add_argument('--families', type=int, help="Warm at most this many families")
+    warmup_parser.add_argument('--dry-run', action='store_true', help="Show what would be warmed")
+
+    bench_parser = subparsers.add_parser('bench', help="Measure script startup and validation time")
+    bench_parser.add_argument('--repeat', type=int, default=3)
+
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return COMMANDS[args.command](args)
+
+if __name__ == "__main__":
+    sys.exit(main())
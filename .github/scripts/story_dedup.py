@@ -0,0 +1,242 @@
+"""
+Near-duplicate topic detection for the story library
+
+Each story's topic, title and learning objectives are reduced to MinHash
+signatures and stored in stories/topic_index.json. Signatures are bucketed
+with LSH banding, so checking a new topic only compares it against stories
+that share at least one band instead of the whole library. Entries are
+refreshed automatically when a story's story.json changes.
+"""
+
+import hashlib
+import json
+import os
+import re
+
+STORIES_DIR = 'stories'
+INDEX_FILE = 'topic_index.json'
+INDEX_VERSION = 2
+
+NUM_PERM = 64
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+DUPLICATE_THRESHOLD = 0.6
+MAX_MATCHES = 5
+
+# Field weights: a matching topic counts more than overlapping objectives
+FIELD_WEIGHTS = {'topic': 1.0, 'title': 0.9, 'objectives': 0.7}
+
+STOPWORDS = {
+    'a', 'an', 'the', 'and', 'or', 'to', 'of', 'for', 'with', 'in', 'on', 'at', 'by',
+    'is', 'are', 'be', 'his', 'her', 'their', 'its', 'he', 'she', 'they', 'it', 'my', 'our', 'your',
+    'going', 'goes', 'go', 'first', 'time', 'day', 'about', 'from', 'what', 'when',
+    'how', 'new', 'story', 'learning', 'understanding', 'understand', 'learn',
+}
+
+# Topics usually open with the child's name ("Geo is going to...")
+NAME_FOLLOWERS = {'is', 'goes', 'has', 'gets', 'visits', 'will', 'needs', 'takes', 'starts', 'learns', 'and'}
+
+# Who the story is about varies between requests; the situation doesn't
+RELATIONSHIP_WORDS = {
+    'mom', 'mum', 'mother', 'dad', 'father', 'parent', 'parents', 'sister', 'brother',
+    'grandma', 'grandpa', 'grandmother', 'grandfather', 'aunt', 'uncle', 'cousin',
+    'family', 'friend', 'friends', 'child', 'kid', 'boy', 'girl', 'baby', 'little',
+}
+
+_MASK = (1 << 61) - 1
+_PERMUTATIONS = [
+    (int.from_bytes(hashlib.blake2b(f'a{i}'.encode(), digest_size=8).digest(), 'big') | 1,
+     int.from_bytes(hashlib.blake2b(f'b{i}'.encode(), digest_size=8).digest(), 'big'))
+    for i in range(NUM_PERM)
+]
+
+def stem(word):
+    """Very small suffix stripper so 'dentists'/'dentist' and 'haircuts'/'haircut' match"""
+    for suffix in ('ing', 'es', 's'):
+        if len(word) > len(suffix) + 3 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+def tokenize(text, names=()):
+    """
+    Normalize text to a set of content tokens
+
+    Args:
+        text: Text to tokenize
+        names: Character names to drop (case-insensitive)
+
+    Besides the given names, only a leading name is dropped ("Geo is
+    going...", "Geo's Big Trip..."). Other capitalized words are kept, so
+    title-case topics and titles tokenize like their lowercase spelling.
+
+    Returns:
+        set: Stemmed tokens without stopwords, names or relationship words
+    """
+    names = {n.lower() for name in names for n in name.split()}
+    words = re.findall(r"[A-Za-z][A-Za-z']*", text)
+    tokens = set()
+    for position, word in enumerate(words):
+        lower = word.lower().replace("'s", '').strip("'")
+        if lower in STOPWORDS or lower in RELATIONSHIP_WORDS or lower in names:
+            continue
+        if position == 0 and word[0].isupper() and (
+                word.lower().endswith("'s") or (len(words) > 1 and words[1].lower() in NAME_FOLLOWERS)):
+            continue
+        tokens.add(stem(lower))
+    return tokens
+
+def _hash_token(token):
+    return int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), 'big')
+
+def minhash(tokens):
+    """Return the MinHash signature (list of NUM_PERM ints) for a token set"""
+    if not tokens:
+        return []
+    hashes = [_hash_token(t) for t in tokens]
+    return [min((a * h + b) & _MASK for h in hashes) for a, b in _PERMUTATIONS]
+
+def estimate_similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of the token sets behind two signatures"""
+    if not sig_a or not sig_b:
+        return 0.0
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+def band_keys(signature):
+    """LSH bucket keys for a signature"""
+    if not signature:
+        return []
+    return [f"{band}:{hash_band(signature[band * ROWS:(band + 1) * ROWS])}" for band in range(BANDS)]
+
+def hash_band(values):
+    return hashlib.blake2b(','.join(map(str, values)).encode(), digest_size=8).hexdigest()
+
+def story_fields(entry, metadata):
+    """Collect the text fields indexed for one story"""
+    topic = metadata.get('topic') or entry.get('topic') or ''
+    title = metadata.get('title') or entry.get('title') or ''
+    objectives = ' '.join(metadata.get('learning_objectives') or [])
+    return {'topic': topic, 'title': title, 'objectives': objectives}
+
+def load_index(stories_dir=STORIES_DIR, index_path=None):
+    """
+    Load the topic index, refreshing entries for new or changed stories
+
+    Returns:
+        dict: {'version', 'stories': {path: entry}, 'buckets': {band key: [paths]}}
+    """
+    index_path = index_path or os.path.join(stories_dir, INDEX_FILE)
+    index = {'version': INDEX_VERSION, 'stories': {}}
+    if os.path.exists(index_path):
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached.get('version') == INDEX_VERSION:
+                index = cached
+        except (OSError, json.JSONDecodeError):
+            pass
+
+    library_path = os.path.join(stories_dir, 'index.json')
+    library = []
+    if os.path.exists(library_path):
+        with open(library_path, 'r', encoding='utf-8') as f:
+            library = json.load(f)
+
+    changed = False
+    seen = set()
+    for entry in library:
+        path = entry.get('path')
+        if not path:
+            continue
+        seen.add(path)
+        meta_file = os.path.join(stories_dir, path, 'story.json')
+        raw = b''
+        if os.path.exists(meta_file):
+            with open(meta_file, 'rb') as f:
+                raw = f.read()
+        # Keyed on content rather than mtime so fresh checkouts reuse the cache
+        digest = hashlib.blake2b(raw + json.dumps(entry, sort_keys=True).encode(), digest_size=16).hexdigest()
+        cached = index['stories'].get(path)
+        if cached and cached.get('digest') == digest:
+            continue
+
+        metadata = json.loads(raw) if raw else {}
+        names = metadata.get('characters') or []
+        index['stories'][path] = {
+            'digest': digest,
+            'title': metadata.get('title') or entry.get('title'),
+            'topic': metadata.get('topic') or entry.get('topic'),
+            'names': names,
+            'signatures': {
+                field: minhash(tokenize(text, names))
+                for field, text in story_fields(entry, metadata).items()
+            }
+        }
+        changed = True
+
+    for path in list(index['stories']):
+        if path not in seen:
+            del index['stories'][path]
+            changed = True
+
+    if changed:
+        index['buckets'] = build_buckets(index['stories'])
+        with open(index_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+
+    return index
+
+def build_buckets(stories):
+    buckets = {}
+    for path, entry in stories.items():
+        for signature in entry['signatures'].values():
+            for key in band_keys(signature):
+                bucket = buckets.setdefault(key, [])
+                if path not in bucket:
+                    bucket.append(path)
+    return buckets
+
+def find_similar_stories(topic, threshold=DUPLICATE_THRESHOLD, stories_dir=STORIES_DIR):
+    """
+    Find existing stories whose topic, title or objectives resemble a topic
+
+    Args:
+        topic: The requested story topic
+        threshold: Minimum weighted similarity to report
+        stories_dir: Library directory containing index.json
+
+    Returns:
+        list: Matches sorted by similarity, each a dict with path, title,
+            topic, similarity and the field that matched
+    """
+    index = load_index(stories_dir)
+    stories = index['stories']
+    known_names = {name for entry in stories.values() for name in entry.get('names', [])}
+    signature = minhash(tokenize(topic, known_names))
+    if not signature:
+        return []
+
+    candidates = set()
+    buckets = index.get('buckets', {})
+    for key in band_keys(signature):
+        candidates.update(buckets.get(key, []))
+
+    matches = []
+    for path in candidates:
+        entry = stories[path]
+        best_field, best_score = None, 0.0
+        for field, story_signature in entry['signatures'].items():
+            score = estimate_similarity(signature, story_signature) * FIELD_WEIGHTS.get(field, 1.0)
+            if score > best_score:
+                best_field, best_score = field, score
+        if best_score >= threshold:
+            matches.append({
+                'path': path,
+                'story_dir': os.path.join(stories_dir, path),
+                'title': entry['title'],
+                'topic': entry['topic'],
+                'similarity': round(best_score, 3),
+                'matched_on': best_field
+            })
+
+    matches.sort(key=lambda m: m['similarity'], reverse=True)
+    return matches[:MAX_MATCHES]
@@ -0,0 +1,87 @@
+"""
+Per-story navigation manifest
+
+navigation.json lists a story's pages in reading order with the URL, byte
+size and duration of each page's audio. shared/reader.js reads it to
+prefetch the next page and preload its audio while the current page is
+being read, within a bandwidth budget, so turning the page doesn't wait on
+the network. Sizes come from the artifact store manifest and durations
+from the narration timing manifest, falling back to the audio file itself.
+
+Locale subdirectories get their own navigation.json next to their pages.
+"""
+
+import glob
+import json
+import os
+
+from artifact_store import load_manifest, resolve_artifact
+from mp3_frames import mp3_duration
+from narration import TIMING_FILE
+
+NAVIGATION_FILE = 'navigation.json'
+NAVIGATION_VERSION = 1
+
+def build_navigation(story_dir, locale=None):
+    """
+    Describe the pages of a story (or of one of its locales)
+
+    Args:
+        story_dir: Story directory
+        locale: Locale subdirectory, e.g. 'es' (default: the story itself)
+
+    Returns:
+        dict: Manifest with a 'pages' list; URLs are relative to the
+            directory the manifest is written to
+    """
+    prefix = f"{locale}/" if locale else ''
+    base_dir = os.path.join(story_dir, locale) if locale else story_dir
+    stored = load_manifest(story_dir)
+
+    timing_path = os.path.join(base_dir, 'audio', TIMING_FILE)
+    timing = {}
+    if os.path.exists(timing_path):
+        with open(timing_path, 'r', encoding='utf-8') as f:
+            timing = json.load(f).get('pages', {})
+
+    pages = []
+    for page_file in sorted(glob.glob(os.path.join(base_dir, 'pages', 'page-*.html'))):
+        name = os.path.splitext(os.path.basename(page_file))[0]
+        entry = {'page': int(name.split('-')[1]), 'url': f"pages/{name}.html",
+                 'audio': None, 'bytes': 0, 'duration': None}
+
+        audio = f"audio/{name}.mp3"
+        audio_path = resolve_artifact(story_dir, prefix + audio)
+        if audio_path:
+            entry['audio'] = audio
+            entry['bytes'] = stored.get(prefix + audio, {}).get('size') or os.path.getsize(audio_path)
+            duration = timing.get(name, {}).get('duration')
+            entry['duration'] = round(duration if duration is not None else mp3_duration(audio_path), 3)
+        pages.append(entry)
+
+    return {
+        'version': NAVIGATION_VERSION,
+        'pages': pages,
+        'total_bytes': sum(p['bytes'] for p in pages),
+        'total_duration': round(sum((p['duration'] or 0 for p in pages), 0.0), 3)
+    }
+
+def write_navigation(story_dir):
+    """
+    Write navigation.json for a story and each of its locales
+
+    Returns:
+        list: Paths written
+    """
+    written = []
+    locales = [None] + sorted(os.path.basename(os.path.dirname(d))
+                              for d in glob.glob(os.path.join(story_dir, '*', 'pages')) if os.path.isdir(d))
+    for locale in locales:
+        navigation = build_navigation(story_dir, locale)
+        if not navigation['pages']:
+            continue
+        path = os.path.join(story_dir, locale or '', NAVIGATION_FILE)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(navigation, f, indent=2)
+        written.append(path)
+    return written
@@ -0,0 +1,393 @@
+"""
+Single-file story packages (ZIP and EPUB 3)
+
+A story on the site is a directory tree, but some readers need one file to
+download. A package is written as a stream: each artifact is added once,
+when it is produced, and nothing is read back from the package. The
+pipeline passes generated pages and interactive content straight from
+memory and audio as it is synthesized, and `package_story` builds the same
+packages for an existing story by walking its files (through the artifact
+store). Files are copied in chunks, so memory stays bounded however large
+the audio is, and MP3s are stored as they are instead of being compressed
+a second time.
+
+ZIP packages mirror the site layout (stories/<story>/ plus shared/) so the
+story opens in a browser from the unpacked folder. Browsers don't let
+file:// pages fetch JSON or use symbols from other files, so the ZIP's pages
+carry the sprites and activity content they use; pages with activities are
+held back until the activities have been added, then written once. EPUB packages hold one
+page per story page with its narration, and a media overlay per page that
+links the page text to its page-NN.mp3 so reading systems can read along.
+"""
+
+import glob
+import html
+import json
+import os
+import re
+import time
+import uuid
+import zipfile
+from datetime import datetime, timezone
+from fnmatch import fnmatch
+
+from artifact_store import MANIFEST_FILE, load_manifest, resolve_artifact
+from interactive_content import ACTIVITY_SOURCE, embed_activities
+from mp3_frames import Mp3Duration
+from sprite_library import inline_sprites
+
+PACKAGE_DIR = 'packages'
+SHARED_DIR = 'shared'
+PACKAGE_FORMATS = ['zip', 'epub']
+CHUNK_SIZE = 1 << 16
+
+# Already-compressed formats are stored rather than deflated again
+STORED_SUFFIXES = {'.mp3', '.png', '.jpg', '.jpeg', '.gif', '.webp', '.zip', '.epub'}
+
+# Never packaged (the manifest only points at the store; temp files are partial writes)
+SKIP_PATTERNS = [MANIFEST_FILE, '*.tmp*', 'template.json']
+
+ACTIVITY_PATTERN = re.compile(r'^interactive/([a-z]+)\.json$')
+PAGE_PATTERN = re.compile(r'^pages/page-(\d+)\.html$')
+AUDIO_PATTERN = re.compile(r'^audio/page-(\d+)\.mp3$')
+
+def iter_story_files(story_dir):
+    """
+    Yield (relative path, file path) for every file that belongs to a story
+
+    Files in the story directory come first, then stored artifacts (audio)
+    that only exist in the store.
+    """
+    seen = set()
+    for path in sorted(glob.glob(os.path.join(story_dir, '**', '*'), recursive=True)):
+        relative = os.path.relpath(path, story_dir).replace(os.sep, '/')
+        if os.path.isdir(path) or any(fnmatch(os.path.basename(relative), p) for p in SKIP_PATTERNS):
+            continue
+        seen.add(relative)
+        yield relative, path
+
+    for relative in sorted(load_manifest(story_dir)):
+        if relative not in seen:
+            path = resolve_artifact(story_dir, relative)
+            if path:
+                yield relative, path
+
+class PackageWriter:
+    """
+    Stream files into a ZIP archive, one entry at a time
+
+    The archive is written to a temporary file and only moved into place by
+    close(), so a package that exists is always complete.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.tmp_path = f"{path}.partial{os.getpid()}"
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.archive = zipfile.ZipFile(self.tmp_path, 'w', allowZip64=True)
+        self.added = set()
+        self.bytes = 0
+
+    def _info(self, arcname, compress=None):
+        info = zipfile.ZipInfo(arcname, time.localtime()[:6])
+        if compress is None:
+            compress = os.path.splitext(arcname)[1].lower() not in STORED_SUFFIXES
+        info.compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+        info.external_attr = 0o644 << 16
+        return info
+
+    def add_bytes(self, arcname, data, compress=None):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self.archive.writestr(self._info(arcname, compress), data)
+        self.added.add(arcname)
+        self.bytes += len(data)
+
+    def add_file(self, arcname, path, compress=None, observer=None):
+        """Copy a file into the archive in chunks, passing each chunk to observer if given"""
+        with open(path, 'rb') as src, self.archive.open(self._info(arcname, compress), 'w', force_zip64=True) as dest:
+            for chunk in iter(lambda: src.read(CHUNK_SIZE), b''):
+                dest.write(chunk)
+                if observer:
+                    observer(chunk)
+                self.bytes += len(chunk)
+        self.added.add(arcname)
+
+    def close(self):
+        self.archive.close()
+        os.replace(self.tmp_path, self.path)
+        return self.path
+
+    def abort(self):
+        self.archive.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+class ZipPackage(PackageWriter):
+    """The story folder plus the shared site files, laid out like the site"""
+
+    extension = 'zip'
+
+    def __init__(self, path, story_dir, structure):
+        super().__init__(path)
+        self.story_name = os.path.basename(os.path.normpath(story_dir))
+        self.activities = {}
+        self.held = {}  # pages waiting for activity content
+
+    def arcname(self, relative):
+        return f"stories/{self.story_name}/{relative}"
+
+    def add_artifact(self, relative, data=None, path=None):
+        """Add one story file, from memory (data) or from disk (path)"""
+        if relative.endswith('.html'):
+            # The unpacked ZIP is opened from file://, where references to
+            # other files' symbols don't render, so sprites are inlined
+            if data is None:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = f.read()
+            data, missing = inline_sprites(data)
+            if missing:
+                print(f"⚠️  {relative}: sprites not found ({', '.join(missing)}), scene will be blank in the package")
+            if ACTIVITY_SOURCE.search(data):
+                self.held[relative] = data
+                return
+        activity = ACTIVITY_PATTERN.match(relative)
+        if activity:
+            if data is None:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = f.read()
+            self.activities[activity.group(1)] = json.loads(data)
+        if data is not None:
+            self.add_bytes(self.arcname(relative), data)
+        else:
+            self.add_file(self.arcname(relative), path)
+
+    def has_artifact(self, relative):
+        return relative in self.held or self.arcname(relative) in self.added
+
+    def finish(self):
+        for relative, data in sorted(self.held.items()):
+            data, missing = embed_activities(data, self.activities)
+            if missing:
+                print(f"⚠️  {relative}: activities not found ({', '.join(missing)}), they won't load offline")
+            self.add_bytes(self.arcname(relative), data)
+        for path in sorted(glob.glob(os.path.join(SHARED_DIR, '*'))):
+            if os.path.isfile(path):
+                self.add_file(f"shared/{os.path.basename(path)}", path)
+        # Opening the unpacked folder's index.html goes straight to the story
+        self.add_bytes('index.html', (
+            '<!DOCTYPE html>\n<html lang="en">\n<head>\n<meta charset="UTF-8">\n'
+            f'<meta http-equiv="refresh" content="0; url={self.arcname("index.html")}">\n'
+            f'<title>{html.escape(self.story_name)}</title>\n</head>\n<body>\n'
+            f'<p><a href="{self.arcname("index.html")}">Open the story</a></p>\n</body>\n</html>\n'))
+        return self.close()
+
+class EpubPackage(PackageWriter):
+    """An EPUB 3 book with one page per story page and read-aloud media overlays"""
+
+    extension = 'epub'
+    ACTIVE_CLASS = '-epub-media-overlay-active'
+
+    def __init__(self, path, story_dir, structure, language='en'):
+        super().__init__(path)
+        self.story_dir = story_dir
+        self.structure = structure
+        self.language = language
+        self.pages = {}  # page number -> narration text
+        self.durations = {}  # page number -> seconds of audio
+        # mimetype must be the first entry, uncompressed
+        self.add_bytes('mimetype', 'application/epub+zip', compress=False)
+
+    def has_artifact(self, relative):
+        page = PAGE_PATTERN.match(relative)
+        if page:
+            return int(page.group(1)) in self.pages
+        audio = AUDIO_PATTERN.match(relative)
+        return audio is None or int(audio.group(1)) in self.durations
+
+    def structure_page(self, number):
+        return next((p for p in self.structure.get('pages', []) if int(p.get('page_number', 0)) == number), {})
+
+    def add_artifact(self, relative, data=None, path=None):
+        """Add a page (as XHTML) or page audio; other story files aren't part of the book"""
+        from generate_audio import get_page_narration
+
+        page = PAGE_PATTERN.match(relative)
+        audio = AUDIO_PATTERN.match(relative)
+        if page:
+            number = int(page.group(1))
+            if data is None:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = f.read()
+            self.add_page(number, get_page_narration(self.structure_page(number), data))
+        elif audio:
+            number = int(audio.group(1))
+            counter = Mp3Duration()
+            if data is not None:
+                counter.feed(data)
+                self.add_bytes(f"OEBPS/audio/page-{number:02d}.mp3", data)
+            else:
+                self.add_file(f"OEBPS/audio/page-{number:02d}.mp3", path, observer=counter.feed)
+            self.durations[number] = counter.seconds
+
+    def add_page(self, number, text):
+        self.pages[number] = text
+        title = html.escape(self.structure.get('title', 'Story'))
+        self.add_bytes(f"OEBPS/page-{number:02d}.xhtml", (
+            '<?xml version="1.0" encoding="UTF-8"?>\n<!DOCTYPE html>\n'
+            f'<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops" '
+            f'xml:lang="{self.language}" lang="{self.language}">\n'
+            f'<head>\n<meta charset="UTF-8"/>\n<title>{title} - Page {number}</title>\n'
+            '<link rel="stylesheet" type="text/css" href="style.css"/>\n</head>\n'
+            f'<body>\n<section epub:type="chapter" id="page-{number:02d}">\n<h2>Page {number}</h2>\n'
+            f'<p class="narration" id="narration">{html.escape(text)}</p>\n</section>\n</body>\n</html>\n'))
+
+    @staticmethod
+    def clock(seconds):
+        hours, rest = divmod(seconds, 3600)
+        minutes, seconds = divmod(rest, 60)
+        return f"{int(hours)}:{int(minutes):02d}:{seconds:06.3f}"
+
+    def finish(self):
+        from generate_audio import get_page_narration
+
+        # Pages that never got HTML are written from the structure
+        for page in self.structure.get('pages', []):
+            number = int(page.get('page_number', 0))
+            if number and number not in self.pages:
+                self.add_page(number, get_page_narration(page))
+
+        numbers = sorted(self.pages)
+        title = html.escape(self.structure.get('title', 'Story'))
+        story_name = os.path.basename(os.path.normpath(self.story_dir))
+        book_id = uuid.uuid5(uuid.NAMESPACE_URL, f"social-story:{story_name}")
+        modified = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+        manifest, spine, durations = [], [], []
+        for n in numbers:
+            overlay = ''
+            if n in self.durations:
+                overlay = f' media-overlay="page-{n:02d}-overlay"'
+                manifest.append(f'<item id="page-{n:02d}-overlay" href="page-{n:02d}.smil" media-type="application/smil+xml"/>')
+                manifest.append(f'<item id="page-{n:02d}-audio" href="audio/page-{n:02d}.mp3" media-type="audio/mpeg"/>')
+                durations.append(f'<meta property="media:duration" refines="#page-{n:02d}-overlay">{self.clock(self.durations[n])}</meta>')
+                self.add_bytes(f"OEBPS/page-{n:02d}.smil", (
+                    '<?xml version="1.0" encoding="UTF-8"?>\n'
+                    '<smil xmlns="http://www.w3.org/ns/SMIL" xmlns:epub="http://www.idpf.org/2007/ops" version="3.0">\n'
+                    f'<body>\n<seq id="seq-{n:02d}" epub:textref="page-{n:02d}.xhtml" epub:type="chapter">\n'
+                    f'<par id="par-{n:02d}">\n<text src="page-{n:02d}.xhtml#narration"/>\n'
+                    f'<audio src="audio/page-{n:02d}.mp3" clipBegin="0s" clipEnd="{self.durations[n]:.3f}s"/>\n'
+                    '</par>\n</seq>\n</body>\n</smil>\n'))
+            manifest.append(f'<item id="page-{n:02d}" href="page-{n:02d}.xhtml" media-type="application/xhtml+xml"{overlay}/>')
+            spine.append(f'<itemref idref="page-{n:02d}"/>')
+        if durations:
+            durations.append(f'<meta property="media:duration">{self.clock(sum(self.durations.values()))}</meta>')
+            durations.append(f'<meta property="media:active-class">{self.ACTIVE_CLASS}</meta>')
+
+        self.add_bytes('META-INF/container.xml', (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">\n'
+            '<rootfiles>\n<rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>\n'
+            '</rootfiles>\n</container>\n'))
+        self.add_bytes('OEBPS/style.css', (
+            'body { font-family: sans-serif; line-height: 1.6; }\n'
+            '.narration { font-size: 1.4em; }\n'
+            f'.{self.ACTIVE_CLASS} {{ background-color: #fff3b0; }}\n'))
+        toc = '\n'.join(f'<li><a href="page-{n:02d}.xhtml">Page {n}</a></li>' for n in numbers)
+        self.add_bytes('OEBPS/nav.xhtml', (
+            '<?xml version="1.0" encoding="UTF-8"?>\n<!DOCTYPE html>\n'
+            f'<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops" '
+            f'xml:lang="{self.language}" lang="{self.language}">\n'
+            f'<head>\n<meta charset="UTF-8"/>\n<title>{title}</title>\n</head>\n'
+            f'<body>\n<nav epub:type="toc" id="toc">\n<h1>{title}</h1>\n<ol>\n{toc}\n</ol>\n</nav>\n</body>\n</html>\n'))
+        metadata = '\n'.join(durations)
+        self.add_bytes('OEBPS/content.opf', (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="book-id" xml:lang="{self.language}">\n'
+            '<metadata xmlns:dc="http://purl.org/dc/elements/1.1/">\n'
+            f'<dc:identifier id="book-id">urn:uuid:{book_id}</dc:identifier>\n'
+            f'<dc:title>{title}</dc:title>\n<dc:language>{self.language}</dc:language>\n'
+            f'<meta property="dcterms:modified">{modified}</meta>\n{metadata}\n</metadata>\n'
+            '<manifest>\n<item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>\n'
+            '<item id="style" href="style.css" media-type="text/css"/>\n'
+            + '\n'.join(manifest) + '\n</manifest>\n'
+            '<spine>\n' + '\n'.join(spine) + '\n</spine>\n</package>\n'))
+        return self.close()
+
+PACKAGE_TYPES = {
+    'zip': ZipPackage,
+    'epub': EpubPackage,
+}
+
+def open_packages(story_dir, structure, formats, out_dir=None):
+    """
+    Start writing packages for a story
+
+    Args:
+        story_dir: Story directory (its name names the packages)
+        structure: Story structure (pages, title)
+        formats: Package formats, e.g. ['zip', 'epub']
+        out_dir: Where to write packages (default PACKAGE_DIR)
+
+    Returns:
+        list: Open package writers; feed them with add_artifact() and
+            complete them with finish_packages()
+    """
+    name = os.path.basename(os.path.normpath(story_dir))
+    out_dir = out_dir or PACKAGE_DIR
+    packages = []
+    for fmt in formats:
+        if fmt not in PACKAGE_TYPES:
+            raise ValueError(f"Unknown package format '{fmt}' (expected one of: {', '.join(PACKAGE_TYPES)})")
+        package_type = PACKAGE_TYPES[fmt]
+        packages.append(package_type(os.path.join(out_dir, f"{name}.{package_type.extension}"), story_dir, structure))
+    return packages
+
+def add_artifact(packages, relative, data=None, path=None):
+    """Add one story file to every package, from memory or from disk"""
+    for package in packages:
+        package.add_artifact(relative, data=data, path=path)
+
+def finish_packages(packages, story_dir):
+    """
+    Add the story files the packages haven't been given yet and close them
+
+    Returns:
+        list: Paths of the written packages
+    """
+    for relative, path in iter_story_files(story_dir):
+        for package in packages:
+            if not package.has_artifact(relative):
+                package.add_artifact(relative, path=path)
+
+    paths = []
+    for package in packages:
+        paths.append(package.finish())
+        print(f"📚 Packaged {os.path.basename(package.path)} ({os.path.getsize(package.path):,} bytes)")
+    return paths
+
+def abort_packages(packages):
+    """Close packages without finishing them and remove their partial files"""
+    for package in packages:
+        package.abort()
+
+def package_story(story_dir, formats=None, out_dir=None):
+    """
+    Package an existing story into single files
+
+    Args:
+        story_dir: Story directory
+        formats: Package formats (default: all of PACKAGE_FORMATS)
+        out_dir: Where to write packages (default PACKAGE_DIR)
+
+    Returns:
+        list: Paths of the written packages
+    """
+    with open(os.path.join(story_dir, 'structure.json'), 'r', encoding='utf-8') as f:
+        structure = json.load(f)
+    packages = open_packages(story_dir, structure, formats or PACKAGE_FORMATS, out_dir)
+    try:
+        return finish_packages(packages, story_dir)
+    except Exception:
+        abort_packages(packages)
+        raise
@@ -0,0 +1,384 @@
+"""
+Long-running local generation service
+
+Story requests go into a SQLite-backed queue and are executed by a pool of
+worker processes. Each worker imports the pipeline once and keeps its
+OpenAI client warm across jobs. Job status and progress are stored in the
+queue and exposed over a small JSON HTTP API. While the queue is empty,
+the first worker warms caches for popular themes (see warmup.py).
+
+Usage:
+    python story_service.py serve --workers 3 --port 8765
+    python story_service.py submit "Geo is going to the dentist with his mom"
+    python story_service.py status [job_id]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import sqlite3
+import sys
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Configuration
+DEFAULT_DB_PATH = '.story_queue.db'
+DEFAULT_WORKERS = 2
+DEFAULT_PORT = 8765
+POLL_INTERVAL = 1.0  # seconds between queue polls when idle
+MAX_ATTEMPTS = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    topic TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    stage TEXT,
+    progress REAL NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    story_dir TEXT,
+    result TEXT,
+    error TEXT,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+CREATE TABLE IF NOT EXISTS locks (name TEXT PRIMARY KEY);
+"""
+
+def now():
+    return datetime.now().isoformat()
+
+class JobQueue:
+    """
+    Persistent job queue stored in a SQLite database
+
+    Statuses move queued -> running -> completed/failed. Jobs left running
+    by a crashed service are put back in the queue by recover().
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = db_path
+        with self.connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    def enqueue(self, topic):
+        """Add a topic to the queue and return the new job id"""
+        with self.connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO jobs (topic, created_at) VALUES (?, ?)",
+                (topic, now())
+            )
+            return cursor.lastrowid
+
+    def claim(self, worker):
+        """Atomically take the oldest queued job, or return None"""
+        conn = self.connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                conn.execute('COMMIT')
+                return None
+            conn.execute(
+                """UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1,
+                   stage = 'starting', progress = 0, started_at = ?, error = NULL
+                   WHERE id = ?""",
+                (worker, now(), row['id'])
+            )
+            conn.execute('COMMIT')
+            return dict(row)
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    def update_progress(self, job_id, stage, progress):
+        with self.connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET stage = ?, progress = ? WHERE id = ?",
+                (stage, progress, job_id)
+            )
+
+    def set_story_dir(self, job_id, story_dir):
+        """Record the directory a job writes to, so a retry reuses it"""
+        with self.connect() as conn:
+            conn.execute("UPDATE jobs SET story_dir = ? WHERE id = ?", (story_dir, job_id))
+
+    def complete(self, job_id, result):
+        with self.connect() as conn:
+            conn.execute(
+                """UPDATE jobs SET status = 'completed', stage = 'done', progress = 1,
+                   story_dir = ?, result = ?, finished_at = ? WHERE id = ?""",
+                (result.get('story_dir'), json.dumps(result), now(), job_id)
+            )
+
+    def fail(self, job_id, error, result=None, retry=False):
+        status = 'queued' if retry else 'failed'
+        with self.connect() as conn:
+            conn.execute(
+                """UPDATE jobs SET status = ?, error = ?, result = ?,
+                   story_dir = COALESCE(?, story_dir), finished_at = ? WHERE id = ?""",
+                (status, error, json.dumps(result) if result else None,
+                 result.get('story_dir') if result else None,
+                 None if retry else now(), job_id)
+            )
+            if retry:
+                conn.execute("UPDATE jobs SET stage = NULL, progress = 0 WHERE id = ?", (job_id,))
+
+    def recover(self):
+        """Requeue jobs that were running when the service last stopped"""
+        with self.connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'queued', stage = NULL, progress = 0 WHERE status = 'running'"
+            )
+            return cursor.rowcount
+
+    def get(self, job_id):
+        with self.connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return job_to_dict(row) if row else None
+
+    def list(self, status=None, limit=50):
+        with self.connect() as conn:
+            if status:
+                rows = conn.execute(
+                    "SELECT * FROM jobs WHERE status = ? ORDER BY id DESC LIMIT ?", (status, limit)
+                ).fetchall()
+            else:
+                rows = conn.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [job_to_dict(row) for row in rows]
+
+    def counts(self):
+        with self.connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row['status']: row['n'] for row in rows}
+
+    @contextmanager
+    def lock(self, name):
+        """Cross-process lock (used to serialize writes to stories/index.json and the sprite library)"""
+        conn = self.connect()
+        try:
+            conn.execute('BEGIN EXCLUSIVE')
+            conn.execute("INSERT OR IGNORE INTO locks (name) VALUES (?)", (name,))
+            yield
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+def job_to_dict(row):
+    job = dict(row)
+    if job.get('result'):
+        job['result'] = json.loads(job['result'])
+    return job
+
+def worker_loop(db_path, worker_name, stop_event, warmup=False):
+    """
+    Worker process body: import the pipeline once, then run jobs until stopped
+
+    With warmup set, the worker spends idle time pre-generating structures
+    for popular themes, one family at a time so new jobs wait at most one
+    warm-up.
+    """
+    # Ctrl+C is handled by the parent, which sets stop_event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, script_dir)
+    import generate_story
+    import warmup as warmup_module
+    from resilience import openai_breaker
+
+    queue = JobQueue(db_path)
+    print(f"👷 {worker_name} ready{' (warm-up enabled)' if warmup else ''}")
+    idle_since = time.monotonic()
+
+    while not stop_event.is_set():
+        job = queue.claim(worker_name)
+        if job is None:
+            idle = time.monotonic() - idle_since
+            if (warmup and idle >= warmup_module.IDLE_SECONDS and openai_breaker.state == 'closed'
+                    and not queue.counts().get('queued')):
+                warmup_module.run_warmup(max_families=1, queue_db=db_path)
+                # Whether or not anything was warmed, wait another idle period before re-planning
+                idle_since = time.monotonic()
+            stop_event.wait(POLL_INTERVAL)
+            continue
+
+        job_id = job['id']
+        print(f"👷 {worker_name} starting job {job_id}: {job['topic']}")
+
+        def progress(stage, fraction):
+            queue.update_progress(job_id, stage, round(fraction, 3))
+
+        try:
+            result = generate_story.run_pipeline(
+                job['topic'],
+                progress=progress,
+                index_lock=queue.lock('stories-index'),
+                sprite_lock=queue.lock('sprite-library'),
+                job_id=job_id,
+                story_dir=job.get('story_dir'),
+                on_story_dir=lambda story_dir: queue.set_story_dir(job_id, story_dir)
+            )
+        except Exception as e:
+            traceback.print_exc()
+            retry = job['attempts'] + 1 < MAX_ATTEMPTS
+            queue.fail(job_id, str(e), retry=retry)
+            print(f"❌ {worker_name} job {job_id} failed{' (requeued)' if retry else ''}: {e}")
+            continue
+
+        idle_since = time.monotonic()
+        if result['validation']['passing']:
+            queue.complete(job_id, result)
+            print(f"✅ {worker_name} finished job {job_id}: {result['story_dir']}")
+        else:
+            issues = ', '.join(result['validation']['issues'])
+            queue.fail(job_id, f"Validation failed: {issues}", result=result)
+            print(f"⚠️  {worker_name} job {job_id} failed validation: {issues}")
+
+def make_handler(queue):
+    """Build the HTTP request handler for the status API"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def send_json(self, status, payload):
+            body = json.dumps(payload, indent=2).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            parts = [p for p in self.path.split('?')[0].split('/') if p]
+            if parts == ['jobs']:
+                self.send_json(200, queue.list())
+            elif len(parts) == 2 and parts[0] == 'jobs' and parts[1].isdigit():
+                job = queue.get(int(parts[1]))
+                if job:
+                    self.send_json(200, job)
+                else:
+                    self.send_json(404, {'error': 'Job not found'})
+            elif parts == ['status']:
+                self.send_json(200, queue.counts())
+            else:
+                self.send_json(404, {'error': 'Not found'})
+
+        def do_POST(self):
+            if self.path.rstrip('/') != '/jobs':
+                self.send_json(404, {'error': 'Not found'})
+                return
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length) or b'{}')
+                topic = payload['topic'].strip()
+            except (ValueError, KeyError, AttributeError):
+                self.send_json(400, {'error': 'Expected JSON body with a "topic" string'})
+                return
+            if not topic:
+                self.send_json(400, {'error': 'Topic must not be empty'})
+                return
+            job_id = queue.enqueue(topic)
+            self.send_json(201, queue.get(job_id))
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+def serve(db_path, workers, port, warmup=True):
+    """Start the worker pool and the status API, and run until interrupted"""
+    queue = JobQueue(db_path)
+    recovered = queue.recover()
+    if recovered:
+        print(f"🔁 Requeued {recovered} interrupted job(s)")
+
+    stop_event = multiprocessing.Event()
+    processes = []
+    for i in range(workers):
+        process = multiprocessing.Process(
+            target=worker_loop,
+            args=(db_path, f"worker-{i + 1}", stop_event, warmup and i == 0),
+            daemon=True
+        )
+        process.start()
+        processes.append(process)
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(queue))
+    print(f"🚀 Story service running with {workers} worker(s) on http://127.0.0.1:{port}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Shutting down (running jobs will finish their current call)...")
+    finally:
+        server.server_close()
+        stop_event.set()
+        for process in processes:
+            process.join()
+
+def print_job(job):
+    percent = job['progress'] * 100
+    line = f"#{job['id']:<4} {job['status']:<10} {percent:5.1f}%  {job['stage'] or '-':<12} {job['topic']}"
+    if job.get('story_dir'):
+        line += f"  → {job['story_dir']}"
+    if job.get('error') and job['status'] != 'completed':
+        line += f"\n      ❌ {job['error']}"
+    print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description="Local social story generation service")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help="Path to the SQLite queue database")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = subparsers.add_parser('serve', help="Run workers and the status API")
+    serve_parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    serve_parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    serve_parser.add_argument('--no-warmup', action='store_true', help="Don't pre-generate popular themes when idle")
+
+    submit_parser = subparsers.add_parser('submit', help="Queue a story topic")
+    submit_parser.add_argument('topic', nargs='+')
+
+    status_parser = subparsers.add_parser('status', help="Show queued and finished jobs")
+    status_parser.add_argument('job_id', nargs='?', type=int)
+
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        serve(args.db, args.workers, args.port, warmup=not args.no_warmup)
+    elif args.command == 'submit':
+        job_id = JobQueue(args.db).enqueue(' '.join(args.topic))
+        print(f"✅ Queued job {job_id}")
+    elif args.command == 'status':
+        queue = JobQueue(args.db)
+        if args.job_id:
+            job = queue.get(args.job_id)
+            if not job:
+                print(f"❌ Job {args.job_id} not found")
+                sys.exit(1)
+            print(json.dumps(job, indent=2))
+        else:
+            for job in queue.list():
+                print_job(job)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,463 @@
+"""
+Parameterized story templates for personalized variants
+
+A generated story is abstracted into a template (template.json in the story
+directory) where character names and, where unambiguous, their pronouns are
+replaced with placeholders. New variants are rendered locally from the
+template without any chat completions; only page audio whose narration text
+actually changed is re-synthesized.
+
+Placeholders:
+    {{name:SLOT}}              character name as written in the source
+    {{name_lower:SLOT}}        lower-case form ("his mom")
+    {{pronoun:SLOT:FORM}}      subject/object/possessive/possessive_pronoun/reflexive
+    {{Pronoun:SLOT:FORM}}      capitalized pronoun
+"""
+
+import glob
+import json
+import os
+import re
+import shutil
+from datetime import date
+
+from artifact_store import ingest_story, resolve_artifact
+
+TEMPLATE_FILE = 'template.json'
+TEMPLATE_VERSION = 1
+MAIN_SLOT = 'child'
+
+# Text artifacts rendered from the template (audio is handled separately)
+TEXT_ARTIFACTS = ['index.html', 'pages/page-*.html', 'interactive/*.js', 'interactive/*.json']
+
+PRONOUNS = {
+    'he': {'subject': 'he', 'object': 'him', 'possessive': 'his',
+           'possessive_pronoun': 'his', 'reflexive': 'himself'},
+    'she': {'subject': 'she', 'object': 'her', 'possessive': 'her',
+            'possessive_pronoun': 'hers', 'reflexive': 'herself'},
+    'they': {'subject': 'they', 'object': 'them', 'possessive': 'their',
+             'possessive_pronoun': 'theirs', 'reflexive': 'themselves'},
+}
+
+RELATIONSHIP_PRONOUNS = {
+    'mom': 'she', 'mum': 'she', 'mommy': 'she', 'mother': 'she', 'grandma': 'she',
+    'grandmother': 'she', 'sister': 'she', 'aunt': 'she', 'daughter': 'she',
+    'dad': 'he', 'daddy': 'he', 'father': 'he', 'grandpa': 'he', 'grandfather': 'he',
+    'brother': 'he', 'uncle': 'he', 'son': 'he',
+}
+
+# Words after "her" that mean it is an object ("gave her a hug") rather than possessive
+OBJECT_FOLLOWERS = {
+    'a', 'an', 'the', 'to', 'and', 'or', 'but', 'that', 'this', 'with', 'in', 'on', 'at',
+    'up', 'down', 'out', 'off', 'back', 'again', 'too', 'feel', 'know', 'how', 'what',
+    'if', 'when', 'some', 'for', 'about', 'so', 'very', 'it', 'into', 'from', 'by',
+}
+
+PLACEHOLDER_PATTERN = re.compile(r'\{\{(name|name_lower|pronoun|Pronoun):([a-z0-9_]+)(?::([a-z_]+))?\}\}')
+THEY_VERB_FIXES = {'is': 'are', 'was': 'were', 'has': 'have', 'does': 'do', 'goes': 'go'}
+
+def slot_id(name):
+    return re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_') or 'character'
+
+def longest_first(names):
+    """Order names longest first so "Little Sister" wins over "Sister" in a match"""
+    return sorted(names, key=len, reverse=True)
+
+def json_escape(value):
+    """Escape a value for substitution inside a JSON string literal"""
+    return json.dumps(value)[1:-1]
+
+def normalize_pronouns(value):
+    """Map 'he/him', 'She' etc. to a PRONOUNS key, or None if unknown"""
+    if not value:
+        return None
+    first = re.split(r'[/\s,]+', value.strip().lower())[0]
+    return first if first in PRONOUNS else None
+
+def infer_slots(structure, topic=''):
+    """
+    Build the placeholder slots for a story's characters
+
+    Returns:
+        dict: slot id -> {'name', 'pronouns', 'relationship'}
+    """
+    slots = {}
+    main_assigned = False
+    for character in structure.get('characters', []):
+        name = character['name']
+        words = name.lower().split()
+        relationship = next((w for w in words if w in RELATIONSHIP_PRONOUNS), None)
+        pronouns = normalize_pronouns(character.get('pronouns'))
+        if pronouns is None and relationship:
+            pronouns = RELATIONSHIP_PRONOUNS[relationship]
+
+        if not main_assigned and character.get('role', '').startswith('main'):
+            key = MAIN_SLOT
+            main_assigned = True
+            if pronouns is None:
+                # "Geo is going to the dentist with his mom"
+                match = re.search(r'\b(his|her|their)\b', topic.lower())
+                if match:
+                    pronouns = {'his': 'he', 'her': 'she', 'their': 'they'}[match.group(1)]
+        else:
+            key = slot_id(relationship or name)
+            while key in slots:
+                key += '_'
+
+        slots[key] = {'name': name, 'pronouns': pronouns, 'relationship': relationship}
+    return slots
+
+def template_names(text, slots):
+    """Replace every slot's name with its placeholder, leaving existing placeholders alone"""
+    names = {}
+    for key, slot in slots.items():
+        names[slot['name']] = f'{{{{name:{key}}}}}'
+        if slot['relationship']:
+            names.setdefault(slot['name'].lower(), f'{{{{name_lower:{key}}}}}')
+    if not names:
+        return text
+
+    alternatives = '|'.join(re.escape(name) for name in longest_first(names))
+    pattern = re.compile(r'(\{\{[^{}]*\}\})|\b(' + alternatives + r')\b')
+    return pattern.sub(lambda m: m.group(1) or names[m.group(2)], text)
+
+def pronoun_owners(present_slots, slots):
+    """
+    Decide which slot a he/she pronoun refers to within one unit of text
+
+    A pronoun set is only templated when exactly one present character uses
+    it and no present character has unknown pronouns.
+    """
+    present = [slots[key] | {'key': key} for key in present_slots if key in slots]
+    if any(slot['pronouns'] is None for slot in present):
+        return {}
+    owners = {}
+    for pronouns in ('he', 'she'):
+        matching = [slot['key'] for slot in present if slot['pronouns'] == pronouns]
+        if len(matching) == 1:
+            owners[pronouns] = matching[0]
+    return owners
+
+def template_pronouns(text, owners):
+    """Replace he/she pronoun forms with placeholders for their owning slot"""
+    forms = {}
+    if 'he' in owners:
+        key = owners['he']
+        forms.update({'he': (key, 'subject'), 'him': (key, 'object'),
+                      'his': (key, 'possessive'), 'himself': (key, 'reflexive')})
+    if 'she' in owners:
+        key = owners['she']
+        forms.update({'she': (key, 'subject'), 'her': (key, None),
+                      'hers': (key, 'possessive_pronoun'), 'herself': (key, 'reflexive')})
+    if not forms:
+        return text
+
+    # Look ahead at the next word without consuming it ("told her she could")
+    pattern = re.compile(r'\b(' + '|'.join(forms) + r')\b(?=(\W*)(\w*))', re.IGNORECASE)
+
+    def replace(match):
+        word, separator, next_word = match.group(1), match.group(2), match.group(3).lower()
+        key, form = forms[word.lower()]
+        # Punctuation or markup after the pronoun ends the phrase ("hug her.", "is his")
+        ends_phrase = not next_word or separator.strip() != ''
+        if form is None:
+            # "her" is an object before articles/prepositions, otherwise possessive
+            form = 'object' if ends_phrase or next_word in OBJECT_FOLLOWERS else 'possessive'
+        elif word.lower() == 'his' and ends_phrase:
+            form = 'possessive_pronoun'
+        tag = 'Pronoun' if word[0].isupper() else 'pronoun'
+        return f'{{{{{tag}:{key}:{form}}}}}'
+
+    return pattern.sub(replace, text)
+
+def template_text(text, slots, present_slots):
+    """
+    Abstract one unit of text
+
+    Returns:
+        tuple: (templated text, list of slots whose pronouns could not be templated)
+    """
+    owners = pronoun_owners(present_slots, slots)
+    # Pronouns first so the look-ahead sees real words rather than placeholders
+    templated = template_names(template_pronouns(text, owners), slots)
+    unresolved = [key for key in present_slots
+                  if key in slots and slots[key]['pronouns'] in ('he', 'she')
+                  and key not in owners.values()]
+    return templated, unresolved
+
+def slots_named_in(names, slots):
+    by_name = {slot['name']: key for key, slot in slots.items()}
+    return [by_name[name] for name in names if name in by_name]
+
+def template_structure(structure, slots, unresolved=None):
+    """
+    Abstract a Stage 1 structure into placeholder text
+
+    Args:
+        structure: The story structure
+        slots: Slots from infer_slots
+        unresolved: Optional dict that receives units whose pronouns could not be templated
+
+    Returns:
+        dict: {'story': templated top-level JSON, 'pages': [templated page JSON]}
+    """
+    unresolved = {} if unresolved is None else unresolved
+
+    def abstract(unit, text, present):
+        templated, missing = template_text(text, slots, present)
+        if missing:
+            unresolved[unit] = missing
+        return templated
+
+    # Each page only mentions the characters present on it
+    top_level = {k: v for k, v in structure.items() if k != 'pages'}
+    return {
+        'story': abstract('structure', json.dumps(top_level), list(slots)),
+        'pages': [
+            abstract(f"structure page {page['page_number']}", json.dumps(page),
+                     slots_named_in(page.get('characters_present', []), slots))
+            for page in structure['pages']
+        ]
+    }
+
+def render_structure(structure_template, slots):
+    """Render a templated structure for the given slots"""
+    structure = json.loads(render(structure_template['story'], slots, json_escape))
+    structure['pages'] = [json.loads(render(page, slots, json_escape))
+                          for page in structure_template['pages']]
+    for character, slot in zip(structure.get('characters', []), slots.values()):
+        if slot['pronouns']:
+            character['pronouns'] = slot['pronouns']
+    return structure
+
+def create_template(story_dir):
+    """
+    Abstract a generated story into template.json
+
+    Args:
+        story_dir: Story directory containing structure.json and story.json
+
+    Returns:
+        dict: The template
+    """
+    with open(os.path.join(story_dir, 'structure.json'), 'r', encoding='utf-8') as f:
+        structure = json.load(f)
+    with open(os.path.join(story_dir, 'story.json'), 'r', encoding='utf-8') as f:
+        metadata = json.load(f)
+
+    slots = infer_slots(structure, metadata.get('topic', ''))
+    all_slots = list(slots)
+    unresolved = {}
+
+    def abstract(unit, text, present):
+        templated, missing = template_text(text, slots, present)
+        if missing:
+            unresolved[unit] = missing
+        return templated
+
+    structure_template = template_structure(structure, slots, unresolved)
+
+    pages_by_file = {f"pages/page-{int(p['page_number']):02d}.html": p for p in structure['pages']}
+    artifacts = {}
+    for pattern in TEXT_ARTIFACTS:
+        for path in sorted(glob.glob(os.path.join(story_dir, pattern))):
+            relative = os.path.relpath(path, story_dir).replace(os.sep, '/')
+            with open(path, 'r', encoding='utf-8') as f:
+                content = f.read()
+            page = pages_by_file.get(relative)
+            present = slots_named_in(page.get('characters_present', []), slots) if page else all_slots
+            artifacts[relative] = abstract(relative, content, present)
+
+    template = {
+        'version': TEMPLATE_VERSION,
+        'source': os.path.basename(os.path.normpath(story_dir)),
+        'topic': template_text(metadata.get('topic', ''), slots, all_slots)[0],
+        'slots': slots,
+        'structure': structure_template,
+        'artifacts': artifacts,
+        'unresolved_pronouns': unresolved
+    }
+
+    with open(os.path.join(story_dir, TEMPLATE_FILE), 'w', encoding='utf-8') as f:
+        json.dump(template, f, indent=2)
+
+    print(f"✅ Template created with {len(slots)} slots and {len(artifacts)} artifacts")
+    return template
+
+def load_template(story_dir):
+    """Load template.json, creating it on first use"""
+    path = os.path.join(story_dir, TEMPLATE_FILE)
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            template = json.load(f)
+        if template.get('version') == TEMPLATE_VERSION:
+            return template
+    return create_template(story_dir)
+
+def render(text, slots, escape=None):
+    """
+    Fill placeholders using the given slot values
+
+    Args:
+        text: Templated text
+        slots: slot id -> {'name', 'pronouns'}
+        escape: Optional function applied to substituted values (e.g. for JSON)
+    """
+    def replace(match):
+        kind, key, form = match.groups()
+        slot = slots.get(key)
+        if slot is None:
+            return match.group(0)
+        if kind == 'name':
+            value = slot['name']
+        elif kind == 'name_lower':
+            value = slot['name'].lower()
+        else:
+            value = PRONOUNS[slot.get('pronouns') or 'they'][form]
+            if kind == 'Pronoun':
+                value = value.capitalize()
+        return escape(value) if escape else value
+
+    rendered = PLACEHOLDER_PATTERN.sub(replace, text)
+
+    # Keep verbs agreeing with singular "they" ("they is" -> "they are")
+    if any(slot.get('pronouns') == 'they' for slot in slots.values()):
+        rendered = re.sub(
+            r'\b([Tt]hey) (' + '|'.join(THEY_VERB_FIXES) + r')\b',
+            lambda m: f"{m.group(1)} {THEY_VERB_FIXES[m.group(2)]}",
+            rendered
+        )
+    return rendered
+
+def resolve_slots(template, overrides):
+    """
+    Merge variant overrides into the template's slots
+
+    Args:
+        overrides: slot id or original character name -> {'name', 'pronouns'}
+    """
+    slots = {key: dict(slot) for key, slot in template['slots'].items()}
+    by_name = {slot['name'].lower(): key for key, slot in slots.items()}
+    for target, values in overrides.items():
+        key = target if target in slots else by_name.get(target.lower())
+        if key is None:
+            raise ValueError(f"Unknown character or slot: {target}")
+        for field in ('name', 'pronouns'):
+            if values.get(field):
+                slots[key][field] = values[field]
+        if values.get('name') and not values.get('pronouns'):
+            # "Mom" -> "Dad" implies the pronouns change too
+            relationship = RELATIONSHIP_PRONOUNS.get(values['name'].lower())
+            if relationship:
+                slots[key]['pronouns'] = relationship
+        if slots[key]['pronouns'] and slots[key]['pronouns'] not in PRONOUNS:
+            raise ValueError(f"Unsupported pronouns for {target}: {slots[key]['pronouns']}")
+    return slots
+
+def instantiate_template(source_dir, overrides, tts_model="tts-1", tts_voice="alloy"):
+    """
+    Render a personalized variant of an existing story
+
+    Args:
+        source_dir: Directory of the story to personalize
+        overrides: slot id or character name -> {'name': ..., 'pronouns': ...}
+        tts_model: TTS model for pages whose narration changed
+        tts_voice: TTS voice for pages whose narration changed
+
+    Returns:
+        dict: story_dir, title, audio counts and validation result
+    """
+    import generate_story
+    from generate_audio import generate_audio_file, extract_narration_from_html
+    from narration import load_timing, narrate_pages
+    from story_navigation import write_navigation
+    from validate_story import validate_story
+
+    template = load_template(source_dir)
+    source_slots = template['slots']
+    slots = resolve_slots(template, overrides)
+
+    # Pronouns we couldn't template stay as generated; flag them if they change
+    for unit, keys in template.get('unresolved_pronouns', {}).items():
+        changed = [k for k in keys if slots[k]['pronouns'] != source_slots[k]['pronouns']]
+        if changed:
+            print(f"⚠️  {unit}: pronouns for {', '.join(slots[k]['name'] for k in changed)} could not be templated and were left unchanged")
+
+    topic = render(template['topic'], slots)
+    structure = render_structure(template['structure'], slots)
+
+    slug = generate_story.create_slug(topic)
+    story_dir = f"stories/{date.today().isoformat()}-{slug}"
+    if os.path.normpath(story_dir) == os.path.normpath(source_dir):
+        raise ValueError("Variant would overwrite its source story; change at least one name")
+    for sub in ('pages', 'audio', 'interactive'):
+        os.makedirs(os.path.join(story_dir, sub), exist_ok=True)
+
+    print(f"\n🧩 Rendering variant of {template['source']}: {topic}")
+    for relative, content in template['artifacts'].items():
+        with open(os.path.join(story_dir, relative), 'w', encoding='utf-8') as f:
+            f.write(render(content, slots, json_escape if relative.endswith('.json') else None))
+    generate_story.save_structure(story_dir, structure)
+
+    # Audio: reuse the source MP3 when the narration text is identical. A
+    # multi-voice source is re-narrated line by line, which only synthesizes
+    # lines whose text or voice changed.
+    audio = {'total': 0, 'reused': 0, 'generated': 0, 'failed': 0}
+    source_voices = load_timing(os.path.join(source_dir, 'audio')).get('voices', {})
+    multi_voice = bool(source_voices)
+    page_texts = {}
+    for page_file in sorted(glob.glob(os.path.join(story_dir, 'pages', 'page-*.html'))):
+        audio['total'] += 1
+        name = os.path.basename(page_file)
+        source_page = os.path.join(source_dir, 'pages', name)
+        source_audio = resolve_artifact(source_dir, f"audio/{name.replace('.html', '.mp3')}")
+        output_path = os.path.join(story_dir, 'audio', name.replace('.html', '.mp3'))
+
+        with open(page_file, 'r', encoding='utf-8') as f:
+            narration = extract_narration_from_html(f.read())
+        source_narration = None
+        if os.path.exists(source_page):
+            with open(source_page, 'r', encoding='utf-8') as f:
+                source_narration = extract_narration_from_html(f.read())
+
+        if multi_voice and narration:
+            page_texts[int(re.search(r'(\d+)', name).group(1))] = narration
+        elif narration == source_narration and source_audio:
+            shutil.copyfile(source_audio, output_path)
+            audio['reused'] += 1
+        elif narration and generate_audio_file(narration, output_path, tts_model, tts_voice):
+            audio['generated'] += 1
+        else:
+            audio['failed'] += 1
+
+    if page_texts:
+        # Characters keep their voice unless their pronouns changed
+        voices = {slot['name']: source_voices[source_slots[key]['name']] for key, slot in slots.items()
+                  if source_slots[key]['name'] in source_voices and slot['pronouns'] == source_slots[key]['pronouns']}
+        narrated = narrate_pages(page_texts, os.path.join(story_dir, 'audio'), structure['characters'],
+                                 tts_model, tts_voice, voices)
+        audio['generated'] += narrated['pages_synthesized']
+        audio['reused'] += narrated['success'] - narrated['pages_synthesized']
+        audio['failed'] += narrated['failed']
+
+    validation_result = validate_story(story_dir)
+    generate_story.save_metadata(story_dir, structure, topic, slug, 0, validation_result, {
+        'template_source': template['source'],
+        'personalization': {key: {'name': slot['name'], 'pronouns': slot['pronouns']}
+                            for key, slot in slots.items()}
+    })
+    generate_story.update_stories_index(story_dir, structure, topic, slug)
+    ingest_story(story_dir)
+    write_navigation(story_dir)
+
+    print(f"✅ Variant written to {story_dir}")
+    print(f"🔊 Audio: {audio['reused']} reused, {audio['generated']} synthesized, {audio['failed']} failed")
+
+    return {
+        'story_dir': story_dir,
+        'title': structure['title'],
+        'pages': len(structure['pages']),
+        'tokens': 0,
+        'audio': audio,
+        'validation': validation_result
+    }
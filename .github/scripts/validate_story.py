@@ -1,7 +1,135 @@
 import os
 import json
 import glob
-import re
+from fnmatch import fnmatch
+
+from artifact_store import story_artifacts
+from interactive_content import ACTIVITIES, load_activity, validate_activity
+
+NAV_PATTERNS = ['<nav', 'page-nav', 'btn-next', 'btn-prev', 'navigation']
+PAGE_ACCESSIBILITY_THRESHOLD = 0.5  # per page; three sampled pages need 1.5 for full marks
+STRUCTURE_KEYS = ['title', 'characters', 'settings', 'learning_objectives', 'pages']
+PAGE_KEYS = ['page_number', 'setting', 'characters_present', 'narrative', 'visual_description', 'teaching_point']
+
+def page_accessibility_score(content):
+    """Accessibility score (0-1) for one page's HTML"""
+    score = 0
+    
+    # Check for ARIA labels
+    if 'aria-label' in content or 'role=' in content:
+        score += 0.3
+    
+    # Check for semantic HTML
+    if '<nav' in content and '<main' in content:
+        score += 0.3
+    
+    # Check for alt text or descriptions
+    if 'alt=' in content or 'aria-describedby' in content:
+        score += 0.4
+    
+    return score
+
+def check_structure(structure, min_pages=3):
+    """
+    Check a Stage 1 story structure before anything is built from it
+    
+    Returns:
+        list: Problems found (empty when the structure is usable)
+    """
+    if not isinstance(structure, dict):
+        return ["structure is not a JSON object"]
+    
+    issues = [f"structure is missing '{key}'" for key in STRUCTURE_KEYS if not structure.get(key)]
+    pages = structure.get('pages') or []
+    if pages and len(pages) < min_pages:
+        issues.append(f"structure has {len(pages)} pages (minimum: {min_pages})")
+    for i, page in enumerate(pages, 1):
+        missing = [key for key in PAGE_KEYS if key not in page]
+        if missing:
+            issues.append(f"page {i} is missing {', '.join(missing)}")
+    return issues
+
+def check_page_html(content):
+    """
+    Check one generated page against the per-page parts of validate_story
+    
+    Returns:
+        list: Problems found (empty when the page passes)
+    """
+    from generate_audio import extract_narration_from_html
+    
+    if '<html' not in content.lower():
+        return ["page is not a complete HTML document"]
+    
+    issues = []
+    if page_accessibility_score(content) < PAGE_ACCESSIBILITY_THRESHOLD:
+        issues.append("page needs ARIA labels or roles, <nav>/<main> and alt text or aria-describedby")
+    if '@media print' not in content and 'print.css' not in content:
+        issues.append("page has no print-friendly CSS (@media print)")
+    if not extract_narration_from_html(content):
+        issues.append("page has no narration text")
+    return issues
+
+def check_index_html(content):
+    """
+    Check a generated story index.html
+    
+    Returns:
+        list: Problems found (empty when the index passes)
+    """
+    if '<html' not in content.lower():
+        return ["index is not a complete HTML document"]
+    if not any(pattern in content for pattern in NAV_PATTERNS):
+        return ["index has no navigation elements"]
+    return []
+
+def check_artifact(relative_path, content):
+    """
+    Check one story artifact on its own, as soon as it is produced
+    
+    Args:
+        relative_path: Path inside the story directory, e.g. 'pages/page-01.html'
+        content: The artifact's text
+    
+    Returns:
+        list: Problems found (empty when it passes or has no per-artifact check)
+    """
+    name = relative_path.replace(os.sep, '/')
+    if name.endswith('.json'):
+        try:
+            data = json.loads(content)
+        except json.JSONDecodeError as e:
+            return [f"{name} is not valid JSON: {e}"]
+    
+    if name == 'structure.json':
+        return check_structure(data)
+    if name == 'index.html':
+        return check_index_html(content)
+    if fnmatch(name, 'pages/page-*.html'):
+        return check_page_html(content)
+    if fnmatch(name, 'interactive/*.json'):
+        activity = os.path.splitext(os.path.basename(name))[0]
+        if activity in ACTIVITIES:
+            return validate_activity(activity, data)
+    return []
+
+def check_story_artifacts(story_dir):
+    """
+    Run check_artifact over every checkable file in a story
+    
+    Returns:
+        dict: Relative path -> problems, for artifacts that fail
+    """
+    failing = {}
+    patterns = ['structure.json', 'index.html', 'pages/page-*.html', 'interactive/*.json']
+    for pattern in patterns:
+        for path in sorted(glob.glob(os.path.join(story_dir, pattern))):
+            relative = os.path.relpath(path, story_dir).replace(os.sep, '/')
+            with open(path, 'r', encoding='utf-8') as f:
+                problems = check_artifact(relative, f.read())
+            if problems:
+                failing[relative] = problems
+    return failing
 
 def validate_story(story_dir):
     """
@@ -64,19 +192,7 @@ def validate_story(story_dir):
     for page_file in sample_pages:
         try:
             with open(page_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Check for ARIA labels
-            if 'aria-label' in content or 'role=' in content:
-                accessibility_score += 0.3
-            
-            # Check for semantic HTML
-            if '<nav' in content and '<main' in content:
-                accessibility_score += 0.3
-            
-            # Check for alt text or descriptions
-            if 'alt=' in content or 'aria-describedby' in content:
-                accessibility_score += 0.4
+                accessibility_score += page_accessibility_score(f.read())
         except:
             pass
     
@@ -93,15 +209,21 @@ def validate_story(story_dir):
     
     # 4. Interactive Elements (2 points)
     interactive_dir = os.path.join(story_dir, 'interactive')
-    interactive_files = ['quiz.js', 'choices.js', 'games.js']
     interactive_found = 0
     
-    for file in interactive_files:
-        file_path = os.path.join(interactive_dir, file)
-        if os.path.exists(file_path):
-            # Check if file has actual content (not just empty)
+    for activity in ACTIVITIES:
+        json_path = os.path.join(interactive_dir, f'{activity}.json')
+        js_path = os.path.join(interactive_dir, f'{activity}.js')
+        if os.path.exists(json_path):
+            # Content for the shared engine must match its schema
+            # (problems are reported by the per-artifact checks below)
+            data = load_activity(story_dir, activity)
+            if data is not None and not validate_activity(activity, data):
+                interactive_found += 1
+        elif os.path.exists(js_path):
+            # Older stories ship a standalone module per activity
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
+                with open(js_path, 'r', encoding='utf-8') as f:
                     content = f.read()
                 if len(content.strip()) > 100:  # At least 100 chars
                     interactive_found += 1
@@ -120,8 +242,8 @@ def validate_story(story_dir):
         print(f"❌ Insufficient interactive elements: {interactive_found}/3")
     
     # 5. Audio Files (2 points)
-    audio_dir = os.path.join(story_dir, 'audio')
-    audio_files = glob.glob(os.path.join(audio_dir, 'page-*.mp3'))
+    # Audio may live in the artifact store rather than the story folder
+    audio_files = story_artifacts(story_dir, 'audio/page-*.mp3')
     
     # Audio should match number of pages
     expected_audio = len(page_files)
@@ -147,8 +269,7 @@ def validate_story(story_dir):
             index_content = f.read()
         
         # Check for navigation elements
-        nav_patterns = ['<nav', 'page-nav', 'btn-next', 'btn-prev', 'navigation']
-        if any(pattern in index_content for pattern in nav_patterns):
+        if any(pattern in index_content for pattern in NAV_PATTERNS):
             has_navigation = True
             score += 1
             print(f"✅ Navigation elements present")
@@ -179,6 +300,13 @@ def validate_story(story_dir):
         warnings.append("No print-friendly CSS detected")
         print(f"⚠️  No print-friendly CSS detected")
     
+    # Per-artifact checks (reported, not scored)
+    failing_artifacts = check_story_artifacts(story_dir)
+    for relative, problems in failing_artifacts.items():
+        warnings.append(f"{relative}: {problems[0]}")
+    if failing_artifacts:
+        print(f"⚠️  {len(failing_artifacts)} artifacts fail their own checks")
+    
     # Calculate percentage
     percentage = (score / max_score) * 100
     passing = percentage >= 70
@@ -198,7 +326,8 @@ def validate_story(story_dir):
             'audio_files': len(audio_files),
             'interactive_elements': interactive_found,
             'has_navigation': has_navigation,
-            'has_print_css': has_print_css
+            'has_print_css': has_print_css,
+            'failing_artifacts': sorted(failing_artifacts)
         }
     }
 
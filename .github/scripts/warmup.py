@@ -0,0 +1,347 @@
+"""
+Speculative warm-up for popular story themes
+
+Requests cluster around recurring situations (dentist, haircut, first day
+of school). While the API is idle, this module pre-generates the Stage 1
+structure and interactive content for the most requested topic families
+and caches them as templates in .story_cache/warm/. When a matching
+request arrives, the pipeline renders the cached template with the
+request's names and pronouns instead of waiting on those calls.
+
+Families are the content tokens of a topic (story_dedup.tokenize, which
+drops names and relationship words), ranked by recency-weighted request
+counts from stories/index.json and the local service queue. Warm-up
+follows a daily token budget and only warms families requested at least
+MIN_REQUESTS times. Each warm entry is used by one request and then
+re-warmed, so stories for the same theme don't all come out identical.
+"""
+
+import json
+import os
+import re
+from datetime import date, datetime
+
+from artifact_store import write_json
+from story_dedup import NAME_FOLLOWERS, RELATIONSHIP_WORDS, STOPWORDS, stem, tokenize
+from story_templates import (MAIN_SLOT, RELATIONSHIP_PRONOUNS, infer_slots, json_escape, render,
+                             render_structure, resolve_slots, template_structure, template_text)
+
+CACHE_DIR = os.path.join('.story_cache', 'warm')
+STATE_FILE = os.path.join('.story_cache', 'warmup_state.json')
+STORIES_DIR = 'stories'
+QUEUE_DB = '.story_queue.db'
+ENTRY_VERSION = 1
+
+# Policies
+DAILY_TOKEN_BUDGET = int(os.getenv("STORY_WARMUP_BUDGET", "30000"))
+ESTIMATED_TOKENS = 4000  # per family until one has been measured
+MAX_WARM_FAMILIES = 8  # most popular families kept warm
+MIN_REQUESTS = 2  # a family must have been requested this often
+HALF_LIFE_DAYS = 30  # older requests count for less when ranking
+TTL_DAYS = 30  # warm entries older than this are regenerated
+IDLE_SECONDS = 30  # queue must be empty this long before the service warms
+WARM_ACTIVITIES = ['quiz', 'choices', 'games']
+
+# Relationships a cached character can be renamed between ("Mom" -> "Dad")
+RELATIONSHIP_GROUPS = [
+    {'mom', 'mum', 'mommy', 'mother', 'dad', 'daddy', 'father'},
+    {'grandma', 'grandmother', 'grandpa', 'grandfather'},
+    {'sister', 'brother'},
+    {'aunt', 'uncle'},
+    {'daughter', 'son'},
+]
+
+# Verbs like "visits" say nothing about the theme ("Sam visits the dentist")
+FAMILY_IGNORED = {stem(word) for word in NAME_FOLLOWERS}
+
+def topic_family(topic):
+    """Normalized family key for a topic, e.g. 'dentist' (empty if nothing is left)"""
+    return ' '.join(sorted(tokenize(topic) - FAMILY_IGNORED))
+
+def family_path(family):
+    slug = re.sub(r'[^a-z0-9]+', '-', family.lower()).strip('-')
+    return os.path.join(CACHE_DIR, f'{slug}.json')
+
+def _parse_date(value):
+    try:
+        return datetime.fromisoformat(value).date()
+    except (TypeError, ValueError):
+        return None
+
+def request_history(stories_dir=STORIES_DIR, queue_db=QUEUE_DB):
+    """
+    Collect past requests from the story library and the service queue
+
+    Returns:
+        list: (topic, date) tuples
+    """
+    history = []
+    produced = set()
+    if os.path.exists(queue_db):
+        from story_service import JobQueue
+
+        for job in JobQueue(queue_db).list(limit=1000):
+            history.append((job['topic'], _parse_date(job['created_at'])))
+            if job.get('story_dir'):
+                produced.add(os.path.basename(job['story_dir']))
+
+    index_path = os.path.join(stories_dir, 'index.json')
+    if os.path.exists(index_path):
+        with open(index_path, 'r', encoding='utf-8') as f:
+            for entry in json.load(f):
+                # Stories made by the service are already counted via their job
+                if entry.get('topic') and entry.get('path') not in produced:
+                    history.append((entry['topic'], _parse_date(entry.get('date'))))
+    return history
+
+def rank_families(history, today=None):
+    """
+    Rank topic families by recency-weighted request count
+
+    Returns:
+        list: Dicts with family, score, requests and the most recent topic,
+            most popular first, limited to families with MIN_REQUESTS requests
+    """
+    today = today or date.today()
+    families = {}
+    for topic, requested in history:
+        family = topic_family(topic)
+        if not family:
+            continue
+        age = (today - requested).days if requested else HALF_LIFE_DAYS
+        info = families.setdefault(family, {'family': family, 'score': 0.0, 'requests': 0,
+                                            'topic': topic, 'last': requested})
+        info['score'] += 0.5 ** (max(age, 0) / HALF_LIFE_DAYS)
+        info['requests'] += 1
+        if requested and (info['last'] is None or requested >= info['last']):
+            info['topic'], info['last'] = topic, requested
+
+    ranked = [f for f in families.values() if f['requests'] >= MIN_REQUESTS]
+    ranked.sort(key=lambda f: f['score'], reverse=True)
+    return ranked
+
+def load_state():
+    """Today's warm-up token spend plus the last measured cost per family"""
+    state = {'date': date.today().isoformat(), 'tokens_used': 0, 'family_tokens': {}}
+    if os.path.exists(STATE_FILE):
+        with open(STATE_FILE, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        state['family_tokens'] = saved.get('family_tokens', {})
+        if saved.get('date') == state['date']:
+            state['tokens_used'] = saved.get('tokens_used', 0)
+    return state
+
+def load_entry(family):
+    path = family_path(family)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        entry = json.load(f)
+    return entry if entry.get('version') == ENTRY_VERSION else None
+
+def is_fresh(entry):
+    created = _parse_date(entry.get('created_at'))
+    return created is not None and (date.today() - created).days <= TTL_DAYS
+
+def plan_warmup(budget=None, max_families=None, queue_db=QUEUE_DB):
+    """
+    Choose the families to warm next within the remaining budget
+
+    Returns:
+        list: Ranked family dicts with an 'estimate' of their token cost
+    """
+    state = load_state()
+    remaining = (DAILY_TOKEN_BUDGET if budget is None else budget) - state['tokens_used']
+    plan = []
+    for info in rank_families(request_history(queue_db=queue_db))[:MAX_WARM_FAMILIES]:
+        entry = load_entry(info['family'])
+        if entry and is_fresh(entry):
+            continue
+        estimate = state['family_tokens'].get(info['family'], ESTIMATED_TOKENS)
+        if estimate > remaining:
+            break
+        remaining -= estimate
+        plan.append(dict(info, estimate=estimate))
+        if max_families and len(plan) >= max_families:
+            break
+    return plan
+
+def warm_family(info):
+    """
+    Generate and cache the structure and interactive content for one family
+
+    Returns:
+        int: Tokens spent
+    """
+    import generate_story
+
+    topic = info['topic']
+    print(f"\n🔥 Warming '{info['family']}' ({info['requests']} requests) from: {topic}")
+    routing = []
+    structure, tokens = generate_story.generate_story_structure(topic, routing=routing)
+
+    generators = {
+        'quiz': generate_story.generate_interactive_quiz,
+        'choices': generate_story.generate_interactive_choices,
+        'games': generate_story.generate_interactive_games,
+    }
+    slots = infer_slots(structure, topic)
+    activities = {}
+    for name in WARM_ACTIVITIES:
+        content, activity_tokens = generators[name](structure, routing=routing)
+        tokens += activity_tokens
+        if content:
+            activities[name] = template_text(json.dumps(content), slots, list(slots))[0]
+
+    write_json(family_path(info['family']), {
+        'version': ENTRY_VERSION,
+        'family': info['family'],
+        'topic': topic,
+        'created_at': date.today().isoformat(),
+        'tokens': tokens,
+        'slots': slots,
+        'structure': template_structure(structure, slots),
+        'activities': activities
+    })
+    print(f"✅ Warmed '{info['family']}' ({tokens} tokens)")
+    return tokens
+
+def run_warmup(budget=None, max_families=None, dry_run=False, queue_db=QUEUE_DB):
+    """
+    Warm the most popular families that are missing or stale, within budget
+
+    Args:
+        budget: Daily token budget (default DAILY_TOKEN_BUDGET)
+        max_families: Stop after warming this many families
+        dry_run: Only print the plan
+        queue_db: Service queue database to read request history from
+
+    Returns:
+        dict: Families warmed and tokens spent
+    """
+    plan = plan_warmup(budget, max_families, queue_db)
+    if dry_run or not plan:
+        for info in plan:
+            print(f"🔥 would warm '{info['family']}' (score {info['score']:.2f}, ~{info['estimate']} tokens)")
+        if not plan:
+            print("✅ Nothing to warm (all popular families are warm, or the budget is spent)")
+        return {'warmed': [], 'tokens': 0}
+
+    warmed, spent = [], 0
+    for info in plan:
+        try:
+            tokens = warm_family(info)
+        except Exception as e:
+            print(f"❌ Warm-up failed for '{info['family']}': {e}")
+            continue
+        # Re-read the state so concurrent runs don't overwrite each other's spend
+        state = load_state()
+        state['tokens_used'] += tokens
+        state['family_tokens'][info['family']] = tokens
+        write_json(STATE_FILE, state)
+        warmed.append(info['family'])
+        spent += tokens
+    return {'warmed': warmed, 'tokens': spent}
+
+def topic_overrides(topic, slots):
+    """
+    Work out the slot overrides that turn a warm template into this topic
+
+    Returns:
+        dict: Overrides for resolve_slots, or None if the topic names a
+            child or relationship the template has no character for
+    """
+    words = re.findall(r"[A-Za-z][A-Za-z']*", topic)
+    overrides = {}
+
+    main = {}
+    if (len(words) > 1 and words[0][0].isupper() and words[1].lower() in NAME_FOLLOWERS
+            and words[0].lower() not in STOPWORDS | RELATIONSHIP_WORDS):
+        main['name'] = words[0]
+    match = re.search(r'\b(his|her|their)\b', topic.lower())
+    if match:
+        main['pronouns'] = {'his': 'he', 'her': 'she', 'their': 'they'}[match.group(1)]
+    if main:
+        if MAIN_SLOT not in slots:
+            return None
+        overrides[MAIN_SLOT] = main
+
+    present = {slot['relationship'] for slot in slots.values() if slot.get('relationship')}
+    for word in {w.lower() for w in words if w.lower() in RELATIONSHIP_PRONOUNS}:
+        if word in present:
+            continue
+        group = next((g for g in RELATIONSHIP_GROUPS if word in g), set())
+        key = next((k for k, slot in slots.items()
+                    if slot.get('relationship') in group and k not in overrides), None)
+        if key is None:
+            return None
+        overrides[key] = {'name': word.capitalize()}
+    return overrides
+
+def retarget_structure(structure, source_topic, topic):
+    """
+    Re-cast an existing story's structure for a new topic
+
+    The structure is templated with the same slots a warm entry uses and
+    rendered with the names and pronouns the topic asks for.
+
+    Returns:
+        dict: The rendered structure, or None if the topic's characters
+            can't be mapped onto the story's (or its pronouns couldn't be
+            templated and would change)
+    """
+    slots = infer_slots(structure, source_topic)
+    overrides = topic_overrides(topic, slots)
+    if overrides is None:
+        return None
+    unresolved = {}
+    template = template_structure(structure, slots, unresolved)
+    try:
+        resolved = resolve_slots({'slots': slots}, overrides)
+        if unresolved and any(resolved[k]['pronouns'] != slot['pronouns'] for k, slot in slots.items()):
+            return None
+        return render_structure(template, resolved)
+    except (ValueError, KeyError, json.JSONDecodeError) as e:
+        print(f"⚠️  Structure could not be re-cast for '{topic}': {e}")
+        return None
+
+def take_warm_start(topic):
+    """
+    Use (and remove) the warm entry for a topic's family, if one fits
+
+    Returns:
+        dict: {'family', 'structure', 'activities'} rendered for the topic, or None
+    """
+    from interactive_content import validate_activity
+
+    family = topic_family(topic)
+    entry = load_entry(family) if family else None
+    if not entry or not is_fresh(entry):
+        return None
+    overrides = topic_overrides(topic, entry['slots'])
+    if overrides is None:
+        return None
+
+    # Claim the entry so two workers can't both use it
+    claimed = f"{family_path(family)}.claimed{os.getpid()}"
+    try:
+        os.replace(family_path(family), claimed)
+    except FileNotFoundError:
+        return None
+
+    try:
+        slots = resolve_slots(entry, overrides)
+        structure = render_structure(entry['structure'], slots)
+        activities = {}
+        for name, text in entry['activities'].items():
+            content = json.loads(render(text, slots, json_escape))
+            if not validate_activity(name, content):
+                activities[name] = content
+    except (ValueError, KeyError, json.JSONDecodeError) as e:
+        print(f"⚠️  Warm entry for '{family}' could not be used: {e}")
+        return None
+    finally:
+        os.remove(claimed)
+
+    print(f"🔥 Warm start from '{family}' cache ({len(activities)} activities ready)")
+    return {'family': family, 'structure': structure, 'activities': activities}
@@ -0,0 +1,409 @@
+/**
+ * AI Social Stories Generator - Interactive Engine
+ * Renders quiz, choices and games activities from each story's JSON content
+ * (interactive/quiz.json, interactive/choices.json, interactive/games.json),
+ * so every story shares this one cached script instead of shipping its own.
+ */
+
+/**
+ * Escape text from story content before inserting it as HTML.
+ * @param {*} value - Text to escape
+ * @returns {string} HTML-safe text
+ */
+function escapeHtml(value) {
+  return String(value)
+    .replace(/&/g, '&amp;')
+    .replace(/</g, '&lt;')
+    .replace(/>/g, '&gt;')
+    .replace(/"/g, '&quot;')
+    .replace(/'/g, '&#39;');
+}
+
+/**
+ * Return a shuffled copy of an array.
+ * @param {Array} items - Items to shuffle
+ * @returns {Array} Shuffled copy
+ */
+function shuffled(items) {
+  const copy = [...items];
+  for (let i = copy.length - 1; i > 0; i--) {
+    const j = Math.floor(Math.random() * (i + 1));
+    [copy[i], copy[j]] = [copy[j], copy[i]];
+  }
+  return copy;
+}
+
+/**
+ * Load activity content from an object or a JSON URL.
+ * Content embedded in the page as <script type="application/json" data-src="...">
+ * is used instead of fetching the URL (packaged stories opened from file://).
+ * @param {Object|string} source - Content object or URL of a JSON file
+ * @returns {Promise<Object>} The activity content
+ */
+function loadActivityData(source) {
+  if (source && typeof source === 'object') {
+    return Promise.resolve(source);
+  }
+  if (typeof document !== 'undefined') {
+    const embedded = Array.from(document.querySelectorAll('script[type="application/json"][data-src]'))
+      .find(script => script.dataset.src === source);
+    if (embedded) {
+      return Promise.resolve(JSON.parse(embedded.textContent));
+    }
+  }
+  return fetch(source).then(response => {
+    if (!response.ok) {
+      throw new Error(`Could not load ${source} (${response.status})`);
+    }
+    return response.json();
+  });
+}
+
+function getContainer(containerId) {
+  const container = document.getElementById(containerId);
+  if (!container) {
+    console.error('Activity container not found:', containerId);
+  }
+  return container;
+}
+
+function showLoadError(container, error) {
+  console.error('Activity loading error:', error);
+  container.innerHTML = `
+    <div class="message message-error">
+      Sorry, this activity could not be loaded. Please try again later.
+    </div>
+  `;
+}
+
+/**
+ * Multiple-choice quiz.
+ * @param {string} containerId - Element to render into
+ * @param {Object|string} [source] - Quiz content or URL (default interactive/quiz.json)
+ */
+function initQuiz(containerId, source = 'interactive/quiz.json') {
+  const container = getContainer(containerId);
+  if (!container) return;
+
+  loadActivityData(source).then(data => {
+    const questions = data.questions || [];
+    let currentQuestion = 0;
+    let score = 0;
+
+    function renderQuestion() {
+      if (currentQuestion >= questions.length) {
+        showResults();
+        return;
+      }
+
+      const q = questions[currentQuestion];
+      container.innerHTML = `
+        <div class="quiz-question">
+          <h3>Question ${currentQuestion + 1} of ${questions.length}</h3>
+          <p style="font-size: 1.2rem; margin: 20px 0;">${escapeHtml(q.question)}</p>
+          <div class="quiz-options" role="group" aria-label="Answer options">
+            ${q.options.map((option, i) => `
+              <button class="quiz-option" data-index="${i}">${escapeHtml(option)}</button>
+            `).join('')}
+          </div>
+          <div class="quiz-feedback" aria-live="polite" style="margin-top: 20px;"></div>
+        </div>
+      `;
+
+      container.querySelectorAll('.quiz-option').forEach(btn => {
+        btn.addEventListener('click', () => {
+          const selected = parseInt(btn.dataset.index, 10);
+          container.querySelectorAll('.quiz-option').forEach(b => b.disabled = true);
+
+          if (selected === q.correct) {
+            btn.classList.add('correct');
+            score++;
+          } else {
+            btn.classList.add('incorrect');
+            container.querySelector(`[data-index="${q.correct}"]`).classList.add('correct');
+          }
+
+          if (q.explanation) {
+            container.querySelector('.quiz-feedback').innerHTML =
+              `<div class="message message-info">${escapeHtml(q.explanation)}</div>`;
+          }
+
+          setTimeout(() => {
+            currentQuestion++;
+            renderQuestion();
+          }, q.explanation ? 2500 : 1500);
+        });
+      });
+    }
+
+    function showResults() {
+      const percentage = questions.length ? (score / questions.length) * 100 : 0;
+      container.innerHTML = `
+        <div class="score-display">
+          <h2>Quiz Complete! 🎉</h2>
+          <p style="font-size: 2rem; margin: 20px 0;">${score} / ${questions.length}</p>
+          <p style="font-size: 1.2rem;">
+            ${percentage >= 70 ? 'Great job! You understood the story well!' : 'Good try! Try reading the story again.'}
+          </p>
+          <button class="btn btn-primary quiz-restart">Try Again</button>
+        </div>
+      `;
+      container.querySelector('.quiz-restart').addEventListener('click', () => {
+        currentQuestion = 0;
+        score = 0;
+        renderQuestion();
+      });
+    }
+
+    renderQuestion();
+  }).catch(error => showLoadError(container, error));
+}
+
+/**
+ * Decision-point scenarios with supportive feedback.
+ * @param {string} containerId - Element to render into
+ * @param {Object|string} [source] - Choices content or URL (default interactive/choices.json)
+ */
+function initChoices(containerId, source = 'interactive/choices.json') {
+  const container = getContainer(containerId);
+  if (!container) return;
+
+  loadActivityData(source).then(data => {
+    const scenarios = data.scenarios || [];
+    let currentScenario = 0;
+
+    function renderScenario() {
+      if (currentScenario >= scenarios.length) {
+        showComplete();
+        return;
+      }
+
+      const scenario = scenarios[currentScenario];
+      container.innerHTML = `
+        <div class="quiz-question">
+          <h3>Scenario ${currentScenario + 1} of ${scenarios.length}</h3>
+          <p style="font-size: 1.2rem; margin: 20px 0; padding: 15px; background: #F0F7FF; border-radius: 8px;">
+            ${escapeHtml(scenario.situation)}
+          </p>
+          <div class="quiz-options" role="group" aria-label="Choices">
+            ${scenario.choices.map((choice, i) => `
+              <button class="quiz-option" data-index="${i}">${escapeHtml(choice.text)}</button>
+            `).join('')}
+          </div>
+          <div class="choice-feedback" aria-live="polite" style="margin-top: 20px;"></div>
+        </div>
+      `;
+
+      container.querySelectorAll('.quiz-option').forEach(btn => {
+        btn.addEventListener('click', () => {
+          const choice = scenario.choices[parseInt(btn.dataset.index, 10)];
+          const feedback = container.querySelector('.choice-feedback');
+          container.querySelectorAll('.quiz-option').forEach(b => b.disabled = true);
+
+          feedback.innerHTML = `
+            <div class="message ${choice.helpful ? 'message-success' : 'message-info'}">
+              ${escapeHtml(choice.feedback)}
+              <br><br>
+              <button class="btn ${choice.helpful ? 'btn-primary' : 'btn-secondary'} choice-continue">
+                ${choice.helpful ? 'Next →' : 'Try Again'}
+              </button>
+            </div>
+          `;
+
+          feedback.querySelector('.choice-continue').addEventListener('click', () => {
+            if (choice.helpful) {
+              currentScenario++;
+            }
+            renderScenario();
+          });
+        });
+      });
+    }
+
+    function showComplete() {
+      container.innerHTML = `
+        <div class="score-display">
+          <h2>All Scenarios Complete! 🎉</h2>
+          <p style="font-size: 1.2rem; margin: 20px 0;">
+            ${escapeHtml(data.completion_message || "You've learned about making good choices!")}
+          </p>
+          <button class="btn btn-primary choices-restart">Try Again</button>
+        </div>
+      `;
+      container.querySelector('.choices-restart').addEventListener('click', () => {
+        currentScenario = 0;
+        renderScenario();
+      });
+    }
+
+    renderScenario();
+  }).catch(error => showLoadError(container, error));
+}
+
+/**
+ * Character matching and event sequencing games.
+ * @param {string} containerId - Element to render into
+ * @param {Object|string} [source] - Games content or URL (default interactive/games.json)
+ */
+function initGames(containerId, source = 'interactive/games.json') {
+  const container = getContainer(containerId);
+  if (!container) return;
+
+  loadActivityData(source).then(games => {
+    function showMenu() {
+      container.innerHTML = `
+        <div class="game-container">
+          <h2>Choose a Game</h2>
+          <div class="btn-group">
+            ${games.matching ? `<button class="btn btn-primary" data-game="matching">${escapeHtml(games.matching.title || 'Character Matching')}</button>` : ''}
+            ${games.sequencing ? `<button class="btn btn-primary" data-game="sequencing">${escapeHtml(games.sequencing.title || 'Event Sequencing')}</button>` : ''}
+          </div>
+        </div>
+      `;
+      container.querySelectorAll('[data-game]').forEach(btn => {
+        btn.addEventListener('click', () => {
+          btn.dataset.game === 'matching' ? playMatching() : playSequencing();
+        });
+      });
+    }
+
+    function addBackButton() {
+      const back = document.createElement('button');
+      back.className = 'btn btn-secondary';
+      back.textContent = 'Back to Menu';
+      back.addEventListener('click', showMenu);
+      container.querySelector('.game-container').appendChild(back);
+    }
+
+    function playMatching() {
+      const game = games.matching;
+      let selected = null;
+      let matches = 0;
+
+      container.innerHTML = `
+        <div class="game-container">
+          <h2>${escapeHtml(game.title || 'Character Matching')}</h2>
+          <p>Match each character with their description!</p>
+          <div class="game-board" style="grid-template-columns: 1fr 1fr;">
+            ${game.pairs.map((pair, i) => `
+              <button class="game-card" data-pair="${i}" data-type="character">
+                <strong>${escapeHtml(pair.character)}</strong>
+              </button>
+            `).join('')}
+            ${shuffled(game.pairs.map((pair, i) => ({ pair, i }))).map(({ pair, i }) => `
+              <button class="game-card" data-pair="${i}" data-type="description">
+                ${escapeHtml(pair.description)}
+              </button>
+            `).join('')}
+          </div>
+          <div class="game-feedback" aria-live="polite"></div>
+        </div>
+      `;
+      addBackButton();
+
+      container.querySelectorAll('.game-card').forEach(card => {
+        card.addEventListener('click', () => {
+          if (card.classList.contains('matched')) return;
+
+          if (!selected || selected.dataset.type === card.dataset.type) {
+            if (selected) selected.style.background = '';
+            selected = card;
+            card.style.background = '#FFF3CD';
+            return;
+          }
+
+          if (selected.dataset.pair === card.dataset.pair) {
+            selected.classList.add('matched');
+            card.classList.add('matched');
+            matches++;
+            if (matches === game.pairs.length) {
+              container.querySelector('.game-feedback').innerHTML =
+                '<div class="message message-success">🎉 Great job! You matched all the characters!</div>';
+            }
+          }
+          selected.style.background = '';
+          selected = null;
+        });
+      });
+    }
+
+    function playSequencing() {
+      const game = games.sequencing;
+      let nextPosition = 1;
+
+      container.innerHTML = `
+        <div class="game-container">
+          <h2>${escapeHtml(game.title || 'Event Sequencing')}</h2>
+          <p>Put the events in the correct order!</p>
+          <div class="game-board" style="grid-template-columns: 1fr;">
+            ${shuffled(game.events).map(event => `
+              <button class="game-card" data-order="${event.order}">
+                <span>${escapeHtml(event.text)}</span> <strong class="sequence-position"></strong>
+              </button>
+            `).join('')}
+          </div>
+          <button class="btn btn-primary sequence-check">Check Order</button>
+          <div class="game-feedback" aria-live="polite"></div>
+        </div>
+      `;
+      addBackButton();
+
+      const cards = Array.from(container.querySelectorAll('.game-card'));
+      cards.forEach(card => {
+        card.addEventListener('click', () => {
+          if (!card.dataset.selected) {
+            card.dataset.selected = nextPosition;
+            card.querySelector('.sequence-position').textContent = `(${nextPosition})`;
+            nextPosition++;
+          }
+        });
+      });
+
+      container.querySelector('.sequence-check').addEventListener('click', () => {
+        const feedback = container.querySelector('.game-feedback');
+        const correct = cards.every(card => card.dataset.selected === card.dataset.order);
+
+        if (correct) {
+          feedback.innerHTML = '<div class="message message-success">🎉 Perfect! You got the events in the right order!</div>';
+          cards.forEach(card => card.classList.add('matched'));
+        } else {
+          feedback.innerHTML = '<div class="message message-info">Not quite right. Try again!</div>';
+          cards.forEach(card => {
+            delete card.dataset.selected;
+            card.querySelector('.sequence-position').textContent = '';
+          });
+          nextPosition = 1;
+        }
+      });
+    }
+
+    showMenu();
+  }).catch(error => showLoadError(container, error));
+}
+
+// Auto-initialize activity containers, e.g. <div id="quiz-container" data-src="interactive/quiz.json">
+if (typeof document !== 'undefined') {
+  document.addEventListener('DOMContentLoaded', () => {
+    const activities = {
+      'quiz-container': initQuiz,
+      'choices-container': initChoices,
+      'games-container': initGames
+    };
+    Object.entries(activities).forEach(([id, init]) => {
+      const container = document.getElementById(id);
+      if (container) {
+        container.dataset.src ? init(id, container.dataset.src) : init(id);
+      }
+    });
+  });
+}
+
+// Export for use in modules
+if (typeof module !== 'undefined' && module.exports) {
+  module.exports = {
+    initQuiz,
+    initChoices,
+    initGames,
+    escapeHtml
+  };
+}
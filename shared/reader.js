@@ -25,16 +25,20 @@ class StoryReader {
   loadVoices() {
     this.voices = this.synth.getVoices();
     
-    // Prefer English voices
-    const englishVoices = this.voices.filter(v => v.lang.startsWith('en'));
+    // Prefer voices for the page's language (localized stories set <html lang>)
+    const pageLang = (document.documentElement.lang || 'en').toLowerCase().split('-')[0];
+    let languageVoices = this.voices.filter(v => v.lang.toLowerCase().startsWith(pageLang));
+    if (languageVoices.length === 0) {
+      languageVoices = this.voices.filter(v => v.lang.startsWith('en'));
+    }
     
-    if (englishVoices.length > 0) {
+    if (languageVoices.length > 0) {
       // Prefer high-quality or "natural" voices
-      const preferredVoice = englishVoices.find(v => 
+      const preferredVoice = languageVoices.find(v => 
         v.name.includes('Natural') || 
         v.name.includes('Enhanced') ||
         v.name.includes('Premium')
-      ) || englishVoices[0];
+      ) || languageVoices[0];
       
       this.currentVoice = preferredVoice;
     } else if (this.voices.length > 0) {
@@ -159,9 +163,16 @@ class AudioPlayer {
       // Stop current audio if playing
       this.stop();
       
-      this.audio = new Audio(audioSrc);
+      // Use the element the prefetcher already started loading, if any
+      const preloaded = window.storyPrefetcher && window.storyPrefetcher.takeAudio(audioSrc);
+      this.audio = preloaded || new Audio(audioSrc);
       this.currentSource = audioSrc;
       
+      if (preloaded && preloaded.readyState >= 2) {
+        resolve(this.audio);
+        return;
+      }
+      
       this.audio.addEventListener('loadeddata', () => {
         resolve(this.audio);
       });
@@ -266,6 +277,146 @@ class AudioPlayer {
   }
 }
 
+/**
+ * Page Prefetcher
+ * Reads the story's navigation.json, preloads the current page's audio and,
+ * once the page is idle, prefetches the next page and its audio so turning
+ * the page doesn't wait on the network. Audio is skipped on slow or
+ * data-saving connections, when a file is too large, or when the session's
+ * prefetch budget is spent.
+ */
+class PagePrefetcher {
+  constructor(options = {}) {
+    this.options = Object.assign({
+      manifestUrl: '../navigation.json',
+      pagesAhead: 1,
+      maxAudioBytes: 2 * 1024 * 1024,        // larger files are left to load on demand
+      sessionBudgetBytes: 16 * 1024 * 1024,  // total audio prefetched per browsing session
+      maxPreloadedAudio: 2,                  // decoded audio elements kept in memory
+      idleTimeout: 2000
+    }, options);
+    this.manifest = null;
+    this.preloaded = new Map();
+    this.prefetched = new Set();
+  }
+  
+  static resolve(url, base) {
+    return new URL(url, base || document.baseURI).href;
+  }
+  
+  connectionAllowsAudio() {
+    const connection = navigator.connection || navigator.mozConnection || navigator.webkitConnection;
+    if (!connection) return true;
+    if (connection.saveData) return false;
+    return !['slow-2g', '2g'].includes(connection.effectiveType);
+  }
+  
+  spentBytes() {
+    try {
+      return parseInt(sessionStorage.getItem('storyPrefetchBytes') || '0', 10);
+    } catch (e) {
+      return 0;
+    }
+  }
+  
+  spend(bytes) {
+    try {
+      sessionStorage.setItem('storyPrefetchBytes', String(this.spentBytes() + bytes));
+    } catch (e) {
+      // Storage unavailable (private mode); the per-file limit still applies
+    }
+  }
+  
+  canFetchAudio(page, speculative = true) {
+    if (!page.audio || !this.connectionAllowsAudio()) return false;
+    if (page.bytes > this.options.maxAudioBytes) return false;
+    // Only guesses about upcoming pages count against the session budget
+    return !speculative || this.spentBytes() + page.bytes <= this.options.sessionBudgetBytes;
+  }
+  
+  async loadManifest() {
+    try {
+      const response = await fetch(this.options.manifestUrl);
+      if (!response.ok) return null;
+      this.manifest = await response.json();
+      this.manifestBase = PagePrefetcher.resolve(this.options.manifestUrl);
+      return this.manifest;
+    } catch (error) {
+      // Older stories have no manifest, and file:// pages can't fetch one
+      return null;
+    }
+  }
+  
+  currentIndex() {
+    const here = window.location.pathname;
+    return this.manifest.pages.findIndex(page =>
+      new URL(page.url, this.manifestBase).pathname === here
+    );
+  }
+  
+  whenIdle(callback) {
+    if (window.requestIdleCallback) {
+      window.requestIdleCallback(callback, { timeout: this.options.idleTimeout });
+    } else {
+      setTimeout(callback, this.options.idleTimeout / 2);
+    }
+  }
+  
+  async start() {
+    if (!(await this.loadManifest())) return;
+    const index = this.currentIndex();
+    if (index < 0) return;
+    
+    // This page's audio first, so Listen starts without a download
+    const current = this.manifest.pages[index];
+    if (this.canFetchAudio(current, false)) {
+      this.preloadAudio(PagePrefetcher.resolve(current.audio, this.manifestBase));
+    }
+    
+    this.whenIdle(() => {
+      const upcoming = this.manifest.pages.slice(index + 1, index + 1 + this.options.pagesAhead);
+      upcoming.forEach(page => {
+        this.prefetch(PagePrefetcher.resolve(page.url, this.manifestBase), 'document');
+        if (this.canFetchAudio(page)) {
+          this.prefetch(PagePrefetcher.resolve(page.audio, this.manifestBase), 'audio');
+          this.spend(page.bytes);
+        }
+      });
+    });
+  }
+  
+  prefetch(url, as) {
+    if (this.prefetched.has(url)) return;
+    this.prefetched.add(url);
+    const link = document.createElement('link');
+    link.rel = 'prefetch';
+    link.href = url;
+    link.as = as;
+    document.head.appendChild(link);
+  }
+  
+  preloadAudio(url) {
+    if (this.preloaded.has(url)) return;
+    // Keep memory bounded: drop the oldest preloaded element
+    while (this.preloaded.size >= this.options.maxPreloadedAudio) {
+      const oldest = this.preloaded.keys().next().value;
+      this.preloaded.get(oldest).removeAttribute('src');
+      this.preloaded.delete(oldest);
+    }
+    const audio = new Audio();
+    audio.preload = 'auto';
+    audio.src = url;
+    this.preloaded.set(url, audio);
+  }
+  
+  takeAudio(audioSrc) {
+    const url = PagePrefetcher.resolve(audioSrc);
+    const audio = this.preloaded.get(url);
+    this.preloaded.delete(url);
+    return audio || null;
+  }
+}
+
 /**
  * Unified Reader Interface
  * Handles both TTS and pre-generated audio
@@ -352,6 +503,12 @@ function createReaderControls(containerId, text, audioSrc) {
   
   const reader = new UnifiedReader();
   
+  // Warm up this page's audio and the next page while the reader reads
+  if (!window.storyPrefetcher) {
+    window.storyPrefetcher = new PagePrefetcher();
+    window.storyPrefetcher.start();
+  }
+  
   const controlsHtml = `
     <div class="audio-controls">
       <button class="btn btn-primary" id="play-btn">
@@ -459,6 +616,7 @@ if (typeof module !== 'undefined' && module.exports) {
   module.exports = {
     StoryReader,
     AudioPlayer,
+    PagePrefetcher,
     UnifiedReader,
     createReaderControls
   };
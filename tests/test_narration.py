@@ -0,0 +1,41 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '.github', 'scripts'))
+
+from narration import split_lines
+
+NAMES = ['Mom', 'Geo', 'Little Sister', 'Sister']
+
+
+def speakers(text):
+    return [(line['speaker'], line['text']) for line in split_lines(text, NAMES)]
+
+
+def test_tag_after_quote():
+    assert speakers('"It is time to go," said Mom. Geo put on his shoes.') == [
+        ('Mom', 'It is time to go,'),
+        ('narrator', 'said Mom. Geo put on his shoes.'),
+    ]
+
+
+def test_tag_after_quote_ending_its_sentence():
+    assert speakers('"We are here!" Mom said.') == [('Mom', 'We are here!'), ('narrator', 'Mom said.')]
+
+
+def test_tag_before_quote():
+    assert speakers('Mom said, "We are going to the dentist." Geo felt a little nervous.') == [
+        ('narrator', 'Mom said,'),
+        ('Mom', 'We are going to the dentist.'),
+        ('narrator', 'Geo felt a little nervous.'),
+    ]
+
+
+def test_next_sentence_is_not_a_speech_tag():
+    assert speakers('It was morning. "It is page 1." Geo smiled.') == [
+        ('narrator', 'It was morning. It is page 1. Geo smiled.'),
+    ]
+
+
+def test_longest_name_wins():
+    assert speakers('"Wait for me," called Little Sister.')[0] == ('Little Sister', 'Wait for me,')
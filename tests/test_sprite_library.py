@@ -0,0 +1,40 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '.github', 'scripts'))
+
+import pytest
+
+from sprite_library import character_descriptor, setting_descriptor
+
+
+@pytest.mark.parametrize('character, descriptor', [
+    ({'name': 'Geo', 'role': 'main', 'pronouns': 'he',
+      'description': 'A five-year-old boy visiting the dentist'}, 'character:child-he'),
+    ({'name': 'Sam', 'role': 'main', 'pronouns': 'she',
+      'description': 'A girl who loves her mom'}, 'character:child-she'),
+    ({'name': 'Mom', 'role': 'supporting', 'pronouns': 'she',
+      'description': "Geo's caring mother who holds his hand"}, 'character:mom'),
+    ({'name': 'Dr. Lee', 'role': 'supporting', 'pronouns': 'she',
+      'description': 'A friendly dentist who counts teeth'}, 'character:dentist'),
+    ({'name': 'Ari', 'role': 'supporting', 'pronouns': 'he',
+      'description': "Geo's friend from school"}, 'character:friend'),
+    ({'name': 'Ben', 'role': 'supporting', 'pronouns': 'he',
+      'description': 'A boy waiting with his dad'}, 'character:child-he'),
+])
+def test_character_descriptor(character, descriptor):
+    assert character_descriptor(character) == descriptor
+
+
+@pytest.mark.parametrize('pronouns, descriptor', [
+    ('he/him', 'character:child-he'),
+    ('She', 'character:child-she'),
+    ('they/them', 'character:child-they'),
+    ('', 'character:child-they'),
+])
+def test_character_pronouns_are_normalized(pronouns, descriptor):
+    assert character_descriptor({'name': 'Geo', 'role': 'main', 'pronouns': pronouns}) == descriptor
+
+
+def test_possessive_settings_share_a_descriptor():
+    assert setting_descriptor("The Dentist's Office") == setting_descriptor('Dentist Office') == 'setting:dentist-office'
@@ -0,0 +1,23 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '.github', 'scripts'))
+
+import pytest
+
+from warmup import topic_family
+
+
+@pytest.mark.parametrize('title_case, lower_case, family', [
+    ('Going to the Dentist', 'going to the dentist', 'dentist'),
+    ('Visiting the Dentist', 'visiting the dentist', 'dentist'),
+    ('First Day of School', 'first day of school', 'school'),
+    ('My First Haircut', 'my first haircut', 'haircut'),
+    ('A Haircut at the Barber Shop', 'a haircut at the barber shop', 'barber haircut shop'),
+])
+def test_title_case_topics_share_a_family(title_case, lower_case, family):
+    assert topic_family(title_case) == topic_family(lower_case) == family
+
+
+def test_leading_name_and_relationships_do_not_change_the_family():
+    assert topic_family('Maya visits the dentist with her mom') == topic_family('Going to the Dentist')